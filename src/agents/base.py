@@ -10,11 +10,14 @@ from abc import ABC, abstractmethod
 from dataclasses import dataclass, field
 from typing import Optional
 
+from src.core.deadline import budget, remaining
+from src.core.metrics import AGENT_CANCELLED
 from src.models.agent_schemas import (
     ResumeProfile,
     AnalyzedJob,
     CareerPrediction,
     JobCareerPath,
+    JobInsight,
     InsightReport,
 )
 from src.models.schemas import FiveDimScore
@@ -27,15 +30,25 @@ class AgentContext:
     """
     Shared mutable state passed through the agent pipeline.
     Each agent reads upstream fields and writes its own output field.
+    Output fields carry a readiness signal (mark_ready / wait_for) that the
+    DagScheduler uses to start an agent the moment its inputs are written;
+    list outputs can also be signalled per item (e.g. one job's career path).
+    subscribe() exposes the same signals as an ordered event stream.
+    `deadline` (time.monotonic(), see src/core/deadline.py) bounds the whole
+    request: agent timeouts and optional stages are derived from what is left.
 
     共享的可变状态，在整个 Agent 管道中传递。
     每个 Agent 读取上游字段，并将自己的输出写入对应字段。
+    输出字段带有"就绪"信号，DagScheduler 据此在输入写入后立即启动下游 Agent；
+    列表型输出还可以逐项发布（例如单个岗位的职业路径）。
+    `deadline` 为整个请求的截止时间，各 Agent 超时与可选阶段均按剩余预算计算。
     """
     # ── Request params / 请求参数 ─────────────────────────────────────────────
     request_id: str
     file_bytes: bytes = field(default=b"")
     filename: str = ""
     top_k: int = 3
+    deadline: Optional[float] = None    # absolute time.monotonic(); None = unbounded / 请求截止时间
 
     # ── Agent outputs (written in DAG order) / Agent 输出（按 DAG 顺序写入）──
     candidate_profile: Optional[ResumeProfile] = None               # ResumeParserAgent            → 候选人画像
@@ -43,42 +56,126 @@ class AgentContext:
     scored_results: list[FiveDimScore] = field(default_factory=list)     # MatchScorerAgent        → 五维评分结果
     career_prediction: Optional[CareerPrediction] = None               # CareerPathPredictorAgent  → 岂位无关全局轨迹
     job_career_paths: list[JobCareerPath] = field(default_factory=list)  # CounterfactualCareerAgent → 每个岗位的反事实轨迹
+    job_insights: list[JobInsight] = field(default_factory=list)         # InsightGeneratorAgent     → 逐岗位洞察（完成即追加）
     insight_report: Optional[InsightReport] = None                     # InsightGeneratorAgent     → 最终洞察报告
 
     # ── Observability / 可观测性 ──────────────────────────────────────────────
     errors: dict[str, str] = field(default_factory=dict)        # agent_name → error message / Agent 名 → 错误信息
     timings: dict[str, float] = field(default_factory=dict)     # agent_name → elapsed seconds / Agent 名 → 耗时（秒）
 
+    # ── Readiness signals / 就绪信号 ──────────────────────────────────────────
+    _ready: dict[str, asyncio.Event] = field(default_factory=dict, repr=False)
+    _listeners: list[asyncio.Queue] = field(default_factory=list, repr=False)
+
+    # ── Time budget / 时间预算 ─────────────────────────────────────────────────
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left before the deadline, None if unbounded / 剩余时间（秒）"""
+        return remaining(self.deadline)
+
+    def has_budget(self, seconds: float) -> bool:
+        """Whether at least `seconds` remain — used to skip optional stages / 预算是否充足"""
+        left = self.remaining()
+        return left is None or left >= seconds
+
+    def _event(self, key: str) -> asyncio.Event:
+        if key not in self._ready:
+            self._ready[key] = asyncio.Event()
+        return self._ready[key]
+
+    def mark_ready(self, name: str, item: Optional[str] = None) -> None:
+        """
+        Signal that field `name` (or one `item` of it) has been written.
+        Marking the whole field also releases every per-item waiter.
+        标记字段（或其中一项）已写入；整字段就绪时同时释放所有逐项等待者。
+        """
+        for queue in self._listeners:
+            queue.put_nowait((name, item))
+        if item is not None:
+            self._event(f"{name}/{item}").set()
+            return
+        self._event(name).set()
+        for key, event in self._ready.items():
+            if key.startswith(f"{name}/"):
+                event.set()
+
+    def subscribe(self) -> asyncio.Queue:
+        """
+        Queue receiving a (field, item) tuple for every mark_ready call, in
+        write order — used to stream partial results (SSE).
+        订阅字段写入事件（按写入顺序），用于流式返回部分结果。
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        self._listeners.append(queue)
+        return queue
+
+    def is_ready(self, name: str) -> bool:
+        return self._event(name).is_set()
+
+    async def wait_for(self, *names: str) -> None:
+        """Wait until every field in `names` is ready / 等待所有字段就绪"""
+        for name in names:
+            await self._event(name).wait()
+
+    async def wait_for_item(self, name: str, item: str) -> None:
+        """Wait for one item of a list field, or for the whole field / 等待单项或整字段就绪"""
+        if self.is_ready(name):
+            return
+        await self._event(f"{name}/{item}").wait()
+
 
 class AgentBase(ABC):
     """
     Base class for all agents.
     Subclasses implement `run(ctx)`. The `__call__` wrapper handles:
     - Per-agent wall-clock timing recorded into ctx.timings
-    - Per-agent timeout enforcement
+    - Per-agent timeout enforcement, shortened to the request's remaining budget
     - Exception capture into ctx.errors (non-fatal — pipeline continues)
+    - Cancellation (client disconnect) is recorded and re-raised
+
+    `inputs` are the ctx fields an agent needs before it can start; `outputs`
+    are the fields it writes. The DagScheduler derives the execution graph from
+    these declarations instead of hard-coded phases.
 
     所有 Agent 的基类。
     子类实现 `run(ctx)` 方法。`__call__` 包装器统一处理：
     - 记录每个 Agent 的实际耗时到 ctx.timings
-    - 强制每个 Agent 的超时限制
+    - 强制每个 Agent 的超时限制（不超过请求剩余预算）
     - 捕获异常写入 ctx.errors（非致命，管道继续运行）
+    - 被取消时（客户端断开）记录后继续向上抛出
+
+    `inputs` 为启动前必须就绪的 ctx 字段，`outputs` 为该 Agent 写入的字段；
+    DagScheduler 根据这些声明构建执行图，而不是写死的阶段。
     """
     name: str = "base"
     timeout: float = 60.0
+    inputs: tuple[str, ...] = ()
+    outputs: tuple[str, ...] = ()
 
     async def __call__(self, ctx: AgentContext) -> AgentContext:
         t0 = time.monotonic()
+        timeout = budget(self.timeout, ctx.deadline)
+        if timeout <= 0:
+            ctx.timings[self.name] = 0.0
+            ctx.errors[self.name] = "Skipped: request deadline passed"
+            logger.error(f"[{ctx.request_id}] {self.name} skipped: request deadline passed")
+            return ctx
         try:
-            result = await asyncio.wait_for(self.run(ctx), timeout=self.timeout)
+            result = await asyncio.wait_for(self.run(ctx), timeout=timeout)
             ctx.timings[self.name] = round(time.monotonic() - t0, 3)
             logger.info(f"[{ctx.request_id}] {self.name} finished in {ctx.timings[self.name]}s")
             return result
         except asyncio.TimeoutError:
             ctx.timings[self.name] = round(time.monotonic() - t0, 3)
-            ctx.errors[self.name] = f"Timed out after {self.timeout}s"
-            logger.error(f"[{ctx.request_id}] {self.name} timed out after {self.timeout}s")
+            ctx.errors[self.name] = f"Timed out after {timeout:.1f}s"
+            logger.error(f"[{ctx.request_id}] {self.name} timed out after {timeout:.1f}s")
             return ctx
+        except asyncio.CancelledError:
+            ctx.timings[self.name] = round(time.monotonic() - t0, 3)
+            ctx.errors[self.name] = "Cancelled"
+            AGENT_CANCELLED.labels(agent=self.name).inc()
+            logger.warning(f"[{ctx.request_id}] {self.name} cancelled after {ctx.timings[self.name]}s")
+            raise
         except Exception as e:
             ctx.timings[self.name] = round(time.monotonic() - t0, 3)
             ctx.errors[self.name] = f"{type(e).__name__}: {e}"
@@ -1,27 +1,23 @@
 """
 CareerPathPredictorAgent: single Moonshot call to generate a 5-year career trajectory.
-Runs in parallel with MatchScorerAgent (both depend only on Phase 1 outputs).
+Starts as soon as the candidate profile is parsed (it does not wait for JD analysis).
+Predictions are cached by profile fingerprint (src/services/career_cache.py),
+so re-uploads and near-identical profiles skip the call.
 CareerPathPredictorAgent：只需一次 Moonshot 调用即可生成 5 年职业发展轨迹。
-与 MatchScorerAgent 并行运行（两者均仅依赖于第一阶段的输出）。
+简历解析完成后立即启动（不等待 JD 分析）。按画像指纹缓存预测结果，相同/近似画像不再调用 LLM。
 """
 
 import json
 import logging
 
-from openai import AsyncOpenAI
-
 from src.agents.base import AgentBase, AgentContext
+from src.core.app_config import get_app_config
 from src.models.agent_schemas import CareerPrediction, Milestone
-from src.core.config import get_moonshot_api_key, get_moonshot_model
+from src.services.career_cache import get_career_cache, profile_fingerprint
+from src.services.llm_client import get_llm_client
 
 logger = logging.getLogger(__name__)
 
-_client = AsyncOpenAI(
-    api_key=get_moonshot_api_key(),
-    base_url="https://api.moonshot.ai/v1",
-)
-MOONSHOT_MODEL = get_moonshot_model()
-
 
 class CareerPathPredictorAgent(AgentBase):
     """
@@ -32,19 +28,32 @@ class CareerPathPredictorAgent(AgentBase):
     """
     name = "career_predictor"
     timeout = 60.0
+    inputs = ("candidate_profile",)
+    outputs = ("career_prediction",)
 
     async def run(self, ctx: AgentContext) -> AgentContext:
         if ctx.candidate_profile is None:
             raise ValueError("candidate_profile not available — ResumeParserAgent must run first")
 
         cp = ctx.candidate_profile
+        cache = get_career_cache() if get_app_config().CAREER_CACHE_ENABLED else None
+        fingerprint = profile_fingerprint(cp)
+        if cache is not None:
+            cached = cache.get(fingerprint)
+            if cached is not None:
+                ctx.career_prediction = cached
+                logger.info(
+                    f"[{ctx.request_id}] CareerPathPredictorAgent cache hit — "
+                    f"target={cached.target_role_in_5yr!r}, skipping LLM call"
+                )
+                return ctx
+
         logger.info(f"[{ctx.request_id}] CareerPathPredictorAgent: predicting trajectory for {cp.name!r}...")
 
         prompt = f"""You are a senior career development advisor. Based on the candidate's profile below,
             predict their realistic 5-year career trajectory with concrete milestones.
 
             Candidate Profile:
-            - Name: {cp.name}
             - Current Title: {cp.current_title}
             - Years of Experience: {cp.years_of_experience}
             - Seniority Level: {cp.seniority_self_reported}
@@ -66,16 +75,15 @@ class CareerPathPredictorAgent(AgentBase):
             }}
         """
 
-        response = await _client.chat.completions.create(
-            model=MOONSHOT_MODEL,
+        content = await get_llm_client().chat(
+            caller="career_predictor",
             messages=[
                 {"role": "system", "content": "You are a career development advisor. Output only valid JSON."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.3,
             response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content or "{}"
+        ) or "{}"
         data = json.loads(content)
 
         milestones = [
@@ -94,6 +102,8 @@ class CareerPathPredictorAgent(AgentBase):
             skill_gaps_to_bridge=data.get("skill_gaps_to_bridge", []),
             confidence_note=data.get("confidence_note", ""),
         )
+        if cache is not None and milestones:     # an empty / malformed answer is retried, not replayed
+            cache.put(fingerprint, ctx.career_prediction)
 
         logger.info(
             f"[{ctx.request_id}] CareerPathPredictorAgent done — "
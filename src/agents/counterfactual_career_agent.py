@@ -1,8 +1,9 @@
 """
 CounterfactualCareerAgent: per-job "what if you take this role" trajectory.
 
-Runs in Phase 2 (parallel with MatchScorerAgent + CareerPathPredictorAgent).
-One Moonshot call per AnalyzedJob → all concurrent via asyncio.gather.
+Runs alongside MatchScorerAgent + CareerPathPredictorAgent and consumes the
+scored top-k: one Moonshot call per top-k job → all concurrent via asyncio.gather
+(or K jobs per call with LLM_BATCH_SIZE > 1, see src/services/llm_batch.py).
 
 For each job it generates:
 - 3 milestones (Y1 / Y3 / Y5) with optional DecisionGate forks
@@ -10,27 +11,75 @@ For each job it generates:
 - trajectory_summary label (e.g. "Y1: Tech Lead → Y3: EM → Y5: VP Eng")
 
 CounterfactualCareerAgent：针对每个岗位生成"如果你接受这个 offer"的专属职业轨迹。
-在第二阶段与 MatchScorerAgent 和 CareerPathPredictorAgent 并行运行。
-每个 AnalyzedJob 发起一次 Moonshot 调用，所有调用通过 asyncio.gather 并发执行。
+与 MatchScorerAgent 和 CareerPathPredictorAgent 并行启动，消费评分后的 top-k：
+每个 top-k 岗位发起一次 Moonshot 调用，所有调用通过 asyncio.gather 并发执行。
 """
 
 import asyncio
 import json
 import logging
 
-from openai import AsyncOpenAI
-
 from src.agents.base import AgentBase, AgentContext
 from src.models.agent_schemas import DecisionGate, JobCareerPath, Milestone
-from src.core.config import get_moonshot_api_key, get_moonshot_model
+from src.core.app_config import get_app_config
+from src.core.deadline import run_in_executor
+from src.services.llm_batch import call_chunk, estimate_tokens, keyed_response_instruction, pack
+from src.services.llm_client import get_llm_client
 
 logger = logging.getLogger(__name__)
 
-_client = AsyncOpenAI(
-    api_key=get_moonshot_api_key(),
-    base_url="https://api.moonshot.ai/v1",
-)
-MOONSHOT_MODEL = get_moonshot_model()
+_PATH_RULES = """Rules:
+        1. Milestones must be specific to THIS company/role type (startup vs big tech vs agency matters).
+        2. Include a decision_gate at the milestone where there is a real career fork (typically year 2-3).
+        If no meaningful fork exists, set decision_gate to null.
+        3. key_risks must be specific (e.g. "startup runway risk", "promotion timeline 3-4 yrs at big tech").
+        4. trajectory_summary is a short label like "Y1: Tech Lead → Y3: EM → Y5: VP Eng"."""
+
+_PATH_SCHEMA = """{
+        "trajectory_summary": "Y1: Senior SWE → Y3: Tech Lead → Y5: Staff Engineer",
+        "milestones": [
+            {"year": 1, "title": "Senior Software Engineer", "skills_needed": ["codebase onboarding"], "decision_gate": null},
+            {"year": 3, "title": "Tech Lead", "skills_needed": ["system design", "mentoring"],
+             "decision_gate": {"year": 3, "question": "Stay IC or move to Engineering Manager?",
+                               "option_A": "IC track → Staff Engineer", "option_B": "Management track → EM",
+                               "impact": "5-year salary gap ~20-30%"}},
+            {"year": 5, "title": "Staff Engineer", "skills_needed": ["org-wide technical strategy"], "decision_gate": null}
+        ],
+        "key_risks": ["Technical stack may limit transferability", "Promotion pace depends on headcount growth"]
+        }"""
+_PATH_OUTPUT_TOKENS = 450   # budgeted per job in batched prompts
+
+
+def _parse_career_path(job_id: str, job_title: str, company: str, data: dict) -> JobCareerPath:
+    milestones: list[Milestone] = []
+    for m in data.get("milestones", []):
+        gate_data = m.get("decision_gate")
+        gate = (
+            DecisionGate(
+                year=gate_data.get("year", m.get("year", 0)),
+                question=gate_data.get("question", ""),
+                option_A=gate_data.get("option_A", ""),
+                option_B=gate_data.get("option_B", ""),
+                impact=gate_data.get("impact", ""),
+            )
+            if gate_data
+            else None
+        )
+        milestones.append(Milestone(
+            year=m.get("year", 0),
+            title=m.get("title", ""),
+            skills_needed=m.get("skills_needed", []),
+            decision_gate=gate,
+        ))
+
+    return JobCareerPath(
+        job_id=job_id,
+        job_title=job_title,
+        company=company,
+        trajectory_summary=data.get("trajectory_summary", ""),
+        milestones=milestones,
+        key_risks=data.get("key_risks", []),
+    )
 
 
 async def _predict_for_job(
@@ -69,12 +118,7 @@ async def _predict_for_job(
         - Requirements: {requirements}
         - Implicit Requirements: {implicit_requirements}
 
-        Rules:
-        1. Milestones must be specific to THIS company/role type (startup vs big tech vs agency matters).
-        2. Include a decision_gate at the milestone where there is a real career fork (typically year 2-3).
-        If no meaningful fork exists, set decision_gate to null.
-        3. key_risks must be specific (e.g. "startup runway risk", "promotion timeline 3-4 yrs at big tech").
-        4. trajectory_summary is a short label like "Y1: Tech Lead → Y3: EM → Y5: VP Eng".
+        {_PATH_RULES}
 
         Respond ONLY with valid JSON matching this exact schema:
         {{
@@ -113,47 +157,17 @@ async def _predict_for_job(
     """
 
     try:
-        response = await _client.chat.completions.create(
-            model=MOONSHOT_MODEL,
+        content = await get_llm_client().chat(
+            caller="counterfactual_career",
+            hedge=True,
             messages=[
                 {"role": "system", "content": "You are a career advisor. Output only valid JSON."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.3,
             response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content or "{}"
-        data = json.loads(content)
-
-        milestones: list[Milestone] = []
-        for m in data.get("milestones", []):
-            gate_data = m.get("decision_gate")
-            gate = (
-                DecisionGate(
-                    year=gate_data.get("year", m.get("year", 0)),
-                    question=gate_data.get("question", ""),
-                    option_A=gate_data.get("option_A", ""),
-                    option_B=gate_data.get("option_B", ""),
-                    impact=gate_data.get("impact", ""),
-                )
-                if gate_data
-                else None
-            )
-            milestones.append(Milestone(
-                year=m.get("year", 0),
-                title=m.get("title", ""),
-                skills_needed=m.get("skills_needed", []),
-                decision_gate=gate,
-            ))
-
-        return JobCareerPath(
-            job_id=job_id,
-            job_title=job_title,
-            company=company,
-            trajectory_summary=data.get("trajectory_summary", ""),
-            milestones=milestones,
-            key_risks=data.get("key_risks", []),
-        )
+        ) or "{}"
+        return _parse_career_path(job_id, job_title, company, json.loads(content))
 
     except Exception as e:
         logger.warning(f"CounterfactualCareerAgent failed for job_id={job_id}: {e}")
@@ -167,22 +181,95 @@ async def _predict_for_job(
         )
 
 
+async def _predict_for_jobs(candidate: dict, jobs: list[dict]) -> list[JobCareerPath]:
+    """
+    Counterfactual paths for a chunk of jobs in ONE Moonshot call. `candidate`
+    and each job dict hold _predict_for_job's keyword arguments; jobs missing
+    from / malformed in the keyed response fall back to _predict_for_job.
+    一次调用生成一组岗位的反事实路径；解析失败的岗位逐条回退。
+    """
+    async def _batch(chunk: list[dict]) -> str:
+        jobs_block = "\n\n".join(
+            f"Job ID {job['job_id']}:\n"
+            f"- Title: {job['job_title']}\n"
+            f"- Company: {job['company']}\n"
+            f"- Description: {job['description'][:1500]}\n"
+            f"- Requirements: {job['requirements']}\n"
+            f"- Implicit Requirements: {job['implicit_requirements']}"
+            for job in chunk
+        )
+        prompt = (
+            "You are a senior career advisor specializing in tech industry career planning.\n\n"
+            "A candidate is considering EACH of the job offers below. For each one, independently, generate a\n"
+            "REALISTIC, JOB-SPECIFIC 5-year career trajectory showing what would happen if they accepted it.\n\n"
+            "Candidate Profile:\n"
+            f"- Name: {candidate['candidate_name']}\n"
+            f"- Current Title: {candidate['current_title']}\n"
+            f"- Seniority: {candidate['seniority']}\n"
+            f"- Years of Experience: {candidate['years_exp']}\n"
+            f"- Skills: {candidate['skills']}\n\n"
+            f"Job Offers:\n{jobs_block}\n\n"
+            f"{_PATH_RULES}\n\n"
+            + keyed_response_instruction([job["job_id"] for job in chunk], _PATH_SCHEMA)
+        )
+        return await get_llm_client().chat(
+            caller="counterfactual_career",
+            hedge=True,
+            messages=[
+                {"role": "system", "content": "You are a career advisor. Output only valid JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )
+
+    return await call_chunk(
+        jobs,
+        caller="counterfactual_career",
+        key=lambda job: job["job_id"],
+        call_batch=_batch,
+        parse=lambda job, data: _parse_career_path(job["job_id"], job["job_title"], job["company"], data),
+        single=lambda job: _predict_for_job(**candidate, **job),
+    )
+
+
+def _speculative_job_ids(resume_text: str, k: int) -> list[str]:
+    """
+    FAISS recall of the k jobs most similar to the resume (sync — run in executor).
+    Imported lazily: the job index and its embedder are only needed when speculating.
+    """
+    try:
+        from src.models.matcher import get_job_matcher
+        return get_job_matcher().recall_job_ids(resume_text, k)
+    except Exception as e:
+        logger.warning(f"Speculative FAISS recall unavailable: {e}")
+        return []
+
+
 class CounterfactualCareerAgent(AgentBase):
     """
-    Generates a job-specific counterfactual career path for every AnalyzedJob.
-    All Moonshot calls run concurrently via asyncio.gather.
+    Generates a job-specific counterfactual career path for the scored top-k jobs.
+    Only the jobs the insight stage will actually show get a Moonshot call, so
+    LLM spend scales with top_k rather than with the catalog size.
 
-    Input:  ctx.candidate_profile, ctx.analyzed_jobs
-    Output: ctx.job_career_paths (list[JobCareerPath], one per job)
+    Input:  ctx.candidate_profile, ctx.analyzed_jobs (+ ctx.scored_results, awaited)
+    Output: ctx.job_career_paths (list[JobCareerPath], one per top-k job)
 
-    Phase 2 agent — runs in parallel with MatchScorerAgent + CareerPathPredictorAgent.
+    Starts as soon as the profile and analyzed jobs exist. With
+    COUNTERFACTUAL_SPECULATIVE_K > 0 it speculatively starts on the FAISS-recalled
+    jobs while MatchScorerAgent is still running; once scored_results land,
+    speculative calls outside the top-k are cancelled and missing top-k jobs are
+    started. Each path is published per job (ctx.mark_ready("job_career_paths",
+    job_id)) the moment it is generated.
     Failure is non-fatal; the pipeline continues without per-job paths.
 
-    为每个 AnalyzedJob 生成岗位专属的反事实职业路径。
-    所有 Moonshot 调用通过 asyncio.gather 并发执行。
+    仅为评分 top-k 岗位生成反事实职业路径，LLM 调用数随 top_k 而非岗位库规模增长。
+    可选：评分完成前按 FAISS 召回结果推测性地提前启动，评分结果出来后取消不在 top-k 中的调用。
     """
     name = "counterfactual_career"
-    timeout = 180.0
+    timeout = 240.0     # includes waiting on MatchScorerAgent for the top-k
+    inputs = ("candidate_profile", "analyzed_jobs")
+    outputs = ("job_career_paths",)
 
     async def run(self, ctx: AgentContext) -> AgentContext:
         if ctx.candidate_profile is None:
@@ -191,18 +278,19 @@ class CounterfactualCareerAgent(AgentBase):
             raise ValueError("analyzed_jobs is empty — JobAnalyzerAgent must run first")
 
         cp = ctx.candidate_profile
-        logger.info(
-            f"[{ctx.request_id}] CounterfactualCareerAgent: predicting paths for "
-            f"{len(ctx.analyzed_jobs)} jobs concurrently..."
+        analyzed_map = {aj.posting.job_id: aj for aj in ctx.analyzed_jobs}
+        started: dict[str, asyncio.Task] = {}
+        candidate = dict(
+            candidate_name=cp.name,
+            current_title=cp.current_title,
+            seniority=cp.seniority_self_reported or "mid",
+            skills=cp.skills,
+            years_exp=cp.years_of_experience or 0.0,
         )
 
-        tasks = [
-            _predict_for_job(
-                candidate_name=cp.name,
-                current_title=cp.current_title,
-                seniority=cp.seniority_self_reported or "mid",
-                skills=cp.skills,
-                years_exp=cp.years_of_experience or 0.0,
+        def _job_args(job_id: str) -> dict:
+            aj = analyzed_map[job_id]
+            return dict(
                 job_id=aj.posting.job_id,
                 job_title=aj.posting.title,
                 company=aj.company,
@@ -210,11 +298,82 @@ class CounterfactualCareerAgent(AgentBase):
                 requirements=aj.posting.required_skills or [],
                 implicit_requirements=aj.implicit_requirements,
             )
-            for aj in ctx.analyzed_jobs
-        ]
 
-        results: list[JobCareerPath] = list(await asyncio.gather(*tasks))
-        ctx.job_career_paths = results
+        def _start(job_id: str) -> None:
+            if job_id not in analyzed_map or job_id in started:
+                return
+            started[job_id] = asyncio.ensure_future(_predict_for_job(**candidate, **_job_args(job_id)))
+
+        async def _nth(batch: asyncio.Future, i: int) -> JobCareerPath:
+            return (await batch)[i]
+
+        def _start_batched(job_ids: list[str]) -> None:
+            # K jobs per Moonshot call; single-job chunks are left to _start
+            cfg = get_app_config()
+            jobs = [_job_args(job_id) for job_id in job_ids if job_id not in started]
+            for chunk in pack(
+                jobs,
+                lambda job: estimate_tokens(job["description"][:1500]) + _PATH_OUTPUT_TOKENS,
+                batch_size=cfg.LLM_BATCH_SIZE,
+                token_budget=cfg.LLM_BATCH_TOKEN_BUDGET,
+            ):
+                if len(chunk) > 1:
+                    batch = asyncio.ensure_future(_predict_for_jobs(candidate, chunk))
+                    for i, job in enumerate(chunk):
+                        started[job["job_id"]] = asyncio.ensure_future(_nth(batch, i))
+
+        async def _speculate(k: int) -> None:
+            job_ids = await run_in_executor(_speculative_job_ids, cp.resume_text, k)
+            if not ctx.is_ready("scored_results"):
+                logger.info(f"[{ctx.request_id}] CounterfactualCareerAgent: speculating on {job_ids}")
+                for job_id in job_ids:
+                    _start(job_id)
+
+        speculative_k = get_app_config().COUNTERFACTUAL_SPECULATIVE_K
+        speculation = asyncio.ensure_future(_speculate(speculative_k)) if speculative_k > 0 else None
+
+        try:
+            # 等待评分结果，只为 top-k 生成轨迹
+            await ctx.wait_for("scored_results")
+        except asyncio.CancelledError:
+            for task in started.values():     # request abandoned: drop speculative calls too
+                task.cancel()
+            raise
+        finally:
+            if speculation is not None:
+                speculation.cancel()
+        top_ids = [r.job_id for r in ctx.scored_results if r.job_id in analyzed_map]
+
+        wasted = [job_id for job_id in started if job_id not in top_ids]
+        for job_id in wasted:
+            started.pop(job_id).cancel()
+        if not top_ids:
+            raise ValueError("scored_results is empty — MatchScorerAgent must run first")
+
+        reused = sum(job_id in started for job_id in top_ids)
+        if get_app_config().LLM_BATCH_SIZE > 1:
+            _start_batched(top_ids)
+        for job_id in top_ids:
+            _start(job_id)
+        logger.info(
+            f"[{ctx.request_id}] CounterfactualCareerAgent: predicting paths for top-{len(top_ids)} jobs "
+            f"({reused} speculative calls reused, {len(wasted)} cancelled)..."
+        )
+
+        async def _publish(job_id: str) -> JobCareerPath:
+            # 每个岗位的路径一旦生成即发布，下游逐岗位洞察无需等待最慢的岗位
+            path = await started[job_id]
+            ctx.job_career_paths.append(path)
+            ctx.mark_ready("job_career_paths", job_id)
+            return path
+
+        ctx.job_career_paths = []
+        try:
+            results: list[JobCareerPath] = list(await asyncio.gather(*[_publish(j) for j in top_ids]))
+        finally:
+            for task in started.values():
+                task.cancel()
+        ctx.job_career_paths = results   # 最终按 top-k 顺序排列
 
         logger.info(
             f"[{ctx.request_id}] CounterfactualCareerAgent done — "
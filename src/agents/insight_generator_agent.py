@@ -2,12 +2,18 @@
 InsightGeneratorAgent: final synthesis stage.
 
 For each matched job: async Moonshot call → why_match, skill_gaps, career_fit_commentary.
+With LLM_BATCH_SIZE > 1, jobs are packed K per call (resume sent once, keyed
+JSON response — see src/services/llm_batch.py).
 After per-job insights: one more Moonshot call → overall_summary + development_plan.
-All per-job calls run concurrently via asyncio.gather.
+All per-job calls run concurrently via asyncio.gather; each starts as soon as
+its own career context is ready (see AgentContext.wait_for_item).
+The comparison matrix is optional: it is skipped when less than
+OPTIONAL_STAGE_MIN_SECONDS of the request budget remain.
 InsightGeneratorAgent：最终综合阶段。
 对于每个匹配的职位：异步调用 Moonshot → why_match、skill_gaps 和 career_fit_commentary。
 在获取每个职位的洞察之后：再次调用 Moonshot → overall_summary + development_plan。
 所有针对每个职位的调用均通过 asyncio.gather 并发运行。
+岗位对比矩阵为可选阶段：请求剩余预算不足 OPTIONAL_STAGE_MIN_SECONDS 时跳过。
 """
 
 import asyncio
@@ -15,9 +21,8 @@ import json
 import logging
 from typing import Optional
 
-from openai import AsyncOpenAI
-
 from src.agents.base import AgentBase, AgentContext
+from src.core.app_config import get_app_config
 from src.models.agent_schemas import (
     AnalyzedJob,
     CareerPrediction,
@@ -28,17 +33,11 @@ from src.models.agent_schemas import (
     JobInsight,
 )
 from src.models.schemas import FiveDimScore
-from src.core.config import get_moonshot_api_key, get_moonshot_model
+from src.services.llm_batch import call_chunk, estimate_tokens, keyed_response_instruction, pack
+from src.services.llm_client import get_llm_client
 
 logger = logging.getLogger(__name__)
 
-_client = AsyncOpenAI(
-    api_key=get_moonshot_api_key(),
-    base_url="https://api.moonshot.ai/v1",
-)
-MOONSHOT_MODEL = get_moonshot_model()
-
-_DIMS = ["semantic", "skill_graph", "seniority", "culture", "salary"]
 
 # 辅助函数：将 FiveDimScore + AnalyzedJob 合并成一个扁平化的 dict，供 LLM 使用
 # 把打分结果和职位信息合成一份字典
@@ -54,16 +53,44 @@ def _build_job_dict(score: FiveDimScore, aj: Optional[AnalyzedJob]) -> dict:
         "required_skills": posting.required_skills if posting else [],
         "implicit_requirements": aj.implicit_requirements if aj else [],
         "score": score.final_score,
-        "five_dim_score": {
-            dim: {
-                "score": getattr(score, dim).score,
-                "weight": getattr(score, dim).weight,
-                "weighted_score": getattr(score, dim).weighted_score,
-            }
-            for dim in _DIMS
-        },
+        "five_dim_score": score.dimension_dicts(),
     }
 
+_INSIGHT_SCHEMA = """{
+        "why_match": ["specific reason 1", "specific reason 2", "specific reason 3"],
+        "skill_gaps": ["concrete gap 1", "concrete gap 2"],
+        "career_fit_commentary": "One sentence on how this role fits their career trajectory."
+        }"""
+_INSIGHT_OUTPUT_TOKENS = 250   # budgeted per job in batched prompts
+
+
+def _job_block(job: dict) -> str:
+    """Job section of a batched insight prompt."""
+    return (
+        f"Title: {job['title']}\n"
+        f"Company: {job['company']}\n"
+        f"Required Skills: {job['required_skills']}\n"
+        f"Implicit Requirements: {job['implicit_requirements']}\n"
+        f"Description: {job['description'][:1500]}\n"
+        f"Match Score: {job['score']:.2f} / 1.0"
+    )
+
+
+def _insight_from(job: dict, data: dict, path_map: dict[str, JobCareerPath]) -> JobInsight:
+    return JobInsight(
+        job_id=job["job_id"],
+        job_title=job["title"],
+        company=job["company"],
+        score=job["score"],
+        five_dim_score=job["five_dim_score"],
+        why_match=data.get("why_match", []),     # 具体到点的"你为什么适合这个岗位"
+        skill_gaps=data.get("skill_gaps", []),     # 明确写出差在哪、缺哪些技能
+        career_fit_commentary=data.get("career_fit_commentary", ""),  # 与 5 年职业目标的关系
+        implicit_requirements=job["implicit_requirements"],
+        counterfactual_path=path_map.get(job["job_id"]),
+    )
+
+
 # 为单个职位生成“为什么匹配 / 差在哪 / 职业契合度一句话
 async def _generate_job_insight(
     resume_text: str,
@@ -96,30 +123,17 @@ async def _generate_job_insight(
     """
 
     try:
-        response = await _client.chat.completions.create(
-            model=MOONSHOT_MODEL,
+        content = await get_llm_client().chat(
+            caller="insight_generator",
+            hedge=True,
             messages=[
                 {"role": "system", "content": "You are a recruitment advisor. Output only valid JSON."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.2,
             response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content or "{}"
-        data = json.loads(content)
-
-        return JobInsight(
-            job_id=job["job_id"],
-            job_title=job["title"],
-            company=job["company"],
-            score=job["score"],
-            five_dim_score=job["five_dim_score"],
-            why_match=data.get("why_match", []),     # 具体到点的"你为什么适合这个岗位"
-            skill_gaps=data.get("skill_gaps", []),     # 明确写出差在哪、缺哪些技能
-            career_fit_commentary=data.get("career_fit_commentary", ""),  # 与 5 年职业目标的关系
-            implicit_requirements=job["implicit_requirements"],
-            counterfactual_path=path_map.get(job["job_id"]),
-        )
+        ) or "{}"
+        return _insight_from(job, json.loads(content), path_map)
     except Exception as e:
         logger.warning(f"Insight generation failed for job_id={job['job_id']}: {e}")
         return JobInsight(
@@ -133,6 +147,48 @@ async def _generate_job_insight(
             counterfactual_path=path_map.get(job["job_id"]),
         )
 
+async def _generate_job_insights(
+    resume_text: str,
+    jobs: list[dict],
+    career_summary: str,
+    path_map: dict[str, JobCareerPath],
+) -> list[JobInsight]:
+    """
+    Insights for a chunk of jobs in ONE Moonshot call (resume sent once);
+    jobs missing from / malformed in the keyed response are retried singly.
+    一次调用生成一组岗位的洞察；缺失或解析失败的岗位逐条回退。
+    """
+    async def _batch(chunk: list[dict]) -> str:
+        jobs_block = "\n\n".join(f"Job ID {job['job_id']}:\n{_job_block(job)}" for job in chunk)
+        prompt = (
+            "You are a technical recruitment advisor. Analyze the match between this candidate "
+            "and EACH job below, independently.\n\n"
+            f"Candidate Resume:\n{resume_text[:3000]}\n\n"
+            f"Candidate Career Context: {career_summary}\n\n"
+            f"Jobs:\n{jobs_block}\n\n"
+            + keyed_response_instruction([job["job_id"] for job in chunk], _INSIGHT_SCHEMA)
+        )
+        return await get_llm_client().chat(
+            caller="insight_generator",
+            hedge=True,
+            messages=[
+                {"role": "system", "content": "You are a recruitment advisor. Output only valid JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        )
+
+    return await call_chunk(
+        jobs,
+        caller="insight_generator",
+        key=lambda job: job["job_id"],
+        call_batch=_batch,
+        parse=lambda job, data: _insight_from(job, data, path_map),
+        single=lambda job: _generate_job_insight(resume_text, job, career_summary, path_map),
+    )
+
+
 # ── Comparison Matrix ─────────────────────────────────────────────────────────
 
 async def _generate_comparison_matrix(
@@ -178,16 +234,15 @@ async def _generate_comparison_matrix(
     )
 
     try:
-        response = await _client.chat.completions.create(
-            model=MOONSHOT_MODEL,
+        content = await get_llm_client().chat(
+            caller="insight_generator",
             messages=[
                 {"role": "system", "content": "You are a career strategist. Output only valid JSON."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.3,
             response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content or "{}"
+        ) or "{}"
         data = json.loads(content)
 
         rows = [
@@ -238,16 +293,15 @@ async def _generate_overall_summary(
     """
 
     try:
-        response = await _client.chat.completions.create(
-            model=MOONSHOT_MODEL,
+        content = await get_llm_client().chat(
+            caller="insight_generator",
             messages=[
                 {"role": "system", "content": "You are a career coach. Output only valid JSON."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.3,
             response_format={"type": "json_object"},
-        )
-        content = response.choices[0].message.content or "{}"
+        ) or "{}"
         data = json.loads(content)
         return data.get("overall_summary", ""), data.get("development_plan", "")
     except Exception as e:
@@ -255,23 +309,38 @@ async def _generate_overall_summary(
         return "Overall summary unavailable.", ""
 
 
+def _career_summary(career: Optional[CareerPrediction]) -> str:
+    """One-line career context for per-job prompts (empty without a prediction)."""
+    if not career:
+        return ""
+    return (
+        f"Targeting {career.target_role_in_5yr!r} in 5 years. "
+        f"Key skill gaps: {career.skill_gaps_to_bridge}."
+    )
+
+
 class InsightGeneratorAgent(AgentBase):
     """
-    Final synthesis agent. Runs after MatchScorerAgent and CareerPathPredictorAgent.
+    Final synthesis agent. Started by the scheduler as soon as scored_results
+    exist; career context is awaited per sub-task instead of up front.
 
     Execution order:
       1. Build job dicts from scored_results + analyzed_jobs
-      2. All per-job LLM calls concurrently (asyncio.gather)
-      3. One final LLM call for overall_summary + development_plan
-      最终综合代理。在 MatchScorerAgent 和 CareerPathPredictorAgent 之后运行。
+      2. Per-job LLM calls, each started once the career prediction and that
+         job's own counterfactual path are ready (not the whole list)
+      3. overall_summary + development_plan and the comparison matrix,
+         concurrently, once all per-job insights are in
+      最终综合代理。scored_results 写入后即由调度器启动，职业上下文按子任务等待。
 
     执行顺序：
     1. 根据 scores_results 和 analysed_jobs 构建作业字典
-    2. 并发执行所有针对每个作业的 LLM 调用（asyncio.gather）
-    3. 执行一次最终的 LLM 调用，用于生成 overall_summary 和 development_plan
+    2. 每个岗位的 LLM 调用在职业预测与该岗位自己的反事实路径就绪后立即启动
+    3. 所有岗位洞察完成后，并发生成 overall_summary / development_plan 与对比矩阵
     """
     name = "insight_generator"
-    timeout = 180.0
+    timeout = 240.0     # includes waiting on career_predictor / counterfactual_career
+    inputs = ("scored_results",)
+    outputs = ("job_insights", "insight_report")
 
     async def run(self, ctx: AgentContext) -> AgentContext:
         if not ctx.scored_results:
@@ -279,8 +348,6 @@ class InsightGeneratorAgent(AgentBase):
 
         # 候选人信息
         cp = ctx.candidate_profile
-        # 职业预测信息
-        career = ctx.career_prediction
 
         # Build lookup map from job_id → AnalyzedJob
         # 从 job_id 构建到 AnalyzedJob 的查找映射
@@ -293,14 +360,6 @@ class InsightGeneratorAgent(AgentBase):
             for score in ctx.scored_results
         ]
 
-        # 准备 career_summary / 简历文本 / 姓名
-        career_summary = ""
-        if career:
-            career_summary = (
-                f"Targeting {career.target_role_in_5yr!r} in 5 years. "
-                f"Key skill gaps: {career.skill_gaps_to_bridge}."
-            )
-
         resume_text = cp.resume_text if cp else ""
         candidate_name = cp.name if cp else ""
 
@@ -309,28 +368,57 @@ class InsightGeneratorAgent(AgentBase):
             f"generating insights for {len(job_dicts)} jobs concurrently..."
         )
 
-        # Phase A: per-job insights in parallel
-        # 阶段 A：并行生成每个职位的洞察
-        path_map: dict[str, JobCareerPath] = {
-            p.job_id: p for p in ctx.job_career_paths
-        }
-
-        job_insights: list[JobInsight] = list(
-            await asyncio.gather(
-                *[_generate_job_insight(resume_text, jd, career_summary, path_map) for jd in job_dicts]
-            )
+        # Phase A: per-job insights — each chunk (one job unless batching is on)
+        # waits only for its own inputs
+        # 阶段 A：每组岗位的洞察只等待自己的输入（职业预测 + 组内岗位的反事实路径）
+        cfg = get_app_config()
+        chunks = pack(
+            job_dicts,
+            lambda jd: estimate_tokens(_job_block(jd)) + _INSIGHT_OUTPUT_TOKENS,
+            batch_size=cfg.LLM_BATCH_SIZE,
+            token_budget=cfg.LLM_BATCH_TOKEN_BUDGET,
+            base_tokens=estimate_tokens(resume_text[:3000]),
         )
 
-        # Phase B: overall summary + development plan (after insights are ready)
-        # 第二阶段：总体总结 + 发展计划（在洞察分析完成后）
-        overall_summary, dev_plan = await _generate_overall_summary(
-            candidate_name, job_insights, career
+        async def _insights_for(chunk: list[dict]) -> list[JobInsight]:
+            await ctx.wait_for("career_prediction")
+            for jd in chunk:
+                await ctx.wait_for_item("job_career_paths", jd["job_id"])
+            path_map = {p.job_id: p for p in ctx.job_career_paths}
+            insights = await _generate_job_insights(
+                resume_text, chunk, _career_summary(ctx.career_prediction), path_map
+            )
+            # 每个岗位洞察完成即发布（流式接口按完成顺序推送）
+            for insight in insights:
+                ctx.job_insights.append(insight)
+                ctx.mark_ready("job_insights", insight.job_id)
+            return insights
+
+        ctx.job_insights = []
+        job_insights: list[JobInsight] = [
+            insight
+            for insights in await asyncio.gather(*[_insights_for(chunk) for chunk in chunks])
+            for insight in insights
+        ]
+        ctx.job_insights = job_insights
+
+        # Phase B + C: overall summary / development plan and the comparison matrix are independent
+        # 阶段 B + C：总体总结 / 发展计划 与 岗位对比矩阵互不依赖，并发执行
+        async def _matrix() -> Optional[JobComparisonMatrix]:
+            await ctx.wait_for("job_career_paths")
+            if not ctx.has_budget(cfg.OPTIONAL_STAGE_MIN_SECONDS):
+                logger.warning(
+                    f"[{ctx.request_id}] Skipping comparison matrix: "
+                    f"{ctx.remaining():.1f}s of request budget left"
+                )
+                return None
+            return await _generate_comparison_matrix(job_insights, ctx.job_career_paths)
+
+        (overall_summary, dev_plan), comparison_matrix = await asyncio.gather(
+            _generate_overall_summary(candidate_name, job_insights, ctx.career_prediction),
+            _matrix(),
         )
 
-        # Phase C: job comparison matrix — single LLM call comparing all top-k jobs
-        # 第三阶段：岗位对比矩阵（对 top-k 结果跨岗位对比，单次 LLM 调用）
-        comparison_matrix = await _generate_comparison_matrix(job_insights, ctx.job_career_paths)
-
         ctx.insight_report = InsightReport(
             overall_summary=overall_summary,
             top_jobs=job_insights,
@@ -4,7 +4,20 @@ JobAnalyzerAgent: LLM-powered JD analysis with mtime-based process-level cache.
 Cache invalidation strategy:
   - Cache key: mtime of data/jobs/job_mock.json
   - On hit: return cached AnalyzedJob list immediately (0 LLM calls)
-  - On miss/invalidation: re-analyze all JDs concurrently via asyncio.gather
+  - On invalidation (stale-while-revalidate): requests keep the last good
+    analyses — new jobs unenriched, deleted jobs dropped — while ONE background
+    task refreshes the cache and swaps it in atomically. Only a cold cache
+    (nothing analysed yet) makes requests wait.
+  - Background: with JD_CACHE_REFRESH_INTERVAL > 0 a refresher polls the
+    file mtime on that interval and refreshes in the BACKGROUND priority class.
+  - Refresh: re-analyze only new / edited JDs concurrently via
+    asyncio.gather (K JDs per Moonshot call when LLM_BATCH_SIZE > 1); the
+    rest come from the per-job JD store (src/services/jd_store.py), keyed by
+    a hash of title, description and skills. Deleted jobs are evicted.
+  - Cluster (JD_STORE_BACKEND=redis): the store is shared through Redis and a
+    leader lock lets ONE process (API or Celery worker) analyse a changed
+    catalog while the rest read its results; _cache stays the local L1, so
+    requests never touch the network.
 
 用 LLM 深度“解读”所有职位描述（JD），自动抽取每个岗位的隐含要求和文化信号，
 并按 job 文件修改时间做缓存，避免重复分析
@@ -13,43 +26,73 @@ Cache invalidation strategy:
 
 - 命中时：立即返回缓存的 AnalyzedJob 列表（0 次 LLM 调用）
 
-- 未命中/失效时：通过 asyncio.gather 并发重新分析所有 JD。
+- 失效时：请求继续使用上一次的分析结果（新岗位不含分析、已删除岗位剔除），
+  由单个后台任务刷新并原子替换缓存；仅冷启动时请求需等待。
+- 后台刷新：JD_CACHE_REFRESH_INTERVAL > 0 时按该间隔轮询文件修改时间，以低优先级刷新。
+- 刷新时：仅对新增或内容变化的 JD 通过 asyncio.gather 并发重新分析，
+  其余从按岗位存储的分析结果中复用；已删除的岗位被淘汰。
+- 集群共享：JD_STORE_BACKEND=redis 时通过 Redis 共享分析结果，由 leader 锁保证只有一个进程分析，
+  其他进程读取；_cache 作为本地 L1，请求路径不访问网络。
+  LLM_BATCH_SIZE > 1 时每次调用打包 K 个 JD（按 job_id 键控的 JSON 返回）。
 """
 
 import asyncio
+import concurrent.futures
 import json
 import logging
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 
-from openai import AsyncOpenAI
-
 from src.agents.base import AgentBase, AgentContext
+from src.core.app_config import get_app_config
+from src.core.deadline import request_deadline
+from src.core.metrics import JD_ANALYSES, JD_CACHE_READS
 from src.models.agent_schemas import AnalyzedJob
 from src.models.schemas import JobPosting
 from src.services.job_loader import load_jobs
 from src.services.job_adapter import jobs_to_postings
-from src.core.config import get_moonshot_api_key, get_moonshot_model
-from src.services.rate_limiter import moonshot_acquire, moonshot_retry, RetryError
+from src.services.rate_limiter import Priority, RetryError, llm_priority, moonshot_retry
+from src.services.llm_batch import call_chunk, estimate_tokens, keyed_response_instruction, pack
+from src.services.jd_store import LEADER_LOCK_TTL_SECONDS, get_jd_store, jd_analysis_hash
+from src.services.llm_client import get_llm_client
 
 logger = logging.getLogger(__name__)
 
 # Path to job data file — used for mtime-based cache invalidation
 _JOB_FILE = Path(__file__).resolve().parents[2] / "data" / "jobs" / "job_mock.json"
 
-_client = AsyncOpenAI(
-    api_key=get_moonshot_api_key(),
-    base_url="https://api.moonshot.ai/v1",
-)
-MOONSHOT_MODEL = get_moonshot_model()
+_LEADER_POLL_SECONDS = 1.0   # follower re-read interval while another process analyses the catalog
 
 # ── Process-level JD cache (concurrency-safe) ────────────────────────────────
 # Structure: {"mtime": float | None, "results": dict[job_id, AnalyzedJob]}
 _cache: dict = {"mtime": None, "results": {}}
 
-# Lock ensures only ONE coroutine rebuilds the cache at a time.
-# All other concurrent requests wait and then get the freshly built result.
-_cache_lock = asyncio.Lock()
+# Stale view served while a refresh runs: the catalog at "mtime" with the last
+# good analyses (unenriched postings for new jobs). Built once per catalog version.
+_stale: dict = {"mtime": None, "results": {}}
+
+# Outcome of the most recent refresh, shown by /api/v2/jd_cache/status
+_refresh_state: dict = {
+    "refreshing": False,
+    "last_refresh_at": None,     # wall-clock time of the last successful refresh
+    "last_duration_s": None,
+    "last_error": None,
+    "last_counts": None,         # jobs / reused / analyzed / failed / evicted
+}
+
+# Single-flight refresh: at most ONE rebuild per process at a time. A cold
+# cache waits for it; a stale cache keeps serving and the rebuild swaps in the result.
+# Rebuilds always run on a long-lived "refresh loop" so they outlive the request
+# that triggered them: the server loop in the API (registered by start_refresher),
+# otherwise — Celery tasks run asyncio.run per task and close their loop — a
+# daemon-thread loop started on first use.
+_refresh_future: Optional[concurrent.futures.Future] = None
+_refresh_future_loop: Optional[asyncio.AbstractEventLoop] = None
+_refresh_lock = threading.Lock()
+_server_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread_loop: Optional[asyncio.AbstractEventLoop] = None
 
 
 def _get_mtime() -> Optional[float]:
@@ -84,19 +127,17 @@ async def _analyze_single_job(posting: JobPosting, company: str = "") -> Analyze
         }}
     """
 
-    # Acquire rate-limit token before every LLM call
-    await moonshot_acquire()
-
-    response = await _client.chat.completions.create(
-        model=MOONSHOT_MODEL,
+    # JD analysis is background work: the limiter serves interactive calls first
+    content = await get_llm_client().chat(
+        caller="job_analyzer",
         messages=[
             {"role": "system", "content": "You are a job analysis expert. Output only valid JSON."},
             {"role": "user", "content": prompt},
         ],
         temperature=0.1,
         response_format={"type": "json_object"},
-    )
-    content = response.choices[0].message.content or "{}"
+        priority=Priority.BACKGROUND,
+    ) or "{}"
     data = json.loads(content)
     return AnalyzedJob(
         posting=posting,
@@ -115,21 +156,334 @@ async def _safe_analyze_single_job(posting: JobPosting, company: str = "") -> An
         return AnalyzedJob(posting=posting, company=company)
 
 
+_JD_SCHEMA = """{
+        "implicit_requirements": ["requirement 1", "requirement 2"],
+        "culture_fit_signals": ["signal 1", "signal 2", "signal 3"]
+        }"""
+_JD_OUTPUT_TOKENS = 120   # budgeted per JD in batched prompts
+
+
+def _jd_block(posting: JobPosting) -> str:
+    return (
+        f"Job Title: {posting.title}\n"
+        f"Description: {posting.description}\n"
+        f"Required Skills: {posting.required_skills}\n"
+        f"Preferred Skills: {posting.preferred_skills}"
+    )
+
+
+async def _analyze_jobs(chunk: list[tuple[JobPosting, str]]) -> list[AnalyzedJob]:
+    """
+    Analyze a chunk of (posting, company) pairs in ONE Moonshot call; JDs
+    missing from / malformed in the keyed response fall back to the single call.
+    一次调用分析一组 JD；解析失败的 JD 逐条回退。
+    """
+    async def _batch(items: list[tuple[JobPosting, str]]) -> str:
+        jobs_block = "\n\n".join(f"Job ID {p.job_id}:\n{_jd_block(p)}" for p, _ in items)
+        prompt = (
+            "Analyze EACH of the following job descriptions and extract two things:\n"
+            "1. Implicit requirements — unstated but implied expectations not listed in the official requirements\n"
+            '(e.g. "startup experience", "comfortable with ambiguity", "self-starter")\n'
+            "2. Culture fit signals — words or phrases that reveal company culture\n"
+            '(e.g. "fast-paced", "collaborative", "data-driven", "remote-first")\n\n'
+            f"{jobs_block}\n\n"
+            + keyed_response_instruction([p.job_id for p, _ in items], _JD_SCHEMA)
+        )
+        return await get_llm_client().chat(
+            caller="job_analyzer",
+            messages=[
+                {"role": "system", "content": "You are a job analysis expert. Output only valid JSON."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.1,
+            response_format={"type": "json_object"},
+            priority=Priority.BACKGROUND,
+        )
+
+    return await call_chunk(
+        chunk,
+        caller="job_analyzer",
+        key=lambda item: item[0].job_id,
+        call_batch=_batch,
+        parse=lambda item, data: AnalyzedJob(
+            posting=item[0],
+            company=item[1],
+            implicit_requirements=data.get("implicit_requirements", []),
+            culture_fit_signals=data.get("culture_fit_signals", []),
+        ),
+        single=lambda item: _safe_analyze_single_job(*item),
+    )
+
+
+async def _analyze_pending(pending: list[tuple[JobPosting, str]]) -> dict[str, AnalyzedJob]:
+    cfg = get_app_config()
+    chunks = pack(
+        pending,
+        lambda item: estimate_tokens(_jd_block(item[0])) + _JD_OUTPUT_TOKENS,
+        batch_size=cfg.LLM_BATCH_SIZE,
+        token_budget=cfg.LLM_BATCH_TOKEN_BUDGET,
+    )
+    return {
+        a.posting.job_id: a
+        for chunk in await asyncio.gather(*[_analyze_jobs(chunk) for chunk in chunks]) for a in chunk
+    }
+
+
 async def _rebuild_cache(current_mtime: Optional[float]) -> None:
     """
-    Internal: rebuild the JD cache under _cache_lock.
-    Must only be called while holding the lock (or at startup before serving).
+    Internal: rebuild the JD cache. Only ever run as the single refresh task
+    (see _ensure_refresh); the new results are swapped in with no await in between.
+
+    Incremental: analyses whose JD hash is unchanged come from the JD store;
+    only new / edited jobs go to the LLM, and jobs no longer in the catalog
+    are evicted from the store.
+    With a shared (Redis) store only the process holding the leader lock calls
+    the LLM; the others poll the store until the leader's analyses appear.
+    增量重建：JD 哈希未变的岗位直接复用存储的分析结果，仅新增/修改的岗位调用 LLM，
+    已删除的岗位从存储中淘汰。共享存储时仅持有 leader 锁的进程调用 LLM，其余进程等待并读取结果。
     """
     raw_jobs = load_jobs()
     postings = jobs_to_postings(raw_jobs)
     companies = [j.get("company", "") for j in raw_jobs]
 
-    analyzed = await asyncio.gather(
-        *[_safe_analyze_single_job(p, c) for p, c in zip(postings, companies)]
+    store = get_jd_store()
+    hashes = {p.job_id: jd_analysis_hash(p) for p in postings}
+    stored = await asyncio.to_thread(store.get_valid, hashes)
+    pending = [(p, c) for p, c in zip(postings, companies) if p.job_id not in stored]
+
+    fresh: dict[str, AnalyzedJob] = {}
+    succeeded: dict = {}
+    give_up_at = time.monotonic() + LEADER_LOCK_TTL_SECONDS
+    while pending:
+        token = await asyncio.to_thread(store.acquire_leader)
+        if token is not None:
+            try:
+                # the previous leader may have stored these jobs between our read and the lock
+                stored.update(await asyncio.to_thread(
+                    store.get_valid, {p.job_id: hashes[p.job_id] for p, _ in pending}
+                ))
+                pending = [(p, c) for p, c in pending if p.job_id not in stored]
+                fresh = await _analyze_pending(pending) if pending else {}
+                # Degraded analyses (both lists empty) are not persisted, so they are retried next rebuild
+                succeeded = {
+                    job_id: (hashes[job_id], a.implicit_requirements, a.culture_fit_signals)
+                    for job_id, a in fresh.items()
+                    if a.implicit_requirements or a.culture_fit_signals
+                }
+                await asyncio.to_thread(store.put_many, succeeded)
+            finally:
+                await asyncio.to_thread(store.release_leader, token)
+            pending = []
+            break
+        # Another process is analysing this catalog: wait for its results
+        if time.monotonic() >= give_up_at:
+            break
+        await asyncio.sleep(_LEADER_POLL_SECONDS)
+        stored.update(await asyncio.to_thread(store.get_valid, {p.job_id: hashes[p.job_id] for p, _ in pending}))
+        pending = [(p, c) for p, c in pending if p.job_id not in stored]
+    evicted = await asyncio.to_thread(store.evict_except, hashes)
+
+    results: dict[str, AnalyzedJob] = {}
+    for posting, company in zip(postings, companies):
+        if posting.job_id in fresh:
+            results[posting.job_id] = fresh[posting.job_id]
+        elif posting.job_id in stored:
+            implicit, culture = stored[posting.job_id]
+            results[posting.job_id] = AnalyzedJob(
+                posting=posting,
+                company=company,
+                implicit_requirements=list(implicit),
+                culture_fit_signals=list(culture),
+            )
+        else:
+            results[posting.job_id] = AnalyzedJob(posting=posting, company=company)   # leader never delivered
+
+    # results first: a reader on another thread (Celery refresher) may see
+    # the new results with the old mtime — stale path — never the reverse
+    _cache["results"] = results
+    if not pending:
+        _cache["mtime"] = current_mtime     # otherwise stay stale so the next refresh completes it
+    _refresh_state["last_counts"] = {
+        "jobs": len(results),
+        "reused": len(stored),
+        "analyzed": len(succeeded),
+        "failed": len(fresh) - len(succeeded),
+        "pending": len(pending),
+        "evicted": len(evicted),
+    }
+    JD_ANALYSES.labels(outcome="reused").inc(len(stored))
+    JD_ANALYSES.labels(outcome="analyzed").inc(len(succeeded))
+    JD_ANALYSES.labels(outcome="failed").inc(len(fresh) - len(succeeded))
+    JD_ANALYSES.labels(outcome="pending").inc(len(pending))
+    JD_ANALYSES.labels(outcome="evicted").inc(len(evicted))
+    logger.info(
+        f"[JobAnalyzerAgent] Cache rebuilt: {len(results)} jobs "
+        f"({len(stored)} reused, {len(fresh)} analyzed, {len(fresh) - len(succeeded)} failed, "
+        f"{len(pending)} pending, {len(evicted)} evicted)"
     )
-    _cache["mtime"] = current_mtime
-    _cache["results"] = {a.posting.job_id: a for a in analyzed}
-    logger.info(f"[JobAnalyzerAgent] Cache rebuilt: {len(_cache['results'])} jobs")
+    _notify_catalog_change(postings)
+
+
+async def _refresh(current_mtime: Optional[float]) -> None:
+    started = time.monotonic()
+    _refresh_state["refreshing"] = True
+    try:
+        # Detached from the triggering request: its deadline must not cut the rebuild short
+        with request_deadline(None):
+            await _rebuild_cache(current_mtime)
+    except Exception as e:
+        _refresh_state["last_error"] = f"{type(e).__name__}: {e}"
+        raise
+    else:
+        _refresh_state["last_error"] = None
+        _refresh_state["last_refresh_at"] = time.time()
+    finally:
+        _refresh_state["refreshing"] = False
+        _refresh_state["last_duration_s"] = round(time.monotonic() - started, 3)
+
+
+def _on_refresh_done(future: concurrent.futures.Future) -> None:
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"[JobAnalyzerAgent] JD cache refresh failed, keeping previous analyses: {future.exception()}")
+
+
+def _refresh_loop() -> asyncio.AbstractEventLoop:
+    """The loop refreshes run on; call with _refresh_lock held."""
+    global _thread_loop
+    if _server_loop is not None and _server_loop.is_running():
+        return _server_loop
+    if _thread_loop is None:
+        _thread_loop = asyncio.new_event_loop()
+        threading.Thread(target=_thread_loop.run_forever, name="jd-cache-refresh", daemon=True).start()
+    return _thread_loop
+
+
+def _ensure_refresh(current_mtime: Optional[float]) -> asyncio.Future:
+    """
+    Join the in-flight refresh, starting one on the refresh loop if there is
+    none. Returns a future the caller's loop can await (or drop — the refresh
+    keeps running either way).
+    """
+    global _refresh_future, _refresh_future_loop
+    with _refresh_lock:
+        future = _refresh_future
+        # a refresh whose loop has been closed (server shut down) will never finish
+        if future is None or future.done() or _refresh_future_loop.is_closed():
+            _refresh_future_loop = _refresh_loop()
+            future = asyncio.run_coroutine_threadsafe(_refresh(current_mtime), _refresh_future_loop)
+            future.add_done_callback(_on_refresh_done)
+            _refresh_future = future
+    return asyncio.wrap_future(future)
+
+
+def _stale_results(current_mtime: Optional[float]) -> dict:
+    """
+    The current catalog with the last good analyses; brand-new jobs are served
+    unenriched and deleted jobs are dropped. Falls back to the cached results
+    when the catalog cannot be read (e.g. mid-write).
+    当前岗位列表 + 上一次成功的分析结果；新岗位不含 LLM 分析，已删除岗位剔除。
+    """
+    if _stale["mtime"] == current_mtime and _stale["results"]:
+        return _stale["results"]
+    last_good = _cache["results"]
+    try:
+        raw_jobs = load_jobs()
+        postings = jobs_to_postings(raw_jobs)
+    except Exception as e:
+        logger.warning(f"[JobAnalyzerAgent] Catalog unreadable, serving cached analyses: {e}")
+        return last_good
+    results = {}
+    for posting, job in zip(postings, raw_jobs):
+        previous = last_good.get(posting.job_id)
+        results[posting.job_id] = AnalyzedJob(
+            posting=posting,
+            company=job.get("company", ""),
+            implicit_requirements=list(previous.implicit_requirements) if previous else [],
+            culture_fit_signals=list(previous.culture_fit_signals) if previous else [],
+        )
+    _stale["mtime"], _stale["results"] = current_mtime, results
+    return results
+
+
+def _notify_catalog_change(postings: list[JobPosting]) -> None:
+    """
+    Fire-and-forget: rebuild the scorer's salary table for the new catalog and
+    re-score only the changed jobs for stored candidates.
+    Imported lazily — the scorer pulls in PyTorch models.
+    """
+    def _run() -> None:
+        try:
+            from src.api.routes import get_five_dim_scorer
+            from src.services.score_store import on_catalog_change
+            scorer = get_five_dim_scorer()
+            scorer.salary.prepare_catalog(postings)
+            on_catalog_change(scorer, postings)
+        except Exception as e:
+            logger.warning(f"[JobAnalyzerAgent] Incremental re-scoring failed: {e}")
+
+    asyncio.get_event_loop().run_in_executor(None, _run)
+
+
+# ── Background refresher ─────────────────────────────────────────────────────
+# With JD_CACHE_REFRESH_INTERVAL > 0 the catalog is polled in the background,
+# so a changed job file is re-analysed before any request notices. Started
+# from the FastAPI startup hook and, in Celery workers, on the daemon-thread
+# refresh loop — the same loop request-triggered refreshes run on, so both go
+# through one single-flight refresh per process.
+
+_refresher: Optional[asyncio.Task | concurrent.futures.Future] = None
+
+
+async def refresh_loop(interval: float) -> None:
+    """Every `interval` seconds, refresh the JD cache if the catalog changed. Runs until cancelled."""
+    logger.info(f"[JobAnalyzerAgent] Background JD refresher started (every {interval}s)")
+    with llm_priority(Priority.BACKGROUND):
+        while True:
+            current_mtime = _get_mtime()
+            if current_mtime is not None and not (_cache["mtime"] == current_mtime and _cache["results"]):
+                logger.info("[JobAnalyzerAgent] Catalog changed, refreshing JD cache in background")
+                try:
+                    await asyncio.shield(_ensure_refresh(current_mtime))
+                except Exception:
+                    pass    # logged by _on_refresh_done; retried on the next tick
+            await asyncio.sleep(interval)
+
+
+def start_refresher() -> Optional[asyncio.Task]:
+    """
+    Make the running (server) loop the refresh loop, and start refresh_loop on
+    it when JD_CACHE_REFRESH_INTERVAL > 0.
+    """
+    global _refresher, _server_loop
+    _server_loop = asyncio.get_running_loop()
+    interval = get_app_config().JD_CACHE_REFRESH_INTERVAL
+    if interval <= 0:
+        return None
+    if _refresher is None or _refresher.done():
+        _refresher = asyncio.get_running_loop().create_task(refresh_loop(interval))
+    return _refresher
+
+
+def stop_refresher() -> None:
+    if _refresher is not None:
+        _refresher.cancel()
+
+
+def start_refresher_thread() -> Optional[concurrent.futures.Future]:
+    """Run refresh_loop on the process's refresh loop, a daemon thread (Celery workers)."""
+    global _refresher
+    interval = get_app_config().JD_CACHE_REFRESH_INTERVAL
+    if interval <= 0:
+        return None
+    with _refresh_lock:
+        if _refresher is None or _refresher.done():
+            _refresher = asyncio.run_coroutine_threadsafe(refresh_loop(interval), _refresh_loop())
+    return _refresher
+
+
+def refresh_status() -> dict:
+    """Snapshot of the refresher state for /api/v2/jd_cache/status."""
+    return {"refresh_interval_s": get_app_config().JD_CACHE_REFRESH_INTERVAL, **_refresh_state}
 
 
 async def prewarm() -> None:
@@ -142,11 +496,10 @@ async def prewarm() -> None:
     if current_mtime is None:
         logger.warning("[JobAnalyzerAgent] Job file not found, skipping pre-warm")
         return
-    async with _cache_lock:
-        if _cache["mtime"] == current_mtime and _cache["results"]:
-            logger.info("[JobAnalyzerAgent] JD cache already warm")
-            return
-        await _rebuild_cache(current_mtime)
+    if _cache["mtime"] == current_mtime and _cache["results"]:
+        logger.info("[JobAnalyzerAgent] JD cache already warm")
+        return
+    await asyncio.shield(_ensure_refresh(current_mtime))
     logger.info(f"[JobAnalyzerAgent] JD cache warmed: {len(_cache['results'])} jobs analyzed")
 
 
@@ -154,33 +507,44 @@ class JobAnalyzerAgent(AgentBase):
     """
     Analyzes all job postings with LLM to extract implicit requirements and
     culture signals. Results are cached at process level, keyed by file mtime.
+    A changed catalog is refreshed in the background (stale-while-revalidate);
+    only a cold cache makes the request wait for the analysis.
     使用 LLM 分析所有职位发布信息，提取隐含要求和文化信号。结果以文件修改时间为键，缓存到进程级别。
+    岗位文件变化时后台刷新缓存，请求继续使用旧的分析结果，仅冷启动时需要等待。
     """
     name = "job_analyzer"
-    timeout = 180.0     # up to N jobs × ~3s each, bounded by asyncio.gather concurrency
+    timeout = 180.0     # cold start only: up to N jobs × ~3s each, bounded by asyncio.gather concurrency
+    inputs = ()
+    outputs = ("analyzed_jobs",)
 
     async def run(self, ctx: AgentContext) -> AgentContext:
         current_mtime = _get_mtime()
 
-        # Fast path: cache is valid — no lock needed for reads
+        # Fast path: cache is valid
         if _cache["mtime"] is not None and _cache["mtime"] == current_mtime and _cache["results"]:
             logger.info(
                 f"[{ctx.request_id}] JD cache hit — {len(_cache['results'])} jobs, skipping LLM analysis"
             )
+            JD_CACHE_READS.labels(result="hit").inc()
             ctx.analyzed_jobs = list(_cache["results"].values())
             return ctx
 
-        # Slow path: cache miss — acquire lock so only ONE coroutine rebuilds
-        logger.info(f"[{ctx.request_id}] JD cache miss/invalidated — acquiring lock...")
-        async with _cache_lock:
-            # Double-check inside lock: another coroutine may have rebuilt while we waited
-            if _cache["mtime"] == current_mtime and _cache["results"]:
-                logger.info(f"[{ctx.request_id}] JD cache populated by another coroutine, reusing")
-                ctx.analyzed_jobs = list(_cache["results"].values())
-                return ctx
+        refresh = _ensure_refresh(current_mtime)
 
-            logger.info(f"[{ctx.request_id}] Rebuilding JD cache...")
-            await _rebuild_cache(current_mtime)
+        # Stale: serve the last good analyses while the single refresh task runs
+        if _cache["results"]:
+            ctx.analyzed_jobs = list(_stale_results(current_mtime).values())
+            logger.info(
+                f"[{ctx.request_id}] JD cache stale — serving {len(ctx.analyzed_jobs)} jobs, refreshing in background"
+            )
+            JD_CACHE_READS.labels(result="stale").inc()
+            return ctx
+
+        # Cold: nothing to serve yet — wait for the refresh (shielded, so a
+        # cancelled request does not abort the rebuild other requests wait for)
+        logger.info(f"[{ctx.request_id}] JD cache cold — waiting for analysis...")
+        JD_CACHE_READS.labels(result="cold").inc()
+        await asyncio.shield(refresh)
 
         ctx.analyzed_jobs = list(_cache["results"].values())
         logger.info(f"[{ctx.request_id}] JD analysis complete: {len(ctx.analyzed_jobs)} jobs cached")
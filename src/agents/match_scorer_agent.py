@@ -11,10 +11,21 @@ from functools import partial
 
 from src.agents.base import AgentBase, AgentContext
 from src.api.routes import get_five_dim_scorer
+from src.core.app_config import get_app_config
+from src.core.deadline import run_in_executor
+from src.services.candidate_store import candidate_fingerprint, index_candidate
+from src.services.score_store import score_incremental
 
 logger = logging.getLogger(__name__)
 
 
+def _log_indexing_result(request_id: str, fut: asyncio.Future) -> None:
+    if fut.cancelled():
+        return
+    if fut.exception() is not None:
+        logger.warning(f"[{request_id}] Candidate indexing failed: {fut.exception()}")
+
+
 class MatchScorerAgent(AgentBase):
     """
     Extracts JobPosting objects from ctx.analyzed_jobs and runs 5-dimension
@@ -24,6 +35,8 @@ class MatchScorerAgent(AgentBase):
     """
     name = "match_scorer"
     timeout = 180.0
+    inputs = ("candidate_profile", "analyzed_jobs")
+    outputs = ("scored_results",)
 
     async def run(self, ctx: AgentContext) -> AgentContext:
         # 前置条件检查：确保 resume_parser 和 job_analyzer 已成功运行
@@ -39,12 +52,19 @@ class MatchScorerAgent(AgentBase):
         logger.info(f"[{ctx.request_id}] MatchScorerAgent: scoring {len(postings)} jobs (5-dim)...")
         # 批量评分（顺序执行）。当多个线程并发调用 `SentenceTransformer.encode()` 时，`ThreadPoolExecutor` 会导致 PyTorch 死锁。请改为顺序执行。
         # Returns: list sorted by final_score descending top_k. 
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None, partial(scorer.score_batch, candidate, postings, ctx.top_k)
-        )
+        # 已知候选人只对新增/修改的岗位评分，其余复用已持久化的分数
+        fingerprint = candidate_fingerprint(candidate.resume_text)
+        results = await run_in_executor(score_incremental, scorer, candidate, fingerprint, postings, ctx.top_k)
         ctx.scored_results = results
 
+        # 将候选人写入候选人库（反向匹配用）：后台执行，不占用关键路径，失败不影响正向评分
+        if get_app_config().CANDIDATE_STORE_ENABLED:
+            loop = asyncio.get_event_loop()
+            indexing = loop.run_in_executor(
+                None, partial(index_candidate, scorer, ctx.candidate_profile)
+            )
+            indexing.add_done_callback(partial(_log_indexing_result, ctx.request_id))
+
         # 前 3 个推荐的维度拆解
         for i, r in enumerate(results[:3], 1):
             logger.info(
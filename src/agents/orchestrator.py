@@ -1,32 +1,49 @@
 """
-OrchestratorAgent: 3-phase DAG execution.
+OrchestratorAgent: dependency-driven DAG execution.
 
-Phase 1 (parallel): ResumeParserAgent  ||  JobAnalyzerAgent
-Phase 2 (parallel): MatchScorerAgent   ||  CareerPathPredictorAgent
-Phase 3 (serial):   InsightGeneratorAgent
+Each agent declares the ctx fields it reads (inputs) and writes (outputs);
+DagScheduler starts it as soon as its inputs are written:
+
+  ResumeParserAgent ──┬──► CareerPathPredictorAgent ───────────────────┐
+                      ├──► MatchScorerAgent ──┬──► InsightGeneratorAgent ◄┤
+  JobAnalyzerAgent ───┘                       └──► CounterfactualCareerAgent (top-k only)
+
+InsightGeneratorAgent starts on scored_results alone; each per-job insight
+then waits only for the career prediction and that job's own counterfactual
+path, so it never waits for the slowest job of an upstream agent.
+CounterfactualCareerAgent generates paths for the scored top-k only
+(optionally starting early on FAISS-recalled jobs).
+
+Deadline:
+  ctx.deadline bounds the whole DAG; when the caller did not set one it is
+  REQUEST_TIMEOUT_SECONDS (minus DEADLINE_MARGIN_SECONDS) from the start of run().
+  Agents, LLM calls and executor jobs all time out against what is left.
 
 Error handling:
   - Each agent captures its own exceptions into ctx.errors (non-fatal)
-  - ResumeParserAgent failure aborts Phase 2+3 (nothing to score)
-  - MatchScorerAgent failure aborts Phase 3 (nothing to explain)
+  - ResumeParserAgent failure skips every downstream agent (nothing to score)
+  - MatchScorerAgent failure skips InsightGeneratorAgent (nothing to explain)
   - JobAnalyzerAgent failure: fallback to unenriched JobPostings
   - CareerPathPredictorAgent failure: insight proceeds without career context
+  - CounterfactualCareerAgent failure: insight proceeds without per-job paths
 
-OrchestratorAgent：三阶段 DAG 执行。
+OrchestratorAgent：基于依赖的 DAG 执行。
+每个 Agent 声明读取（inputs）与写入（outputs）的 ctx 字段，
+DagScheduler 在输入写入后立即启动该 Agent，不再有阶段屏障。
+InsightGeneratorAgent 只依赖 scored_results 启动；每个岗位的洞察只等待职业预测
+和该岗位自己的反事实路径。CounterfactualCareerAgent 仅为评分 top-k 生成轨迹。
 
-阶段 1（并行）：ResumeParserAgent || JobAnalyzerAgent
-阶段 2（并行）：MatchScorerAgent || CareerPathPredictorAgent
-阶段 3（串行）：InsightGeneratorAgent
+截止时间：ctx.deadline 约束整个 DAG，未设置时取 REQUEST_TIMEOUT_SECONDS（减去余量）。
 
 错误处理：
 - 每个代理将自身的异常捕获到 ctx.errors 中（非致命异常）
-- ResumeParserAgent 失败：中止阶段 2 和阶段 3（因为没有需要评分的内容）
-- MatchScorerAgent 失败：中止阶段 3（因为没有需要解释的内容）
+- ResumeParserAgent 失败：跳过所有下游 Agent（因为没有需要评分的内容）
+- MatchScorerAgent 失败：跳过 InsightGeneratorAgent（因为没有需要解释的内容）
 - JobAnalyzerAgent 失败：回退到未增强的 JobPostings
 - CareerPathPredictorAgent 失败：在没有职业背景信息的情况下继续进行洞察分析
+- CounterfactualCareerAgent 失败：洞察中不包含每个岗位的专属轨迹
 """
 
-import asyncio
 import logging
 
 from src.agents.base import AgentContext
@@ -36,6 +53,9 @@ from src.agents.match_scorer_agent import MatchScorerAgent
 from src.agents.career_path_predictor_agent import CareerPathPredictorAgent
 from src.agents.counterfactual_career_agent import CounterfactualCareerAgent
 from src.agents.insight_generator_agent import InsightGeneratorAgent
+from src.agents.scheduler import DagScheduler
+from src.core.app_config import get_app_config
+from src.core.deadline import deadline_in
 from src.models.agent_schemas import AnalyzedJob
 from src.services.job_loader import load_jobs
 from src.services.job_adapter import jobs_to_postings
@@ -43,82 +63,40 @@ from src.services.job_adapter import jobs_to_postings
 logger = logging.getLogger(__name__)
 
 
+def _fallback_unenriched_jobs(ctx: AgentContext) -> None:
+    """JD analysis failed: load raw postings so scoring can continue."""
+    # 用原始 job_mock.json 加载职位，转成 JobPosting。
+    raw_jobs = load_jobs()
+    postings = jobs_to_postings(raw_jobs)
+    # 构造"空壳" AnalyzedJob（没有隐含要求和文化信号），让后面的打分仍然能跑。
+    ctx.analyzed_jobs = [
+        AnalyzedJob(posting=p, company=raw_jobs[i].get("company", ""))
+        for i, p in enumerate(postings)
+    ]
+
+
 class OrchestratorAgent:
-    """Coordinates all specialist agents in a 3-phase DAG."""
+    """Coordinates all specialist agents as a dependency-driven DAG."""
 
     def __init__(self) -> None:
         self.parser          = ResumeParserAgent()          # 解析简历
         self.analyzer        = JobAnalyzerAgent()           # 分析JD
         self.scorer          = MatchScorerAgent()           # 对JD进行五维评分
-        self.predictor       = CareerPathPredictorAgent()   # 预测岇位无关全局职业轨迹
+        self.predictor       = CareerPathPredictorAgent()   # 预测岗位无关全局职业轨迹
         self.counterfactual  = CounterfactualCareerAgent()  # 针对每个岗位的反事实轨迹
         self.insight         = InsightGeneratorAgent()      # 生成 per-job insight + overall summary
 
-    async def run(self, ctx: AgentContext) -> AgentContext:
-        # ── Phase 1: Resume parse + JD analysis (parallel) ───────────────────
-        logger.info(f"[{ctx.request_id}] Orchestrator Phase 1 — parse + analyze (parallel)")
-        await asyncio.gather(
-            self.parser(ctx),
-            self.analyzer(ctx),
-        )
-
-        # Resume parsing is a hard dependency — abort if it failed
-        # 简历是硬依赖，解析失败整个 pipeline 直接中止。
-        if "resume_parser" in ctx.errors:
-            logger.error(
-                f"[{ctx.request_id}] ResumeParserAgent failed ({ctx.errors['resume_parser']}), aborting pipeline"
-            )
-            return ctx
-
-        # JD analysis failure: fall back to unenriched postings so scoring can continue
-        if "job_analyzer" in ctx.errors:
-            logger.warning(
-                f"[{ctx.request_id}] JobAnalyzerAgent failed ({ctx.errors['job_analyzer']}), "
-                "falling back to unenriched job postings"
-            )
-            # 用原始 job_mock.json 加载职位，转成 JobPosting。
-            raw_jobs = load_jobs()
-            postings = jobs_to_postings(raw_jobs)
-            # 构造“空壳” AnalyzedJob（没有隐含要求和文化信号），让后面的打分仍然能跑。
-            ctx.analyzed_jobs = [
-                AnalyzedJob(posting=p, company=raw_jobs[i].get("company", ""))
-                for i, p in enumerate(postings)
-            ]
-
-        # ── Phase 2: Scoring + Career prediction + Counterfactual paths (parallel) ──
-        logger.info(f"[{ctx.request_id}] Orchestrator Phase 2 — score + predict + counterfactual (parallel)")
-        await asyncio.gather(
-            self.scorer(ctx),
-            self.predictor(ctx),
-            self.counterfactual(ctx),
+        self.scheduler = DagScheduler(
+            [self.parser, self.analyzer, self.scorer, self.predictor, self.counterfactual, self.insight],
+            fallbacks={self.analyzer.name: _fallback_unenriched_jobs},
         )
 
-        # Scoring is a hard dependency for Phase 3
-        # Scoring 是 Phase 3 的硬依赖（没有评分就没办法生成 job-level insights），直接中止。
-        if "match_scorer" in ctx.errors:
-            logger.error(
-                f"[{ctx.request_id}] MatchScorerAgent failed ({ctx.errors['match_scorer']}), aborting pipeline"
-            )
-            return ctx
-
-        # Insight 还能继续，只是 prompt 里少了 career context。
-        if "career_predictor" in ctx.errors:
-            logger.warning(
-                f"[{ctx.request_id}] CareerPathPredictorAgent failed ({ctx.errors['career_predictor']}), "
-                "insight will proceed without generic career context"
-            )
-
-        # Counterfactual failure is non-fatal; per-job paths will be absent in the report.
-        # 反事实轨迹失败是非致命的；报告中不会包含每个岗位的专属轨迹。
-        if "counterfactual_career" in ctx.errors:
-            logger.warning(
-                f"[{ctx.request_id}] CounterfactualCareerAgent failed ({ctx.errors['counterfactual_career']}), "
-                "insight will proceed without per-job career paths"
-            )
-
-        # ── Phase 3: Insight synthesis (serial) ──────────────────────────────
-        logger.info(f"[{ctx.request_id}] Orchestrator Phase 3 — generate insights")
-        await self.insight(ctx)
+    async def run(self, ctx: AgentContext) -> AgentContext:
+        if ctx.deadline is None:
+            cfg = get_app_config()
+            ctx.deadline = deadline_in(cfg.REQUEST_TIMEOUT_SECONDS - cfg.DEADLINE_MARGIN_SECONDS)
+        logger.info(f"[{ctx.request_id}] Orchestrator starting DAG (budget {ctx.remaining():.0f}s)")
+        await self.scheduler.run(ctx)
 
         error_summary = ctx.errors or "none"
         logger.info(f"[{ctx.request_id}] Orchestrator complete. Errors: {error_summary}")
@@ -1,12 +1,10 @@
 """
 ResumeParserAgent：PDF/DOCX 文本提取 + Moonshot 结构化解析。
 
-封装了 run_in_executor 中现有的同步 resume_parser 服务。
+直接 await 异步的 resume_parser 服务：文本提取在进程池中执行，LLM 调用走共享异步客户端。
 """
 
-import asyncio
 import logging
-from functools import partial
 
 from src.agents.base import AgentBase, AgentContext
 from src.models.agent_schemas import ResumeProfile
@@ -19,18 +17,16 @@ logger = logging.getLogger(__name__)
 class ResumeParserAgent(AgentBase):
     name = "resume_parser"
     timeout = 90.0          # PDF parse + Moonshot call can take ~30s
+    inputs = ()
+    outputs = ("candidate_profile",)
 
     async def run(self, ctx: AgentContext) -> AgentContext:
         logger.info(f"[{ctx.request_id}] ResumeParserAgent: parsing {ctx.filename!r}...")
-        loop = asyncio.get_event_loop()
 
-        # PDF/DOCX 解析 + LLM 调用都是同步的，放到 executor 里跑避免阻塞事件循环
-        # 默认使用 ThreadPoolExecutor，因为 PDF 解析和 HTTP 请求都是 I/O 密集型的
-        # parse_resume_file is sync (pdfplumber + sync OpenAI) — run in executor
-        # PDF文件 → pdfplumber提取纯文本 → OpenAI LLM结构化解析 → parsed字典
-        parsed = await loop.run_in_executor(
-            None, partial(parse_resume_file, ctx.file_bytes, ctx.filename)
-        )
+        # parse_resume_file is fully async: extraction awaits the process pool,
+        # the LLM step uses the shared async client — no executor thread is held
+        # PDF/DOCX 文件 → 进程池提取纯文本 → 异步 LLM 结构化解析 → parsed字典
+        parsed = await parse_resume_file(ctx.file_bytes, ctx.filename)
         # 未进一步处理的原始LLM输出，不是完全结构化数据。
         raw = parsed.get("raw", {})
 
@@ -0,0 +1,92 @@
+"""
+DagScheduler: dependency-driven agent execution.
+
+Every agent declares `inputs` (ctx fields it needs) and `outputs` (ctx fields
+it writes). All agents are launched as tasks up front; each one waits on the
+readiness signals of its inputs and starts the moment they are written, so
+end-to-end latency follows the critical path instead of phase barriers.
+
+Rules:
+  - An agent whose required input is still empty once ready (its producer
+    failed or was skipped) is skipped — mirroring the old "abort" branches.
+  - Outputs are marked ready when an agent finishes, fails or is skipped, so
+    downstream waiters are never left hanging.
+  - An optional per-agent fallback runs when the agent records an error,
+    before its outputs are released (e.g. unenriched job postings).
+  - ctx fields that no scheduled agent produces are ready from the start.
+  - ctx.deadline is bound as the request deadline for every agent task, so
+    LLM calls and executor jobs inside them share the request's budget.
+
+DagScheduler：基于依赖声明的 Agent 调度。
+每个 Agent 声明 inputs / outputs；所有 Agent 一开始即作为任务启动，
+各自等待输入字段就绪后立即运行，端到端延迟趋近真实关键路径。
+- 必需输入在就绪后仍为空（上游失败或被跳过）时，跳过该 Agent
+- Agent 完成、失败或被跳过后都会标记其输出就绪，下游不会永久等待
+- 可为 Agent 配置失败回退，在释放输出前执行
+- 没有任何 Agent 产出的字段在开始时即视为就绪
+- ctx.deadline 绑定到所有 Agent 任务，LLM 调用与 executor 任务共享同一请求预算
+"""
+
+import asyncio
+import logging
+from dataclasses import fields
+from typing import Callable, Optional
+
+from src.agents.base import AgentBase, AgentContext
+from src.core.deadline import request_deadline
+
+logger = logging.getLogger(__name__)
+
+Fallback = Callable[[AgentContext], None]
+
+
+class DagScheduler:
+    """Runs a set of agents as a DAG derived from their inputs/outputs."""
+
+    def __init__(
+        self,
+        agents: list[AgentBase],
+        fallbacks: Optional[dict[str, Fallback]] = None,
+    ) -> None:
+        producers: dict[str, str] = {}
+        for agent in agents:
+            for out in agent.outputs:
+                if out in producers:
+                    raise ValueError(f"ctx.{out} is produced by both {producers[out]} and {agent.name}")
+                producers[out] = agent.name
+        for agent in agents:
+            missing = [f for f in agent.inputs if f not in producers]
+            if missing:
+                raise ValueError(f"{agent.name} needs {missing}, which no scheduled agent produces")
+
+        self.agents = agents
+        self.fallbacks = fallbacks or {}
+        self._produced = set(producers)
+
+    async def _run_node(self, agent: AgentBase, ctx: AgentContext) -> None:
+        try:
+            await ctx.wait_for(*agent.inputs)
+            empty = [f for f in agent.inputs if not getattr(ctx, f)]
+            if empty:
+                logger.warning(f"[{ctx.request_id}] Skipping {agent.name}: upstream {empty} unavailable")
+                return
+
+            logger.info(f"[{ctx.request_id}] Scheduler starting {agent.name}")
+            await agent(ctx)
+
+            fallback = self.fallbacks.get(agent.name)
+            if agent.name in ctx.errors and fallback is not None:
+                logger.warning(f"[{ctx.request_id}] {agent.name} failed ({ctx.errors[agent.name]}), applying fallback")
+                fallback(ctx)
+        finally:
+            for out in agent.outputs:
+                ctx.mark_ready(out)
+
+    async def run(self, ctx: AgentContext) -> AgentContext:
+        for f in fields(ctx):
+            if not f.name.startswith("_") and f.name not in self._produced:
+                ctx.mark_ready(f.name)
+
+        with request_deadline(ctx.deadline):   # tasks copy the context when created
+            await asyncio.gather(*[self._run_node(agent, ctx) for agent in self.agents])
+        return ctx
@@ -14,6 +14,7 @@ from prometheus_fastapi_instrumentator import Instrumentator
 from src.api.routes import router, get_five_dim_scorer
 from src.api.routes_v2 import router_v2
 from src.api.routes_logs import router as logs_router
+from src.services.circuit_breaker import get_llm_breaker
 
 # Configure logging to file + console
 # Use /var/log in Docker, fallback to ./logs locally
@@ -74,8 +75,10 @@ async def _prewarm():
     Pre-warm JD cache (Moonshot LLM analysis) concurrently.
     Both run at startup so the first real request pays zero cold-start cost.
     """
-    from src.agents.job_analyzer_agent import prewarm as prewarm_jd_cache
+    from src.agents.job_analyzer_agent import prewarm as prewarm_jd_cache, start_refresher
 
+    # JD refreshes run on this loop; periodic refresh when JD_CACHE_REFRESH_INTERVAL > 0
+    start_refresher()
     logger.info("[startup] Pre-warming FiveDimScorer + JD cache...")
     loop = asyncio.get_event_loop()
     await asyncio.gather(
@@ -85,10 +88,30 @@ async def _prewarm():
     logger.info("[startup] Pre-warm complete.")
 
 
+@app.on_event("shutdown")
+def _stop_jd_refresher():
+    """Stop the background JD cache refresher / 停止 JD 缓存后台刷新"""
+    from src.agents.job_analyzer_agent import stop_refresher
+    stop_refresher()
+
+
+@app.on_event("shutdown")
+def _shutdown_extractor():
+    """Stop the resume extraction worker processes / 关闭简历提取进程池"""
+    from src.services.document_extractor import shutdown_pool
+    shutdown_pool()
+
+
 @app.get("/")
 def root():
     return {"message": "Semantic Job Matcher ML API is running", "version": "0.1.0"}
 
 @app.get("/health")
 def health():
-    return {"status": "healthy"}
+    # Always 200 (liveness): an open LLM circuit degrades answers, it does not
+    # make the process unhealthy. 熔断打开时返回 degraded，但仍为 200。
+    circuit = get_llm_breaker().snapshot()
+    return {
+        "status": "healthy" if circuit["state"] == "closed" else "degraded",
+        "llm_circuit": circuit,
+    }
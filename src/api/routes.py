@@ -36,6 +36,11 @@ def get_five_dim_scorer() -> FiveDimScorer:
     if _five_dim_scorer is None:
         logger.info("Initializing FiveDimScorer singleton...")
         _five_dim_scorer = FiveDimScorer()
+        # 岗位库加载时构建薪资表（v1 路由与 Celery 任务每次请求都重新 load_jobs，按 job_id 命中）
+        try:
+            _five_dim_scorer.salary.prepare_catalog(jobs_to_postings(load_jobs()))
+        except Exception as e:
+            logger.warning(f"Salary table not prepared, scoring salaries per request: {e}")
     return _five_dim_scorer
 
 # 输入模型（前端简历传过来）
@@ -78,7 +83,7 @@ def _build_match_response(explain_jobs: list[dict]) -> MatchResponse:
                 score=d.get("score", 0),
                 weight=d.get("weight", 0),
                 weighted_score=d.get("weighted_score", 0),
-                details=d.get("details", {}),
+                details=d.get("details") or {},
             )
             for dim, d in five_dim_raw.items()
         } if five_dim_raw else None
@@ -143,13 +148,13 @@ async def match_resume(resume_input: ResumeInput):
     )
 
     results = await asyncio.get_event_loop().run_in_executor(
-        None, partial(scorer.score_batch, candidate, job_postings, top_k=resume_input.top_k)
+        None, partial(scorer.score_rows, candidate, job_postings, top_k=resume_input.top_k, with_details=True)
     )
 
     # 将五维结果转为 explain_match_loop 兼容格式
     job_meta_map = {j.get("job_id"): j for j in all_jobs}
     matched_jobs = [
-        five_dim_result_to_job_dict(r, job_meta_map.get(r.job_id, {}))
+        five_dim_result_to_job_dict(r, job_meta_map.get(r["job_id"], {}))
         for r in results
     ]
 
@@ -184,9 +189,7 @@ async def match_resume_file_org(
     
     try:
         logger.info(f"[{request_id}] 🔍 Parsing resume file...")
-        parsed = await asyncio.get_event_loop().run_in_executor(
-            None, partial(parse_resume_file, file_bytes, file.filename)
-        )
+        parsed = await parse_resume_file(file_bytes, file.filename)
         logger.info(f"[{request_id}] ✅ Resume parsed successfully")
         logger.info(f"[{request_id}] Extracted text length: {len(parsed.get('text', ''))} characters")
         logger.info(f"[{request_id}] Extracted skills: {parsed.get('skills', [])}")
@@ -279,10 +282,8 @@ async def match_resume_file(
     logger.info(f"[{request_id}] 📄 Size: {len(file_bytes)/1024:.1f} KB")
 
     try:
-        # parse_resume_file calls sync Moonshot API – run in executor to avoid blocking event loop
-        parsed = await asyncio.get_event_loop().run_in_executor(
-            None, partial(parse_resume_file, file_bytes, file.filename)
-        )
+        # parse_resume_file is async: process-pool extraction + async Moonshot call
+        parsed = await parse_resume_file(file_bytes, file.filename)
         logger.info(f"[{request_id}] ✅ Parsed | skills={parsed.get('skills', [])}")
     except Exception as e:
         logger.error(f"[{request_id}] ❌ Parse failed: {e}", exc_info=True)
@@ -309,22 +310,24 @@ async def match_resume_file(
 
     logger.info(f"[{request_id}] 🔎 Scoring {len(job_postings)} jobs (5-dim)...")
     results = await asyncio.get_event_loop().run_in_executor(
-        None, partial(scorer.score_batch, candidate, job_postings, top_k=top_k)
+        None, partial(scorer.score_rows, candidate, job_postings, top_k=top_k, with_details=True)
     )
     logger.info(f"[{request_id}] ✅ Top-{len(results)} results ready")
 
     # 打印 Top-3 评分详情
     for i, r in enumerate(results[:3], 1):
+        dims = r["five_dim_score"]
         logger.info(
-            f"[{request_id}] #{i} {r.job_id} | final={r.final_score:.3f} | "
-            f"sem={r.semantic.score:.2f} skill={r.skill_graph.score:.2f} "
-            f"sen={r.seniority.score:.2f} cul={r.culture.score:.2f} sal={r.salary.score:.2f}"
+            f"[{request_id}] #{i} {r['job_id']} | final={r['final_score']:.3f} | "
+            f"sem={dims['semantic']['score']:.2f} skill={dims['skill_graph']['score']:.2f} "
+            f"sen={dims['seniority']['score']:.2f} cul={dims['culture']['score']:.2f} "
+            f"sal={dims['salary']['score']:.2f}"
         )
 
     # ── 5. 转换为 LLM 解释器兼容格式 ──────────────────────
     job_meta_map = {j.get("job_id"): j for j in all_jobs}
     matched_jobs = [
-        five_dim_result_to_job_dict(r, job_meta_map.get(r.job_id, {}))
+        five_dim_result_to_job_dict(r, job_meta_map.get(r["job_id"], {}))
         for r in results
     ]
 
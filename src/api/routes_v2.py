@@ -2,24 +2,37 @@
 V2 API routes — multi-agent pipeline.
 
 POST /api/v2/match_resume_file        Sync endpoint (blocks until done, ~15-25s)
+POST /api/v2/match_resume_stream      Streaming endpoint — SSE events as each agent finishes
 POST /api/v2/match_resume_async       Async endpoint — returns task_id immediately (<100ms)
 GET  /api/v2/result/{task_id}         Poll for async task result
+GET  /api/v2/job/{job_id}/candidates   Reverse match — rank stored candidates for a job
+DELETE /api/v2/candidates/{id}        Remove a stored candidate from reverse matching
 GET  /api/v2/jd_cache/status          Inspect JD cache state
 DELETE /api/v2/jd_cache               Manually invalidate JD cache
 """
 
 import asyncio
+import json
 import logging
 from datetime import datetime
+from functools import partial
 from typing import Any, Optional
 
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, Request, UploadFile, File
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from src.agents.base import AgentContext
 from src.agents.orchestrator import OrchestratorAgent
-from src.agents.job_analyzer_agent import _cache as _jd_cache
+from src.agents.job_analyzer_agent import _cache as _jd_cache, refresh_status as _jd_refresh_status
+from src.api.routes import get_five_dim_scorer
 from src.core.app_config import get_app_config
+from src.core.deadline import deadline_in
+from src.core.metrics import PIPELINE_CANCELLED
+from src.services.candidate_store import get_candidate_store, match_candidates_for_job
+from src.services.jd_store import get_jd_store
+from src.services.job_adapter import jobs_to_postings
+from src.services.job_loader import load_jobs
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +46,9 @@ _sync_semaphore = asyncio.Semaphore(_cfg.MAX_CONCURRENT_REQUESTS)
 # Process-level orchestrator singleton (agents hold no mutable state between requests)
 _orchestrator = OrchestratorAgent()
 
+# How often the sync endpoint checks whether its client is still connected
+_DISCONNECT_POLL_SECONDS = 0.5
+
 ALLOWED_TYPES = {
     "application/pdf",
     "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
@@ -108,11 +124,154 @@ class MatchV2Response(BaseModel):
     errors: dict
     timings: dict          # agent_name → elapsed seconds
 
+class ScoredJobOut(BaseModel):
+    job_id: str
+    job_title: str
+    company: str
+    score: float
+    five_dim_score: dict
+
+class CandidateMatchOut(BaseModel):
+    candidate_id: str
+    name: str
+    current_title: str
+    seniority: Optional[str]
+    years_of_experience: Optional[float]
+    skills: list[str]
+    score: float
+    five_dim_score: dict
+
+class JobCandidatesResponse(BaseModel):
+    job_id: str
+    job_title: str
+    total_candidates: int
+    candidates: list[CandidateMatchOut]
+
+
+# ── Dataclass → response model converters ────────────────────────────────────
+
+def _decision_gate_out(gate) -> Optional[DecisionGateOut]:
+    if gate is None:
+        return None
+    return DecisionGateOut(
+        year=gate.year,
+        question=gate.question,
+        option_A=gate.option_A,
+        option_B=gate.option_B,
+        impact=gate.impact,
+    )
+
+
+def _milestone_out(m) -> MilestoneOut:
+    """Convert a Milestone dataclass (possibly with DecisionGate) to MilestoneOut."""
+    return MilestoneOut(
+        year=m.year, title=m.title, skills_needed=m.skills_needed,
+        decision_gate=_decision_gate_out(m.decision_gate),
+    )
+
+
+def _career_path_out(path) -> Optional[JobCareerPathOut]:
+    if path is None:
+        return None
+    return JobCareerPathOut(
+        job_id=path.job_id,
+        job_title=path.job_title,
+        company=path.company,
+        trajectory_summary=path.trajectory_summary,
+        milestones=[_milestone_out(m) for m in path.milestones],
+        key_risks=path.key_risks,
+    )
+
+
+def _candidate_summary_out(cp) -> CandidateSummaryOut:
+    return CandidateSummaryOut(
+        name=cp.name,
+        current_title=cp.current_title,
+        seniority=cp.seniority_self_reported,
+        years_of_experience=cp.years_of_experience,
+        skills=cp.skills,
+        career_objective=cp.career_objective,
+    )
+
+
+def _career_prediction_out(pred) -> Optional[CareerPredictionOut]:
+    if pred is None:
+        return None
+    return CareerPredictionOut(
+        current_level=pred.current_level,
+        target_role_in_5yr=pred.target_role_in_5yr,
+        milestones=[_milestone_out(m) for m in pred.milestones],
+        skill_gaps_to_bridge=pred.skill_gaps_to_bridge,
+        confidence_note=pred.confidence_note,
+    )
+
+
+def _job_insight_out(ji) -> JobInsightOut:
+    return JobInsightOut(
+        job_id=ji.job_id,
+        job_title=ji.job_title,
+        company=ji.company,
+        score=ji.score,
+        five_dim_score=ji.five_dim_score,
+        why_match=ji.why_match,
+        skill_gaps=ji.skill_gaps,
+        career_fit_commentary=ji.career_fit_commentary,
+        implicit_requirements=ji.implicit_requirements,
+        counterfactual_path=_career_path_out(ji.counterfactual_path),
+    )
+
+
+def _comparison_matrix_out(mx) -> JobComparisonMatrixOut:
+    return JobComparisonMatrixOut(
+        rows=[ComparisonRowOut(dimension=r.dimension, values=r.values) for r in mx.rows],
+        recommendation=mx.recommendation,
+    )
+
+
+def _request_deadline() -> float:
+    return deadline_in(_cfg.REQUEST_TIMEOUT_SECONDS - _cfg.DEADLINE_MARGIN_SECONDS)
+
+
+async def _run_unless_disconnected(request: Request, ctx: AgentContext) -> Optional[AgentContext]:
+    """
+    Run the orchestrator under a _sync_semaphore slot, polling the client
+    connection meanwhile. If the client goes away, the whole task tree is
+    cancelled (agents, in-flight LLM calls; executor jobs already running
+    finish in their thread but their results are dropped), the slot is freed
+    immediately and None is returned.
+    客户端断开时取消整个编排任务树并立即释放信号量，返回 None。
+    """
+    endpoint = request.url.path
+    async with _sync_semaphore:
+        if await request.is_disconnected():
+            PIPELINE_CANCELLED.labels(endpoint=endpoint, phase="queued").inc()
+            logger.warning(f"[{ctx.request_id}] Client left while queued — pipeline not started")
+            return None
+
+        run = asyncio.ensure_future(_orchestrator.run(ctx))
+        try:
+            while True:
+                done, _ = await asyncio.wait({run}, timeout=_DISCONNECT_POLL_SECONDS)
+                if done:
+                    return run.result()
+                if await request.is_disconnected():
+                    run.cancel()
+                    await asyncio.wait({run})      # let cancellation unwind before the slot is freed
+                    PIPELINE_CANCELLED.labels(endpoint=endpoint, phase="running").inc()
+                    logger.warning(
+                        f"[{ctx.request_id}] Client disconnected — pipeline cancelled "
+                        f"(finished: {sorted(ctx.timings.keys() - ctx.errors.keys())})"
+                    )
+                    return None
+        finally:
+            run.cancel()    # no-op once done; covers the handler itself being cancelled
+
 
 # ── Endpoints ─────────────────────────────────────────────────────────────────
 
 @router_v2.post("/match_resume_file", response_model=MatchV2Response)
 async def match_resume_file_v2(
+    request: Request,
     file: UploadFile = File(..., description="PDF or DOCX resume"),
     top_k: int = 3,
 ):
@@ -120,10 +279,10 @@ async def match_resume_file_v2(
     Synchronous multi-agent pipeline (blocks until done, ~15-25s).
     Limited to MAX_CONCURRENT_REQUESTS simultaneous calls; excess requests queue on
     the semaphore. For high-concurrency use POST /match_resume_async instead.
+    If the client disconnects, the pipeline is cancelled and its slot freed.
 
-    Phase 1 (parallel): ResumeParserAgent + JobAnalyzerAgent
-    Phase 2 (parallel): MatchScorerAgent + CareerPathPredictorAgent
-    Phase 3 (serial):   InsightGeneratorAgent
+    Agents run as a dependency DAG (see OrchestratorAgent): each starts as soon
+    as the ctx fields it needs have been written.
     """
     request_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
     logger.info(f"[{request_id}] V2 upload | {file.filename} | top_k={top_k}")
@@ -139,109 +298,32 @@ async def match_resume_file_v2(
         file_bytes=file_bytes,
         filename=file.filename or "",
         top_k=top_k,
+        deadline=_request_deadline(),   # time queued on the semaphore counts against the budget
     )
 
-    async with _sync_semaphore:
-        ctx = await _orchestrator.run(ctx)
+    ctx = await _run_unless_disconnected(request, ctx)
+    if ctx is None:
+        # Nobody is listening; 499 (client closed request) is for the access log only
+        raise HTTPException(status_code=499, detail="Client disconnected")
 
     # Hard abort: resume parsing must succeed
     if ctx.candidate_profile is None:
         error_detail = ctx.errors.get("resume_parser", "Unknown parse error")
         raise HTTPException(status_code=500, detail=f"Resume parsing failed: {error_detail}")
 
-    cp = ctx.candidate_profile
-
-    candidate_summary = CandidateSummaryOut(
-        name=cp.name,
-        current_title=cp.current_title,
-        seniority=cp.seniority_self_reported,
-        years_of_experience=cp.years_of_experience,
-        skills=cp.skills,
-        career_objective=cp.career_objective,
-    )
-
-    career_out: Optional[CareerPredictionOut] = None
-    if ctx.career_prediction:
-        pred = ctx.career_prediction
-        career_out = CareerPredictionOut(
-            current_level=pred.current_level,
-            target_role_in_5yr=pred.target_role_in_5yr,
-            milestones=[
-                MilestoneOut(
-                    year=m.year,
-                    title=m.title,
-                    skills_needed=m.skills_needed,
-                    decision_gate=DecisionGateOut(
-                        year=m.decision_gate.year,
-                        question=m.decision_gate.question,
-                        option_A=m.decision_gate.option_A,
-                        option_B=m.decision_gate.option_B,
-                        impact=m.decision_gate.impact,
-                    ) if m.decision_gate else None,
-                )
-                for m in pred.milestones
-            ],
-            skill_gaps_to_bridge=pred.skill_gaps_to_bridge,
-            confidence_note=pred.confidence_note,
-        )
-
-    def _milestone_out(m) -> MilestoneOut:
-        """Convert a Milestone dataclass (possibly with DecisionGate) to MilestoneOut."""
-        gate = None
-        if m.decision_gate:
-            gate = DecisionGateOut(
-                year=m.decision_gate.year,
-                question=m.decision_gate.question,
-                option_A=m.decision_gate.option_A,
-                option_B=m.decision_gate.option_B,
-                impact=m.decision_gate.impact,
-            )
-        return MilestoneOut(year=m.year, title=m.title, skills_needed=m.skills_needed, decision_gate=gate)
-
-    def _career_path_out(path) -> Optional[JobCareerPathOut]:
-        if path is None:
-            return None
-        return JobCareerPathOut(
-            job_id=path.job_id,
-            job_title=path.job_title,
-            company=path.company,
-            trajectory_summary=path.trajectory_summary,
-            milestones=[_milestone_out(m) for m in path.milestones],
-            key_risks=path.key_risks,
-        )
-
-    top_matches: list[JobInsightOut] = []
-    if ctx.insight_report:
-        for ji in ctx.insight_report.top_jobs:
-            top_matches.append(JobInsightOut(
-                job_id=ji.job_id,
-                job_title=ji.job_title,
-                company=ji.company,
-                score=ji.score,
-                five_dim_score=ji.five_dim_score,
-                why_match=ji.why_match,
-                skill_gaps=ji.skill_gaps,
-                career_fit_commentary=ji.career_fit_commentary,
-                implicit_requirements=ji.implicit_requirements,
-                counterfactual_path=_career_path_out(ji.counterfactual_path),
-            ))
-
+    top_matches = [_job_insight_out(ji) for ji in ctx.insight_report.top_jobs] if ctx.insight_report else []
     overall_summary = ctx.insight_report.overall_summary if ctx.insight_report else ""
     development_plan = ctx.insight_report.development_plan if ctx.insight_report else ""
 
     comparison_matrix_out: Optional[JobComparisonMatrixOut] = None
     if ctx.insight_report and ctx.insight_report.job_comparison_matrix:
-        mx = ctx.insight_report.job_comparison_matrix
-        comparison_matrix_out = JobComparisonMatrixOut(
-            rows=[ComparisonRowOut(dimension=r.dimension, values=r.values) for r in mx.rows],
-            recommendation=mx.recommendation,
-        )
+        comparison_matrix_out = _comparison_matrix_out(ctx.insight_report.job_comparison_matrix)
 
     logger.info(f"[{request_id}] V2 done | matches={len(top_matches)} | errors={ctx.errors or 'none'} | timings={ctx.timings}")
     return MatchV2Response(
         request_id=request_id,
-        candidate_summary=candidate_summary,
-        career_prediction=career_out,
+        candidate_summary=_candidate_summary_out(ctx.candidate_profile),
+        career_prediction=_career_prediction_out(ctx.career_prediction),
         top_matches=top_matches,
         overall_summary=overall_summary,
         development_plan=development_plan,
@@ -251,21 +333,189 @@ async def match_resume_file_v2(
     )
 
 
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event; pydantic models are dumped to JSON."""
+    payload = data.model_dump_json() if isinstance(data, BaseModel) else json.dumps(data, ensure_ascii=False)
+    return f"event: {event}\ndata: {payload}\n\n"
+
+
+def _stream_events(ctx: AgentContext, field_name: str, item: Optional[str]) -> list[str]:
+    """Map one AgentContext write to the SSE events it produces (possibly none)."""
+    if field_name == "candidate_profile" and item is None:
+        if ctx.candidate_profile is None:
+            detail = ctx.errors.get("resume_parser", "Unknown parse error")
+            return [_sse("error", {"detail": f"Resume parsing failed: {detail}"})]
+        return [_sse("candidate_summary", _candidate_summary_out(ctx.candidate_profile))]
+
+    if field_name == "scored_results" and item is None and ctx.scored_results:
+        analyzed_map = {aj.posting.job_id: aj for aj in ctx.analyzed_jobs}
+        scored = [
+            ScoredJobOut(
+                job_id=r.job_id,
+                job_title=analyzed_map[r.job_id].posting.title if r.job_id in analyzed_map else "",
+                company=analyzed_map[r.job_id].company if r.job_id in analyzed_map else "",
+                score=r.final_score,
+                five_dim_score=r.dimension_dicts(),
+            )
+            for r in ctx.scored_results
+        ]
+        return [_sse("scored_results", [s.model_dump() for s in scored])]
+
+    if field_name == "career_prediction" and item is None and ctx.career_prediction:
+        return [_sse("career_prediction", _career_prediction_out(ctx.career_prediction))]
+
+    if field_name == "job_insights" and item is not None:
+        insight = next((ji for ji in ctx.job_insights if ji.job_id == item), None)
+        return [_sse("job_insight", _job_insight_out(insight))] if insight else []
+
+    if field_name == "insight_report" and ctx.insight_report:
+        report = ctx.insight_report
+        events = [_sse("summary", {
+            "overall_summary": report.overall_summary,
+            "development_plan": report.development_plan,
+        })]
+        if report.job_comparison_matrix:
+            events.append(_sse("comparison_matrix", _comparison_matrix_out(report.job_comparison_matrix)))
+        return events
+
+    return []
+
+
+@router_v2.post("/match_resume_stream")
+async def match_resume_stream_v2(
+    request: Request,
+    file: UploadFile = File(..., description="PDF or DOCX resume"),
+    top_k: int = 3,
+):
+    """
+    Streaming multi-agent pipeline over Server-Sent Events.
+    Same DAG and concurrency limit as /match_resume_file, but every result is
+    pushed the moment its agent writes it to AgentContext:
+
+      candidate_summary → scored_results → career_prediction → job_insight (one
+      per job, in completion order) → summary → comparison_matrix → done
+
+    An `error` event is sent instead of candidate_summary if parsing fails, and
+    before `done` if the pipeline itself raises.
+    流式多智能体接口（SSE）：各 Agent 写入结果后立即推送，首个有效字节约等于简历解析耗时。
+    """
+    request_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    logger.info(f"[{request_id}] V2 stream upload | {file.filename} | top_k={top_k}")
+
+    if file.content_type not in ALLOWED_TYPES:
+        raise HTTPException(status_code=400, detail="Only PDF/DOCX supported.")
+
+    file_bytes = await file.read()
+    ctx = AgentContext(
+        request_id=request_id,
+        file_bytes=file_bytes,
+        filename=file.filename or "",
+        top_k=top_k,
+        deadline=_request_deadline(),   # time queued on the semaphore counts against the budget
+    )
+    updates = ctx.subscribe()
+
+    async def _events():
+        async with _sync_semaphore:
+            run = asyncio.ensure_future(_orchestrator.run(ctx))
+            run.add_done_callback(lambda _: updates.put_nowait(None))
+            try:
+                while (update := await updates.get()) is not None:
+                    for event in _stream_events(ctx, *update):
+                        yield event
+                try:
+                    await run
+                except Exception as e:  # headers are already sent: report it in-stream
+                    logger.error(f"[{request_id}] V2 stream pipeline failed: {e}", exc_info=True)
+                    ctx.errors.setdefault("orchestrator", str(e))
+                    yield _sse("error", {"detail": f"Pipeline failed: {e}"})
+            finally:
+                if not run.done():      # client went away mid-stream (generator closed)
+                    run.cancel()
+                    PIPELINE_CANCELLED.labels(endpoint=request.url.path, phase="running").inc()
+
+        logger.info(f"[{request_id}] V2 stream done | errors={ctx.errors or 'none'} | timings={ctx.timings}")
+        yield _sse("done", {"request_id": request_id, "errors": ctx.errors, "timings": ctx.timings})
+
+    return StreamingResponse(
+        _events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router_v2.get("/job/{job_id}/candidates", response_model=JobCandidatesResponse)
+async def match_job_candidates(job_id: str, top_k: int = 10):
+    """
+    Reverse matching: rank stored candidates for one job.
+    FAISS recall over the candidate index, then the same five-dim rerank as
+    resume → jobs, using the stored embeddings (no resume is re-parsed).
+    """
+    analyzed = _jd_cache.get("results", {}).get(job_id)
+    if analyzed is not None:
+        posting = analyzed.posting
+    else:
+        posting = next((p for p in jobs_to_postings(load_jobs()) if p.job_id == job_id), None)
+    if posting is None:
+        raise HTTPException(status_code=404, detail=f"Job {job_id!r} not found.")
+
+    store = get_candidate_store()
+    loop = asyncio.get_event_loop()
+    ranked, pool = await loop.run_in_executor(
+        None, partial(match_candidates_for_job, get_five_dim_scorer(), posting, top_k, store)
+    )
+
+    candidates = []
+    for rec, score in ranked:
+        cp = rec.profile
+        candidates.append(CandidateMatchOut(
+            candidate_id=rec.candidate_id,
+            name=cp.name,
+            current_title=cp.current_title,
+            seniority=cp.seniority_self_reported,
+            years_of_experience=cp.years_of_experience,
+            skills=cp.skills,
+            score=score.final_score,
+            five_dim_score=score.dimension_dicts(),
+        ))
+
+    logger.info(f"Reverse match | job_id={job_id} | pool={pool} | returned={len(candidates)}")
+    return JobCandidatesResponse(
+        job_id=job_id,
+        job_title=posting.title,
+        total_candidates=pool,
+        candidates=candidates,
+    )
+
+
+@router_v2.delete("/candidates/{candidate_id}")
+def delete_candidate(candidate_id: str):
+    """Remove a stored candidate (profile and vectors) from reverse matching."""
+    if not get_candidate_store().delete(candidate_id):
+        raise HTTPException(status_code=404, detail=f"Candidate {candidate_id!r} not found.")
+    return {"status": "deleted", "candidate_id": candidate_id}
+
+
 @router_v2.get("/jd_cache/status")
 def jd_cache_status():
-    """Inspect current JD cache state."""
+    """Inspect current JD cache state and the last background refresh."""
+    refresh = _jd_refresh_status()
+    if refresh["last_refresh_at"] is not None:
+        refresh["last_refresh_at"] = datetime.fromtimestamp(refresh["last_refresh_at"]).isoformat()
     return {
         "cached_mtime": _jd_cache.get("mtime"),
         "cached_jobs": len(_jd_cache.get("results", {})),
         "job_ids": list(_jd_cache.get("results", {}).keys()),
+        "refresh": refresh,
     }
 
 
 @router_v2.delete("/jd_cache")
 def jd_cache_clear():
-    """Force-invalidate the JD cache. Next request will re-analyze all JDs."""
+    """Force-invalidate the JD cache and the per-job JD store. Next request will re-analyze all JDs."""
     _jd_cache["mtime"] = None
     _jd_cache["results"] = {}
+    get_jd_store().clear()
     logger.info("JD cache manually cleared")
     return {"status": "cleared"}
 
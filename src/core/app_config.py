@@ -32,17 +32,112 @@ class AppConfig:
 
         # ── Request timeout ──────────────────────────────────────────────────
         self.REQUEST_TIMEOUT_SECONDS: int = int(os.getenv("REQUEST_TIMEOUT_SECONDS", "120"))
+        # The agent DAG's deadline is the request limit (or Celery soft limit) minus
+        # this margin, leaving time to serialise the response.
+        self.DEADLINE_MARGIN_SECONDS: float = float(os.getenv("DEADLINE_MARGIN_SECONDS", "3"))
+        # Optional stages (comparison matrix) are skipped with less budget left than this.
+        self.OPTIONAL_STAGE_MIN_SECONDS: float = float(os.getenv("OPTIONAL_STAGE_MIN_SECONDS", "20"))
 
         # ── Moonshot API rate limiting ────────────────────────────────────────
         self.MOONSHOT_RPM_LIMIT: int = int(os.getenv("MOONSHOT_RPM_LIMIT", "30"))
+        # Max concurrent in-flight LLM calls per event loop (central limiter)
+        self.LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+        # "local": per process; "redis": one cluster-wide bucket in REDIS_URL (local fallback when down),
+        # enabled explicitly by the multi-process deployment (docker-compose.yml)
+        self.RATE_LIMIT_BACKEND: str = os.getenv("RATE_LIMIT_BACKEND", "local").lower()
 
         # ── Moonshot retry / circuit breaker ─────────────────────────────────
         self.MOONSHOT_MAX_RETRIES: int = int(os.getenv("MOONSHOT_MAX_RETRIES", "3"))
         self.MOONSHOT_RETRY_WAIT_BASE: float = float(os.getenv("MOONSHOT_RETRY_WAIT_BASE", "2.0"))
         self.MOONSHOT_RETRY_WAIT_MAX: float = float(os.getenv("MOONSHOT_RETRY_WAIT_MAX", "30.0"))
+        # Shared breaker over a rolling window: opens on error rate OR slow-call rate,
+        # probes with a few calls after LLM_CIRCUIT_OPEN_SECONDS (half-open).
+        self.LLM_CIRCUIT_WINDOW_SECONDS: float = float(os.getenv("LLM_CIRCUIT_WINDOW_SECONDS", "60"))
+        self.LLM_CIRCUIT_MIN_CALLS: int = int(os.getenv("LLM_CIRCUIT_MIN_CALLS", "10"))
+        self.LLM_CIRCUIT_ERROR_RATE: float = float(os.getenv("LLM_CIRCUIT_ERROR_RATE", "0.5"))
+        self.LLM_CIRCUIT_SLOW_CALL_SECONDS: float = float(os.getenv("LLM_CIRCUIT_SLOW_CALL_SECONDS", "45"))
+        self.LLM_CIRCUIT_SLOW_RATE: float = float(os.getenv("LLM_CIRCUIT_SLOW_RATE", "0.8"))
+        self.LLM_CIRCUIT_OPEN_SECONDS: float = float(os.getenv("LLM_CIRCUIT_OPEN_SECONDS", "30"))
+        self.LLM_CIRCUIT_HALF_OPEN_PROBES: int = int(os.getenv("LLM_CIRCUIT_HALF_OPEN_PROBES", "2"))
+
+        # ── Counterfactual career paths ──────────────────────────────────────
+        # Paths are generated for the scored top-k only. When > 0, generation
+        # speculatively starts for this many FAISS-recalled jobs before scoring
+        # finishes; speculative paths outside the final top-k are cancelled.
+        self.COUNTERFACTUAL_SPECULATIVE_K: int = int(os.getenv("COUNTERFACTUAL_SPECULATIVE_K", "0"))
+
+        # ── LLM HTTP client (one pooled client per process) ──────────────────
+        self.MOONSHOT_BASE_URL: str = os.getenv("MOONSHOT_BASE_URL", "https://api.moonshot.ai/v1")
+        self.LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+        self.LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+        self.LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        self.LLM_CONNECT_TIMEOUT: float = float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+        self.LLM_READ_TIMEOUT: float = float(os.getenv("LLM_READ_TIMEOUT", "60"))
+        self.LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() in ("1", "true", "yes")
+
+        # ── LLM request hedging (opt-in, per-job fan-out calls only) ─────────
+        # A duplicate is sent once a call exceeds the caller's observed p95
+        # (at least LLM_HEDGE_MIN_DELAY s), only from spare limiter capacity
+        # and for at most LLM_HEDGE_MAX_RATIO of calls.
+        self.LLM_HEDGE_ENABLED: bool = os.getenv("LLM_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+        self.LLM_HEDGE_MIN_DELAY: float = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2.0"))
+        self.LLM_HEDGE_MAX_RATIO: float = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.1"))
+
+        # ── Multi-item LLM batching ──────────────────────────────────────────
+        # Jobs packed per prompt by the per-job agents (1 = one call per job).
+        # Chunks are split further so the estimated tokens stay within the budget.
+        self.LLM_BATCH_SIZE: int = int(os.getenv("LLM_BATCH_SIZE", "1"))
+        self.LLM_BATCH_TOKEN_BUDGET: int = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "6000"))
+
+        # ── LLM response cache ───────────────────────────────────────────────
+        # Content-addressed (model, messages, temperature, response_format).
+        # In-process only by default; set LLM_CACHE_PATH (e.g. data/llm_cache/llm_cache.sqlite3)
+        # to add the on-disk SQLite tier, which only stores job-side (non-candidate) responses.
+        self.LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.LLM_CACHE_TTL_SECONDS: int = int(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+        self.LLM_CACHE_MAX_ENTRIES: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "2048"))
+        self.LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "")
+
+        # ── Resume document extraction ───────────────────────────────────────
+        # PDF/DOCX text extraction runs in a spawned process pool with per-document caps.
+        self.EXTRACT_USE_PROCESS_POOL: bool = os.getenv("EXTRACT_USE_PROCESS_POOL", "true").lower() in ("1", "true", "yes")
+        self.EXTRACT_MAX_WORKERS: int = int(os.getenv("EXTRACT_MAX_WORKERS", "2"))
+        self.EXTRACT_MAX_PAGES: int = int(os.getenv("EXTRACT_MAX_PAGES", "20"))
+        self.EXTRACT_TIMEOUT_SECONDS: float = float(os.getenv("EXTRACT_TIMEOUT_SECONDS", "15"))
+
+        # ── Resume parse cache ───────────────────────────────────────────────
+        # Keyed by SHA-256 of the uploaded bytes. "redis" adds an encrypted
+        # shared tier in REDIS_URL on top of the in-process LRU; "local" is LRU only.
+        self.RESUME_CACHE_ENABLED: bool = os.getenv("RESUME_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.RESUME_CACHE_BACKEND: str = os.getenv("RESUME_CACHE_BACKEND", "local").lower()
+        self.RESUME_CACHE_TTL_SECONDS: int = int(os.getenv("RESUME_CACHE_TTL_SECONDS", "86400"))
+        self.RESUME_CACHE_MAX_ENTRIES: int = int(os.getenv("RESUME_CACHE_MAX_ENTRIES", "256"))
+
+        # ── Career prediction cache ──────────────────────────────────────────
+        # Keyed by a canonical profile fingerprint (title, bucketed years,
+        # seniority, skills, soft skills, objective); in-process LRU.
+        self.CAREER_CACHE_ENABLED: bool = os.getenv("CAREER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.CAREER_CACHE_TTL_SECONDS: int = int(os.getenv("CAREER_CACHE_TTL_SECONDS", "86400"))
+        self.CAREER_CACHE_MAX_ENTRIES: int = int(os.getenv("CAREER_CACHE_MAX_ENTRIES", "512"))
+
+        # ── Candidate store (reverse job → candidates matching) ─────────────
+        # Parsed profiles and vectors are kept on disk so jobs can be matched
+        # against past uploads. Candidates not re-uploaded within the TTL are
+        # purged (0 = keep until deleted via DELETE /api/v2/candidates/{id}).
+        self.CANDIDATE_STORE_ENABLED: bool = os.getenv("CANDIDATE_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+        self.CANDIDATE_STORE_TTL_SECONDS: int = int(os.getenv("CANDIDATE_STORE_TTL_SECONDS", str(30 * 86400)))
 
         # ── JD cache ─────────────────────────────────────────────────────────
+        # Seconds between background catalog polls (API + each Celery worker); 0 = off.
         self.JD_CACHE_REFRESH_INTERVAL: int = int(os.getenv("JD_CACHE_REFRESH_INTERVAL", "0"))
+        # Per-job analyses keyed by a hash of the JD fields; only new / edited
+        # jobs are re-analysed. JD_STORE_PATH="" keeps the store in memory only.
+        self.JD_STORE_PATH: str = os.getenv(
+            "JD_STORE_PATH", str(_root / "data" / "jd_cache" / "jd_analysis.sqlite3")
+        )
+        # "redis" shares analyses across the API and Celery workers (one process
+        # analyses under a leader lock, all read); "local" keeps them per process.
+        self.JD_STORE_BACKEND: str = os.getenv("JD_STORE_BACKEND", "local").lower()
 
         # ── Redis / Celery ───────────────────────────────────────────────────
         self.REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
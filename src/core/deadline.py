@@ -0,0 +1,100 @@
+"""
+End-to-end request deadlines.
+
+A deadline is an absolute time.monotonic() timestamp. Entry points derive it
+from their own limit (REQUEST_TIMEOUT_SECONDS for the sync API, the Celery
+soft time limit for workers) and store it on AgentContext.deadline.
+OrchestratorAgent.run also binds it to a ContextVar for the lifetime of the
+DAG, so code that never sees ctx — LLMClient calls and executor jobs started
+through run_in_executor() below — shares the same budget:
+
+  - agent timeouts are min(agent.timeout, remaining budget)
+  - LLM calls wait for the limiter and the provider only as long as the
+    budget allows, and fail fast with DeadlineExceeded once it is spent
+  - optional stages (e.g. the comparison matrix) are skipped when less than
+    OPTIONAL_STAGE_MIN_SECONDS remain
+
+No deadline (None) means "unbounded" everywhere, which keeps scripts and tests
+that build an AgentContext by hand working unchanged.
+
+请求级截止时间：入口根据自身时限计算绝对截止时间，写入 AgentContext 并绑定到 ContextVar，
+Agent 超时、LLM 调用与 executor 任务都按剩余预算计算超时；预算不足时跳过可选阶段。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import time
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(RuntimeError):
+    """
+    The request's time budget is spent. Deliberately not a TimeoutError, so
+    moonshot_retry does not back off and retry work nobody will wait for.
+    """
+
+
+def deadline_in(seconds: float) -> float:
+    """Absolute deadline `seconds` from now."""
+    return time.monotonic() + seconds
+
+
+def current_deadline() -> Optional[float]:
+    return _deadline.get()
+
+
+@contextmanager
+def request_deadline(deadline: Optional[float]) -> Iterator[None]:
+    """Bind `deadline` for the current task and every task / job it starts."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(deadline: Optional[float] = None) -> Optional[float]:
+    """Seconds left before `deadline` (default: the bound one), never negative; None if unbounded."""
+    if deadline is None:
+        deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+def budget(cap: float, deadline: Optional[float] = None) -> float:
+    """Timeout for one step: its own cap, shortened to what is left of the request."""
+    left = remaining(deadline)
+    return cap if left is None else min(cap, left)
+
+
+def check(what: str) -> None:
+    """Raise DeadlineExceeded if the bound deadline has already passed."""
+    if remaining() == 0.0:
+        raise DeadlineExceeded(f"request deadline passed before {what}")
+
+
+async def run_in_executor(func: Callable[..., T], *args: Any) -> T:
+    """
+    loop.run_in_executor() that carries the caller's contextvars (deadline,
+    LLM priority) into the worker thread and stops waiting at the deadline.
+    A job that is already running cannot be interrupted; its result is dropped.
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    future = loop.run_in_executor(None, partial(ctx.run, func, *args))
+    left = remaining()
+    if left is None:
+        return await future
+    try:
+        return await asyncio.wait_for(future, timeout=left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"request deadline passed while running {getattr(func, '__name__', func)!r}") from None
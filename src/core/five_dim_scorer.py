@@ -3,10 +3,13 @@
 统一入口：输入候选人 + 职位列表 → 输出排序评分结果
 """
 
+import hashlib
 import logging
 from typing import Optional
 
-from src.models.schemas import CandidateProfile, JobPosting, FiveDimScore
+import numpy as np
+
+from src.models.schemas import DIMENSIONS, CandidateProfile, JobPosting, FiveDimScore, ScoreBatch
 from src.dimensions.semantic_matcher import SemanticMatcher
 from src.dimensions.skill_graph_matcher import SkillGraphMatcher
 from src.dimensions.seniority_matcher import SeniorityMatcher
@@ -15,6 +18,10 @@ from src.dimensions.salary_matcher import SalaryMatcher
 
 logger = logging.getLogger(__name__)
 
+# 评分逻辑或模型变化时递增，使 ScoreStore 中按旧逻辑计算的持久化分数失效
+SCORING_VERSION = 1
+
+
 class FiveDimScorer:
     """
     五维度评分系统主入口
@@ -40,45 +47,138 @@ class FiveDimScorer:
         self.salary    = SalaryMatcher()
         logger.info("FiveDimScorer ready.")
     
-    def score_one(self, candidate: CandidateProfile, job: JobPosting) -> FiveDimScore:
-        """对单个职位评分"""
-        result = FiveDimScore(
+    def score_one(
+        self, candidate: CandidateProfile, job: JobPosting, with_details: bool = True,
+    ) -> FiveDimScore:
+        """对单个职位评分；with_details=False 时各维度只产出数值分数"""
+        return FiveDimScore(
+            job_id      = job.job_id,
+            semantic    = self.semantic.score(candidate, job, with_details),
+            skill_graph = self.skill.score(candidate, job, with_details),
+            seniority   = self.seniority.score(candidate, job, with_details),
+            culture     = self.culture.score(candidate, job, with_details),
+            salary      = self.salary.score(candidate, job, with_details),
+        )
+
+    def score_with_vectors(
+        self,
+        candidate: CandidateProfile,
+        job: JobPosting,
+        resume_emb: np.ndarray,
+        candidate_culture: np.ndarray,
+        job_emb: np.ndarray,
+        job_culture: np.ndarray,
+        with_details: bool = True,
+    ) -> FiveDimScore:
+        """
+        对单个（候选人, 职位）评分，语义/文化维度使用预计算向量。
+        反向匹配时候选人向量来自 CandidateStore，无需重新 encode。
+        """
+        return FiveDimScore(
             job_id      = job.job_id,
-            semantic    = self.semantic.score(candidate, job),
-            skill_graph = self.skill.score(candidate, job),
-            seniority   = self.seniority.score(candidate, job),
-            culture     = self.culture.score(candidate, job),
-            salary      = self.salary.score(candidate, job),
+            semantic    = self.semantic.score_embeddings(resume_emb, job_emb, with_details),
+            skill_graph = self.skill.score(candidate, job, with_details),
+            seniority   = self.seniority.score(candidate, job, with_details),
+            culture     = self.culture.score_vectors(candidate_culture, job_culture, with_details),
+            salary      = self.salary.score(candidate, job, with_details),
         )
-        result.compute_final()
-        return result
+
+    @property
+    def weights(self) -> tuple[float, ...]:
+        """各维度权重（与 DIMENSIONS 同序）"""
+        return (self.semantic.weight, self.skill.weight, self.seniority.weight,
+                self.culture.weight, self.salary.weight)
+
+    @property
+    def version(self) -> str:
+        """评分版本：SCORING_VERSION + 各维度权重的哈希，持久化分数按此失效"""
+        payload = f"{SCORING_VERSION}:{self.weights}"
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def score_arrays(self, candidate: CandidateProfile, jobs: list[JobPosting]) -> ScoreBatch:
+        """
+        Numeric-only scoring pass into a struct-of-arrays ScoreBatch (unsorted).
+        Each dimension scores the whole job list in one vectorised call
+        (batched encode / one candidate-side computation), so no per-job
+        DimensionScore objects are created.
+        只计算数值分数，写入 ScoreBatch 数组（未排序）；每个维度对全部职位一次向量化计算，
+        不再逐职位创建 DimensionScore。
+        """
+        cols = np.vstack([
+            self.semantic.score_many(candidate, jobs),
+            self.skill.score_many(candidate, jobs),
+            self.seniority.score_many(candidate, jobs),
+            self.culture.score_many(candidate, jobs),
+            self.salary.score_many(candidate, jobs),
+        ]).reshape(len(DIMENSIONS), len(jobs))
+
+        weights = self.weights
+        return ScoreBatch(
+            job_ids=[j.job_id for j in jobs],
+            **{name: cols[d] for d, name in enumerate(DIMENSIONS)},
+            final=np.asarray(weights) @ cols,
+            weights=weights,
+        )
+
+    def score_rows(
+        self,
+        candidate: CandidateProfile,
+        jobs: list[JobPosting],
+        top_k: Optional[int] = None,
+        with_details: bool = False,
+    ) -> list[dict]:
+        """
+        Top-k results serialised straight from the ScoreBatch arrays
+        (ScoreBatch.to_rows()), for API responses. With with_details=True the
+        per-dimension details of the returned rows are filled in.
+        直接从 ScoreBatch 数组序列化 top_k 结果（供 API 响应）；with_details=True 时补充各维度 details。
+        """
+        rows = self.score_arrays(candidate, jobs).top_k(top_k).to_rows()
+        if with_details:
+            job_map = {j.job_id: j for j in jobs}
+            for row in rows:
+                detailed = self.score_one(candidate, job_map[row["job_id"]])
+                for d, dim in row["five_dim_score"].items():
+                    dim["details"] = getattr(detailed, d).details or {}
+        return rows
 
     def score_batch(
         self,
         candidate: CandidateProfile,
         jobs: list[JobPosting],
         top_k: Optional[int] = None,
+        with_details: bool = False,
     ) -> list[FiveDimScore]:
         """
         Batch scoring (sequential).
         ThreadPoolExecutor causes PyTorch deadlocks when multiple threads
         call SentenceTransformer.encode() concurrently — run sequentially instead.
+        The scoring pass fills a ScoreBatch (numeric arrays only); FiveDimScore
+        objects are materialized for the returned top_k alone, and when
+        with_details=True their detail payloads are regenerated.
         Returns: list sorted by final_score descending.
         批量评分（顺序执行）。
         当多个线程并发调用 `SentenceTransformer.encode()` 时，`ThreadPoolExecutor` 会导致 PyTorch 死锁。
         请改为顺序执行。
+        评分阶段只填充 ScoreBatch 数组；仅为返回的 top_k 职位创建 FiveDimScore，
+        with_details=True 时再为其重新生成 details。
         返回值：按 `final_score` 降序排列的列表。
         """
-        results: list[FiveDimScore] = []
-        for job in jobs:
-            try:
-                results.append(self.score_one(candidate, job))
-            except Exception as e:
-                logger.error(f"Scoring failed for job {job.job_id}: {e}")
-
-        results.sort(key=lambda r: r.final_score, reverse=True)
-        return results[:top_k] if top_k else results
-    
+        top = self.score_arrays(candidate, jobs).top_k(top_k).to_scores()
+        if with_details:
+            top = self.attach_details(candidate, top, jobs)
+        return top
+
+    def attach_details(
+        self,
+        candidate: CandidateProfile,
+        results: list[FiveDimScore],
+        jobs: list[JobPosting],
+    ) -> list[FiveDimScore]:
+        """为（已截断的）评分结果重新生成各维度 details，顺序保持不变"""
+        job_map = {j.job_id: j for j in jobs}
+        return [self.score_one(candidate, job_map[r.job_id]) for r in results]
+
     def explain(self, score: FiveDimScore) -> str:
         """生成人类可读的评分解释"""
         lines = [
@@ -86,8 +186,8 @@ class FiveDimScorer:
             f"║  语义匹配    [{score.semantic.weight:.0%}]: {score.semantic.score:.1%}",
             f"║  技能图谱    [{score.skill_graph.weight:.0%}]: {score.skill_graph.score:.1%}",
             f"║  职级匹配    [{score.seniority.weight:.0%}]: {score.seniority.score:.1%}  "
-            f"(candidate L{score.seniority.details.get('candidate_level','?')} "
-            f"vs job L{score.seniority.details.get('job_level','?')})",
+            f"(candidate L{(score.seniority.details or {}).get('candidate_level','?')} "
+            f"vs job L{(score.seniority.details or {}).get('job_level','?')})",
             f"║  文化匹配    [{score.culture.weight:.0%}]: {score.culture.score:.1%}",
             f"║  薪资匹配    [{score.salary.weight:.0%}]: {score.salary.score:.1%}",
             f"╚{'═' * 45}",
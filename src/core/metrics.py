@@ -0,0 +1,161 @@
+"""
+Application-level Prometheus metrics.
+
+Registered on the default prometheus_client registry, so they are served by
+the existing Instrumentator /metrics endpoint next to the HTTP metrics.
+
+应用级 Prometheus 指标，注册在默认 registry 上，随 /metrics 一起暴露。
+"""
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# ── LLM response cache ────────────────────────────────────────────────────────
+
+LLM_CACHE_LOOKUPS = Counter(
+    "llm_cache_lookups_total",
+    "LLM response cache lookups by result (l1_hit / l2_hit / miss)",
+    ["result"],
+)
+
+RESUME_CACHE_LOOKUPS = Counter(
+    "resume_cache_lookups_total",
+    "Resume parse cache lookups by result (l1_hit / l2_hit / miss)",
+    ["result"],
+)
+
+CAREER_CACHE_LOOKUPS = Counter(
+    "career_cache_lookups_total",
+    "Career prediction cache lookups by profile fingerprint (hit / miss)",
+    ["result"],
+)
+
+JD_ANALYSES = Counter(
+    "jd_analyses_total",
+    "Jobs processed by a JD cache rebuild, by outcome (reused / analyzed / failed / pending / evicted)",
+    ["outcome"],
+)
+
+JD_CACHE_READS = Counter(
+    "jd_cache_reads_total",
+    "JD cache reads by state (hit / stale: served while refreshing / cold: waited for analysis)",
+    ["result"],
+)
+
+# ── Resume document extraction ────────────────────────────────────────────────
+
+EXTRACT_DURATION = Histogram(
+    "resume_extract_duration_seconds",
+    "Time to extract text from an uploaded resume, by extractor (pdfium / pdfplumber / docx)",
+    ["method"],
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 20),
+)
+
+EXTRACT_PAGES = Histogram(
+    "resume_extract_pages",
+    "Page count of uploaded PDF resumes (before the page cap)",
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+
+EXTRACT_FAILURES = Counter(
+    "resume_extract_failures_total",
+    "Resume text extractions that failed (reason: timeout / error)",
+    ["kind", "reason"],
+)
+
+# ── LLM client ────────────────────────────────────────────────────────────────
+
+LLM_REQUEST_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM provider calls (cache hits excluded)",
+    ["caller"],
+    buckets=(0.5, 1, 2, 3, 5, 8, 13, 20, 30, 60, 120),
+)
+
+LLM_TOKENS = Counter(
+    "llm_tokens_total",
+    "Tokens consumed by LLM provider calls",
+    ["caller", "kind"],          # kind: prompt / completion
+)
+
+LLM_REQUEST_ERRORS = Counter(
+    "llm_request_errors_total",
+    "Failed LLM provider calls by exception type",
+    ["caller", "error"],
+)
+
+LLM_BATCH_ITEMS = Counter(
+    "llm_batch_items_total",
+    "Items sent in multi-item LLM batches (batched = answered by the batch, fallback = retried alone)",
+    ["caller", "outcome"],
+)
+
+LLM_REQUESTS_CANCELLED = Counter(
+    "llm_requests_cancelled_total",
+    "In-flight LLM provider calls cancelled before answering (client disconnect, deadline, lost hedge)",
+    ["caller"],
+)
+
+LLM_HEDGES = Counter(
+    "llm_hedges_total",
+    "Hedged LLM requests (sent / skipped for budget / won = hedge answered first / lost)",
+    ["caller", "outcome"],
+)
+
+# ── Agent pipeline ────────────────────────────────────────────────────────────
+
+PIPELINE_CANCELLED = Counter(
+    "pipeline_cancelled_total",
+    "Agent pipelines abandoned because the client disconnected (phase: queued / running)",
+    ["endpoint", "phase"],
+)
+
+AGENT_CANCELLED = Counter(
+    "agent_cancelled_total",
+    "Agents cancelled while running",
+    ["agent"],
+)
+
+# ── LLM limiter ───────────────────────────────────────────────────────────────
+
+LLM_LIMITER_WAIT = Histogram(
+    "llm_limiter_wait_seconds",
+    "Time LLM calls spent queued in the central limiter",
+    ["priority"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 2, 5, 10, 30, 60),
+)
+
+LLM_LIMITER_QUEUED = Gauge(
+    "llm_limiter_queued",
+    "LLM calls currently waiting for admission",
+    ["priority"],
+)
+
+LLM_INFLIGHT = Gauge(
+    "llm_inflight",
+    "LLM provider calls currently in flight",
+)
+
+RATE_LIMIT_FALLBACKS = Counter(
+    "rate_limit_redis_fallbacks_total",
+    "Times the shared Redis token bucket was unreachable and the local bucket took over",
+)
+
+# ── LLM circuit breaker ───────────────────────────────────────────────────────
+
+LLM_CIRCUIT_STATE = Gauge(
+    "llm_circuit_state",
+    "LLM provider circuit breaker state (0 = closed, 1 = half_open, 2 = open)",
+    ["name"],
+)
+
+LLM_CIRCUIT_TRANSITIONS = Counter(
+    "llm_circuit_transitions_total",
+    "Circuit breaker state transitions by target state",
+    ["name", "state"],
+)
+
+LLM_CIRCUIT_REJECTED = Counter(
+    "llm_circuit_rejected_total",
+    "LLM calls failed fast because the circuit was open",
+    ["name"],
+)
@@ -3,6 +3,8 @@
 独立 Embedding 空间，专注文化信号词汇
 """
 import re
+from functools import lru_cache
+
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from src.models.schemas import CandidateProfile, JobPosting, DimensionScore
@@ -20,6 +22,11 @@ class CultureMatcher:
         self.model = SentenceTransformer(model_name)
         self.weight = 0.15
         self._dimension_embeddings = self._precompute_anchors()
+        self._anchor_matrix = np.stack(list(self._dimension_embeddings.values()))   # (C, D)
+        # 最近的候选人文化向量：评分与写入候选人库共用同一次 encode
+        self._resume_vector = lru_cache(maxsize=32)(
+            lambda text, keywords: self._text_to_culture_vector(text, list(keywords))
+        )
 
     def _precompute_anchors(self) -> dict[str, np.ndarray]:
         """预计算各文化维度锚点 Embedding"""
@@ -58,13 +65,44 @@ class CultureMatcher:
         vector = (vector + 1) / 2
         return vector
     
-    def score(self, candidate: CandidateProfile, job: JobPosting) -> DimensionScore:
-        candidate_text = candidate.resume_text
+    def _texts_to_culture_vectors(self, texts: list[str], keywords: list[list[str]]) -> np.ndarray:
+        """批量版 _text_to_culture_vector：一次 encode，(N, C) 文化向量矩阵"""
+        culture_texts = [self._extract_culture_text(t, kws) for t, kws in zip(texts, keywords)]
+        text_embs = np.asarray(self.model.encode(culture_texts, normalize_embeddings=True)).reshape(len(texts), -1)
+        return (text_embs @ self._anchor_matrix.T + 1) / 2
+
+    def candidate_vector(self, candidate: CandidateProfile) -> np.ndarray:
+        """候选人文化向量，可持久化后复用；同一简历只 encode 一次"""
+        return self._resume_vector(candidate.resume_text, tuple(candidate.culture_keywords))
+
+    def job_vector(self, job: JobPosting) -> np.ndarray:
+        """职位文化向量"""
         job_text = f"{job.title}\n{job.description}\n{' '.join(job.company_values)}"
+        return self._text_to_culture_vector(job_text, job.culture_keywords)
+
+    def job_vectors(self, jobs: list[JobPosting]) -> np.ndarray:
+        """批量职位文化向量 (N, C)"""
+        return self._texts_to_culture_vectors(
+            [f"{job.title}\n{job.description}\n{' '.join(job.company_values)}" for job in jobs],
+            [job.culture_keywords for job in jobs],
+        )
 
-        candidate_vec = self._text_to_culture_vector(candidate_text, candidate.culture_keywords)
-        job_vec = self._text_to_culture_vector(job_text, job.culture_keywords)
+    def score_many(self, candidate: CandidateProfile, jobs: list[JobPosting]) -> np.ndarray:
+        """全部职位的数值分数（与逐个 score_vectors 一致），余弦相似度按行向量化"""
+        if not jobs:
+            return np.empty(0, dtype=np.float64)
+        candidate_vec = self.candidate_vector(candidate)
+        job_vecs = self.job_vectors(jobs)
+        norm_c = np.linalg.norm(candidate_vec)
+        norm_j = np.linalg.norm(job_vecs, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            similarity = np.clip(job_vecs @ candidate_vec / (norm_j * norm_c), 0.0, 1.0)
+        return np.where((norm_j == 0) | (norm_c == 0), 0.5, similarity).astype(np.float64)
 
+    def score_vectors(
+        self, candidate_vec: np.ndarray, job_vec: np.ndarray, with_details: bool = True,
+    ) -> DimensionScore:
+        """基于预计算文化向量评分"""
         # 余弦相似度（两个文化向量之间）
         norm_c = np.linalg.norm(candidate_vec)
         norm_j = np.linalg.norm(job_vec)
@@ -74,6 +112,11 @@ class CultureMatcher:
             similarity = float(np.dot(candidate_vec, job_vec) / (norm_c * norm_j))
             similarity = max(0.0, min(1.0, similarity))
 
+        if not with_details:
+            return DimensionScore(
+                score=similarity, weight=self.weight, weighted_score=similarity * self.weight,
+            )
+
         dim_names = list(CULTURE_DIMENSIONS.keys())
         dim_scores = {
             dim: round(float(candidate_vec[i]), 3)
@@ -93,3 +136,8 @@ class CultureMatcher:
                 },
             },
         )
+
+    def score(self, candidate: CandidateProfile, job: JobPosting, with_details: bool = True) -> DimensionScore:
+        return self.score_vectors(
+            self.candidate_vector(candidate), self.job_vector(job), with_details
+        )
@@ -4,7 +4,11 @@
 """
 
 import re
+from dataclasses import astuple
 from typing import Optional
+
+import numpy as np
+
 from src.models.schemas import CandidateProfile, JobPosting, DimensionScore, SalaryRange
 from src.core.match_config import CURRENCY_TO_USD, PERIOD_MULTIPLIER
 
@@ -35,6 +39,10 @@ class SalaryMatcher:
     - 偏差 20-40%: 0.40
     - 偏差 >40%: 0.15
     - 无薪资信息: 0.5（中性）
+
+    批量评分走向量化路径（score_many）：职位薪资区间在岗位库加载时一次性归一化为
+    年薪 USD 的 lo/hi 数组（prepare_catalog），候选人区间只提取一次，
+    重叠比例 → 分数的查表与无交集的偏差惩罚均用 NumPy 对全部职位一次算完。
     """
     OVERLAP_SCORES = [
         (1.00, 1.0),   # 完全覆盖
@@ -44,8 +52,15 @@ class SalaryMatcher:
         (0.20, 0.35),
         (0.00, 0.15),  # 无交集
     ]
+    NEUTRAL_SCORE = 0.5
+
     def __init__(self):
         self.weight = 0.10
+        # 查表用升序阈值/分数（searchsorted）
+        self._thresholds = np.array([t for t, _ in reversed(self.OVERLAP_SCORES)])
+        self._table = np.array([s for _, s in reversed(self.OVERLAP_SCORES)])
+        # 岗位库薪资表：(job_id → row, 各行薪资来源, lo, hi)，lo/hi 为 NaN 表示无薪资信息
+        self._catalog: tuple = ({}, [], np.empty(0), np.empty(0))
     
     def _normalize_to_usd_annual(self, salary_range: SalaryRange) -> tuple[float, float]:
         """将薪资范围归一化为年薪 USD"""
@@ -55,7 +70,108 @@ class SalaryMatcher:
         lo = (salary_range.min_salary or 0) * rate * multiplier
         hi = (salary_range.max_salary or lo * 1.3) * rate * multiplier  # 无上限时估算
         return lo, hi
-    
+
+    def _candidate_range(self, candidate: CandidateProfile) -> Optional[SalaryRange]:
+        if candidate.expected_salary is not None:
+            return candidate.expected_salary
+        return self._extract_salary_from_text(candidate.resume_text)
+
+    def _job_range(self, job: JobPosting) -> Optional[SalaryRange]:
+        if job.salary_range is not None:
+            return job.salary_range
+        return self._extract_salary_from_text(job.description)
+
+    def _job_range_usd(self, job: JobPosting) -> tuple[float, float]:
+        job_salary = self._job_range(job)
+        if job_salary is None:
+            return np.nan, np.nan
+        return self._normalize_to_usd_annual(job_salary)
+
+    @staticmethod
+    def _range_source(job: JobPosting) -> tuple:
+        """薪资区间的输入（salary_range 字段，否则 JD 正文）；用于判断表中的行是否仍有效"""
+        if job.salary_range is not None:
+            return ("range", astuple(job.salary_range))
+        return ("text", job.description)
+
+    # ── 岗位库薪资表（岗位库加载时构建一次）───────────────────────────────────
+
+    def prepare_catalog(self, jobs: list[JobPosting]) -> None:
+        """
+        Normalize every job's salary range to annual USD once per catalog load.
+        岗位库加载时一次性把职位薪资归一化为 lo/hi 数组，后续请求按 job_id 取用。
+        """
+        ranges = np.array([self._job_range_usd(j) for j in jobs], dtype=np.float64).reshape(-1, 2)
+        rows = {j.job_id: i for i, j in enumerate(jobs)}
+        sources = [self._range_source(j) for j in jobs]
+        self._catalog = (rows, sources, ranges[:, 0].copy(), ranges[:, 1].copy())
+
+    def job_ranges(self, jobs: list[JobPosting]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        lo/hi arrays (annual USD, NaN = unknown) for `jobs`. Jobs are looked up
+        in the prepared catalog by job_id — postings rebuilt from the same file
+        on every request hit it; a job whose salary inputs differ from its
+        catalog row (or that is not in the catalog) is normalized on the spot.
+        """
+        rows, sources, cat_lo, cat_hi = self._catalog
+        idx = np.empty(len(jobs), dtype=np.int64)
+        lo = np.empty(len(jobs), dtype=np.float64)
+        hi = np.empty(len(jobs), dtype=np.float64)
+        missing = []
+        for i, job in enumerate(jobs):
+            row = rows.get(job.job_id)
+            if row is not None and sources[row] == self._range_source(job):
+                idx[i] = row
+            else:
+                idx[i] = -1
+                missing.append(i)
+        hit = idx >= 0
+        lo[hit] = cat_lo[idx[hit]]
+        hi[hit] = cat_hi[idx[hit]]
+        for i in missing:
+            lo[i], hi[i] = self._job_range_usd(jobs[i])
+        return lo, hi
+
+    def _overlap_scores(
+        self,
+        candidate_lo: float, candidate_hi: float,
+        job_lo: np.ndarray, job_hi: np.ndarray,
+    ) -> np.ndarray:
+        """区间重叠比例 → 分数（向量化）；无交集时按相对偏差惩罚"""
+        overlap_lo = np.maximum(candidate_lo, job_lo)
+        overlap_hi = np.minimum(candidate_hi, job_hi)
+
+        # 无重叠，计算偏差距离
+        gap = np.maximum(candidate_lo - job_hi, job_lo - candidate_hi)
+        mid_job = (job_lo + job_hi) / 2
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative_gap = np.where(mid_job > 0, gap / mid_job, 1.0)
+        gap_scores = np.maximum(0.05, 0.15 - relative_gap * 0.1)
+
+        # 取候选人区间长度作为基准，查表映射
+        candidate_span = candidate_hi - candidate_lo or 1.0
+        overlap_ratio = np.minimum(1.0, (overlap_hi - overlap_lo) / candidate_span)
+        bucket = np.searchsorted(self._thresholds, overlap_ratio, side="right") - 1
+        table_scores = self._table[np.clip(bucket, 0, None)]
+
+        return np.where(overlap_hi <= overlap_lo, gap_scores, table_scores)
+
+    def score_many(self, candidate: CandidateProfile, jobs: list[JobPosting]) -> np.ndarray:
+        """
+        Numeric salary scores for all jobs in one call (same values as score()).
+        一次调用对全部职位评分，结果与逐个 score() 一致。
+        """
+        scores = np.full(len(jobs), self.NEUTRAL_SCORE, dtype=np.float64)
+        candidate_salary = self._candidate_range(candidate)
+        if candidate_salary is None or not jobs:
+            return scores
+
+        c_lo, c_hi = self._normalize_to_usd_annual(candidate_salary)
+        j_lo, j_hi = self.job_ranges(jobs)
+        known = ~np.isnan(j_lo)
+        scores[known] = self._overlap_scores(c_lo, c_hi, j_lo[known], j_hi[known])
+        return scores
+
     def _extract_salary_from_text(self, text: str) -> Optional[SalaryRange]:
         """从文本中提取薪资区间"""
         # 尝试提取范围 "$80k - $120k"
@@ -96,50 +212,27 @@ class SalaryMatcher:
         job_lo: float, job_hi: float,
     ) -> float:
         """计算两个区间的重叠比例，映射为分数"""
-        overlap_lo = max(candidate_lo, job_lo)
-        overlap_hi = min(candidate_hi, job_hi)
-
-        if overlap_hi <= overlap_lo:
-            # 无重叠，计算偏差距离
-            gap = max(candidate_lo - job_hi, job_lo - candidate_hi)
-            mid_job = (job_lo + job_hi) / 2
-            relative_gap = gap / mid_job if mid_job > 0 else 1.0
-            return max(0.05, 0.15 - relative_gap * 0.1)
+        return float(self._overlap_scores(
+            candidate_lo, candidate_hi, np.array([job_lo]), np.array([job_hi]),
+        )[0])
 
-        # 取候选人区间长度作为基准
-        candidate_span = candidate_hi - candidate_lo or 1.0
-        overlap_ratio = (overlap_hi - overlap_lo) / candidate_span
-        overlap_ratio = min(1.0, overlap_ratio)
-
-        # 查表映射
-        for threshold, s in self.OVERLAP_SCORES:
-            if overlap_ratio >= threshold:
-                return s
-        return 0.15
-    
-    def score(self, candidate: CandidateProfile, job: JobPosting) -> DimensionScore:
-        # 获取候选人期望薪资
-        candidate_salary = candidate.expected_salary
-        if candidate_salary is None:
-            candidate_salary = self._extract_salary_from_text(candidate.resume_text)
-
-        # 获取职位薪资范围
-        job_salary = job.salary_range
-        if job_salary is None:
-            job_salary = self._extract_salary_from_text(job.description)
+    def score(self, candidate: CandidateProfile, job: JobPosting, with_details: bool = True) -> DimensionScore:
+        # 获取候选人期望薪资 / 职位薪资范围
+        candidate_salary = self._candidate_range(candidate)
+        job_salary = self._job_range(job)
 
         # 无薪资信息时返回中性分
         if candidate_salary is None or job_salary is None:
             return DimensionScore(
-                score=0.5,
+                score=self.NEUTRAL_SCORE,
                 weight=self.weight,
-                weighted_score=0.5 * self.weight,
+                weighted_score=self.NEUTRAL_SCORE * self.weight,
                 confidence=0.3,
                 details={
                     "note": "insufficient salary data",
                     "candidate_salary_found": candidate_salary is not None,
                     "job_salary_found": job_salary is not None,
-                },
+                } if with_details else None,
             )
 
         c_lo, c_hi = self._normalize_to_usd_annual(candidate_salary)
@@ -156,5 +249,5 @@ class SalaryMatcher:
                 "candidate_range_usd": [round(c_lo), round(c_hi)],
                 "job_range_usd":       [round(j_lo), round(j_hi)],
                 "overlap_score":       round(overlap_score, 3),
-            },
+            } if with_details else None,
         )
\ No newline at end of file
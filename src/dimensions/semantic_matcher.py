@@ -3,6 +3,8 @@
 MPNet + FAISS 语义相似度
 """
 
+from functools import lru_cache
+
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from src.models.schemas import CandidateProfile, JobPosting, DimensionScore
@@ -14,15 +16,29 @@ class SemanticMatcher:
     def __init__(self, model_name: str = "sentence-transformers/all-mpnet-base-v2"):
         self.model = SentenceTransformer(model_name)
         self.weight = 0.30
+        # 最近的候选人向量：评分与写入候选人库共用同一次 encode
+        self._encode_resume = lru_cache(maxsize=32)(self._encode)
     
     def _encode(self, text: str) -> np.ndarray:
         return self.model.encode(text, normalize_embeddings=True)
-    
-    def score(self, candidate: CandidateProfile, job: JobPosting) -> DimensionScore:
-        resume_emb = self._encode(candidate.resume_text)
-        job_text = f"{job.title}\n{job.description}"
-        job_emb = self._encode(job_text)
 
+    def encode_candidate(self, candidate: CandidateProfile) -> np.ndarray:
+        """候选人语义向量（已 L2 归一化），可持久化后复用；同一简历只 encode 一次"""
+        return self._encode_resume(candidate.resume_text)
+
+    def encode_job(self, job: JobPosting) -> np.ndarray:
+        """职位语义向量（已 L2 归一化）"""
+        return self._encode(f"{job.title}\n{job.description}")
+
+    def encode_jobs(self, jobs: list[JobPosting]) -> np.ndarray:
+        """批量职位语义向量 (N, D)，一次 encode 调用"""
+        texts = [f"{job.title}\n{job.description}" for job in jobs]
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True)).reshape(len(jobs), -1)
+
+    def score_embeddings(
+        self, resume_emb: np.ndarray, job_emb: np.ndarray, with_details: bool = True,
+    ) -> DimensionScore:
+        """基于预计算向量评分，避免重复 encode"""
         # cosine similarity（已 normalize，直接点积）
         similarity = float(np.dot(resume_emb, job_emb))
         similarity = max(0.0, min(1.0, similarity))
@@ -31,5 +47,17 @@ class SemanticMatcher:
             score=similarity,
             weight=self.weight,
             weighted_score=similarity * self.weight,
-            details={"cosine_similarity": similarity},
-        )
\ No newline at end of file
+            details={"cosine_similarity": similarity} if with_details else None,
+        )
+    
+    def score_many(self, candidate: CandidateProfile, jobs: list[JobPosting]) -> np.ndarray:
+        """全部职位的数值分数：候选人只 encode 一次，职位批量 encode，一次矩阵乘法"""
+        if not jobs:
+            return np.empty(0, dtype=np.float64)
+        similarity = self.encode_jobs(jobs) @ self.encode_candidate(candidate)
+        return np.clip(similarity.astype(np.float64), 0.0, 1.0)
+
+    def score(self, candidate: CandidateProfile, job: JobPosting, with_details: bool = True) -> DimensionScore:
+        return self.score_embeddings(
+            self.encode_candidate(candidate), self.encode_job(job), with_details
+        )
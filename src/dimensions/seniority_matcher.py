@@ -5,6 +5,8 @@
 import re
 import logging
 from typing import Optional
+
+import numpy as np
 from src.models.schemas import CandidateProfile, JobPosting, DimensionScore
 from src.core.match_config import SENIORITY_HIERARCHY, SENIORITY_MATCH_SCORES, YEARS_TO_LEVEL, get_seniority_keywords
 
@@ -135,7 +137,17 @@ Resume:
 
         return 2, "default"
     
-    def score(self, candidate: CandidateProfile, job: JobPosting) -> DimensionScore:
+    def score_many(self, candidate: CandidateProfile, jobs: list[JobPosting]) -> np.ndarray:
+        """
+        全部职位的数值分数：候选人职级只推断一次（LLM 兜底最多调用一次），
+        职位职级逐个提取后按差值查表。
+        """
+        candidate_level, _ = self._get_candidate_level(candidate)
+        job_levels = np.array([self._get_job_level(job)[0] for job in jobs], dtype=np.int64)
+        table = np.array([SENIORITY_MATCH_SCORES.get(g, 0.1) for g in range(-3, 4)], dtype=np.float64)
+        return table[np.clip(candidate_level - job_levels, -3, 3) + 3]
+
+    def score(self, candidate: CandidateProfile, job: JobPosting, with_details: bool = True) -> DimensionScore:
         candidate_level, candidate_source = self._get_candidate_level(candidate)
         job_level, job_source = self._get_job_level(job)
 
@@ -155,7 +167,7 @@ Resume:
                 "job_level": job_level,
                 "job_source": job_source,
                 "gap": gap,
-            },
+            } if with_details else None,
         )
 
 
@@ -54,6 +54,9 @@ class SkillGraphMatcher:
         self.weight = 0.25
         # 预计算节点列表（小写归一化）
         self._nodes = {n.lower() for n in self.graph.nodes()}
+        # 图规模是常量，只算一次（原先每个职位的 details 都重新统计）
+        self._graph_nodes = self.graph.number_of_nodes()
+        self._graph_edges = self.graph.number_of_edges()
     
     def _normalize_skill(self, skill: str) -> str:
         return skill.lower().strip()
@@ -99,15 +102,17 @@ class SkillGraphMatcher:
         candidate_skills: list[str],
         required_skills: list[str],
         skill_weight: float = 1.0,
-    ) -> tuple[float, list[dict]]:
+        with_details: bool = True,
+    ) -> tuple[float, Optional[list[dict]]]:
         """
         候选人技能集 vs 要求技能集：
         贪心匹配，每个要求技能找候选人中最高分
+        with_details=False 时只返回分数，不构建逐项 details 列表
         """
         if not required_skills:
-            return 1.0, []
+            return 1.0, [] if with_details else None
 
-        details = []
+        details = [] if with_details else None
         total_score = 0.0
 
         for req in required_skills:
@@ -120,31 +125,57 @@ class SkillGraphMatcher:
                     best_match = cand
 
             total_score += best_score * skill_weight
-            details.append({
-                "required": req,
-                "matched_with": best_match,
-                "score": round(best_score, 3),
-            })
+            if with_details:
+                details.append({
+                    "required": req,
+                    "matched_with": best_match,
+                    "score": round(best_score, 3),
+                })
 
         avg_score = total_score / len(required_skills)
         return avg_score, details
     
-    def score(self, candidate: CandidateProfile, job: JobPosting) -> DimensionScore:
+    @staticmethod
+    def _combine(required_score: float, preferred_score: float, has_preferred: bool) -> float:
+        """必需技能 (权重 0.7) + 优选技能 (权重 0.3)；无优选技能时只看必需技能"""
+        final_score = required_score * 0.7 + preferred_score * 0.3 if has_preferred else required_score
+        return max(0.0, min(1.0, final_score))
+
+    def score_many(self, candidate: CandidateProfile, jobs: list[JobPosting]) -> np.ndarray:
+        """
+        全部职位的数值分数（与逐个 score 一致）。候选人固定时，每个要求技能的
+        最佳匹配分只取决于技能名本身，按技能名缓存后在职位间复用，不再逐职位重复图查找。
+        """
+        best: dict[str, float] = {}
+
+        def best_score(req: str) -> float:
+            if req not in best:
+                best[req] = max((self._skill_similarity(c, req) for c in candidate.skills), default=0.0)
+            return best[req]
+
+        def set_score(skills: list[str]) -> float:
+            return sum(best_score(s) for s in skills) / len(skills) if skills else 1.0
+
+        return np.array([
+            self._combine(set_score(job.required_skills), set_score(job.preferred_skills), bool(job.preferred_skills))
+            for job in jobs
+        ], dtype=np.float64)
+
+    def score(self, candidate: CandidateProfile, job: JobPosting, with_details: bool = True) -> DimensionScore:
         # 必需技能 (权重 0.7) + 优选技能 (权重 0.3)
         required_score, req_details = self._match_skill_set(
-            candidate.skills, job.required_skills, skill_weight=1.0
+            candidate.skills, job.required_skills, skill_weight=1.0, with_details=with_details
         )
         preferred_score, pref_details = self._match_skill_set(
-            candidate.skills, job.preferred_skills, skill_weight=1.0
+            candidate.skills, job.preferred_skills, skill_weight=1.0, with_details=with_details
         )
 
-        # 加权合并
-        if job.preferred_skills:
-            final_score = required_score * 0.7 + preferred_score * 0.3
-        else:
-            final_score = required_score
+        final_score = self._combine(required_score, preferred_score, bool(job.preferred_skills))
 
-        final_score = max(0.0, min(1.0, final_score))
+        if not with_details:
+            return DimensionScore(
+                score=final_score, weight=self.weight, weighted_score=final_score * self.weight,
+            )
 
         return DimensionScore(
             score=final_score,
@@ -155,7 +186,7 @@ class SkillGraphMatcher:
                 "preferred_skill_score": round(preferred_score, 3),
                 "required_details": req_details,
                 "preferred_details": pref_details,
-                "graph_nodes": self.graph.number_of_nodes(),
-                "graph_edges": self.graph.number_of_edges(),
+                "graph_nodes": self._graph_nodes,
+                "graph_edges": self._graph_edges,
             },
         )
\ No newline at end of file
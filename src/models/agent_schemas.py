@@ -50,6 +50,15 @@ class ResumeProfile:
             career_objective=self.career_objective,
         )
 
+    @classmethod
+    def from_dict(cls, data: dict) -> "ResumeProfile":
+        """Rebuild from dataclasses.asdict() output (e.g. a persisted candidate)."""
+        salary = data.get("expected_salary")
+        return cls(**{
+            **data,
+            "expected_salary": SalaryRange(**salary) if isinstance(salary, dict) else None,
+        })
+
 
 # ── Job ───────────────────────────────────────────────────────────────────────
 
@@ -133,7 +142,7 @@ class ComparisonRow:
 class JobComparisonMatrix:
     """
     Cross-job comparison table across key career dimensions.
-    Produced by InsightGeneratorAgent in Phase 3, after per-job insights.
+    Produced by InsightGeneratorAgent after per-job insights.
     """
     rows: list[ComparisonRow]           # 6–8 dimension rows
     recommendation: str                 # e.g. "Job B offers faster IC growth; Job A if targeting management"
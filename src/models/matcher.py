@@ -121,6 +121,16 @@ class JobMatcher:
             results.append(job)
         results.sort(key=lambda x: x["score"], reverse=True) # 按照综合分数排序
         return results
+
+    def recall_job_ids(self, resume_text: str, k: int) -> List[str]:
+        """
+        仅做 FAISS 语义召回，返回最相似的 k 个 job_id（无精排、无技能过滤）。
+        用于在五维评分完成前推测 top-k（例如提前启动反事实轨迹生成）。
+        """
+        resume_embedding = encode_texts([resume_text]).astype("float32")
+        faiss.normalize_L2(resume_embedding)
+        _, indices = self.index.search(resume_embedding, min(k, self.index.ntotal))
+        return [self.jobs[i].get("job_id", "") for i in indices[0] if 0 <= i < len(self.jobs)]
     
 
 
@@ -6,6 +6,8 @@ from dataclasses import dataclass, field
 from typing import Optional
 from enum import Enum
 
+import numpy as np
+
 class SeniorityLevel(str, Enum):
     INTERN = "intern"
     JUNIOR = "junior"
@@ -49,18 +51,28 @@ class JobPosting:
     culture_keywords: list[str] = field(default_factory=list)
     company_values: list[str] = field(default_factory=list)
 
-@dataclass
+# 维度名（与 FiveDimScore 字段、ScoreBatch 数组同序）
+DIMENSIONS: tuple[str, ...] = ("semantic", "skill_graph", "seniority", "culture", "salary")
+
+@dataclass(frozen=True, slots=True)
 class DimensionScore:
-    """单维度评分结果"""
+    """单维度评分结果（不可变、slots，无逐实例 __dict__）"""
     score: float                        # 0.0 ~ 1.0
     weight: float                       # 权重
     weighted_score: float               # = score * weight
-    details: dict = field(default_factory=dict)  # 调试细节
+    details: Optional[dict] = None      # 调试细节（None = 未生成，见 FiveDimScorer.score_batch(with_details)）
     confidence: float = 1.0            # 评分置信度
 
-@dataclass
+    def to_dict(self, with_details: bool = True) -> dict:
+        out = {"score": self.score, "weight": self.weight, "weighted_score": self.weighted_score}
+        if with_details:
+            out["details"] = self.details or {}
+            out["confidence"] = self.confidence
+        return out
+
+@dataclass(frozen=True, slots=True)
 class FiveDimScore:
-    """五维度综合评分"""
+    """五维度综合评分（不可变；final_score 在构造时计算）"""
     # 各维度分数
     semantic: DimensionScore
     skill_graph: DimensionScore
@@ -68,25 +80,91 @@ class FiveDimScore:
     culture: DimensionScore
     salary: DimensionScore
 
-    # 综合得分
-    final_score: float = 0.0
     job_id: str = ""
+    # 综合得分
+    final_score: float = field(init=False, default=0.0)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(
+            self, "final_score", sum(getattr(self, d).weighted_score for d in DIMENSIONS)
+        )
 
     def compute_final(self) -> float:
-        dims = [self.semantic, self.skill_graph,
-                self.seniority, self.culture, self.salary]
-        self.final_score = sum(d.weighted_score for d in dims)
         return self.final_score
 
+    def dimension_dicts(self, with_details: bool = False) -> dict[str, dict]:
+        """dim → {score, weight, weighted_score[, details, confidence]}，直接用于 API 响应"""
+        return {d: getattr(self, d).to_dict(with_details) for d in DIMENSIONS}
+
     def to_dict(self) -> dict:
         return {
             "job_id": self.job_id,
             "final_score": round(self.final_score, 4),
             "dimensions": {
-                "semantic":    {"score": self.semantic.score,    "weight": self.semantic.weight,    "details": self.semantic.details},
-                "skill_graph": {"score": self.skill_graph.score, "weight": self.skill_graph.weight, "details": self.skill_graph.details},
-                "seniority":   {"score": self.seniority.score,   "weight": self.seniority.weight,   "details": self.seniority.details},
-                "culture":     {"score": self.culture.score,     "weight": self.culture.weight,     "details": self.culture.details},
-                "salary":      {"score": self.salary.score,      "weight": self.salary.weight,      "details": self.salary.details},
+                d: {"score": getattr(self, d).score, "weight": getattr(self, d).weight,
+                    "details": getattr(self, d).details or {}}
+                for d in DIMENSIONS
+            },
+        }
+
+@dataclass(frozen=True, slots=True)
+class ScoreBatch:
+    """
+    Struct-of-arrays 批量评分结果：每个维度一个 float 数组 + final 数组。
+    全量目录评分只分配 6 个数组，不再为每个职位创建 FiveDimScore 对象；
+    截断 top-k 后可直接序列化为 API 响应，或物化为 FiveDimScore。
+    """
+    job_ids: list[str]
+    semantic: np.ndarray
+    skill_graph: np.ndarray
+    seniority: np.ndarray
+    culture: np.ndarray
+    salary: np.ndarray
+    final: np.ndarray
+    weights: tuple[float, ...]          # 与 DIMENSIONS 同序
+
+    def __len__(self) -> int:
+        return len(self.job_ids)
+
+    def select(self, idx: np.ndarray) -> "ScoreBatch":
+        return ScoreBatch(
+            job_ids=[self.job_ids[i] for i in idx],
+            **{d: getattr(self, d)[idx] for d in DIMENSIONS},
+            final=self.final[idx],
+            weights=self.weights,
+        )
+
+    def top_k(self, k: Optional[int] = None) -> "ScoreBatch":
+        """按 final 降序（稳定排序，与 list.sort(reverse=True) 一致）截取前 k 个"""
+        order = np.argsort(-self.final, kind="stable")
+        return self.select(order[:k] if k else order)
+
+    def to_rows(self) -> list[dict]:
+        """直接从数组序列化：[{job_id, final_score, five_dim_score: {dim: {...}}}]"""
+        cols = {d: getattr(self, d).tolist() for d in DIMENSIONS}
+        finals = self.final.tolist()
+        return [
+            {
+                "job_id": job_id,
+                "final_score": finals[i],
+                "five_dim_score": {
+                    d: {"score": cols[d][i], "weight": w, "weighted_score": cols[d][i] * w}
+                    for d, w in zip(DIMENSIONS, self.weights)
+                },
             }
-        }
\ No newline at end of file
+            for i, job_id in enumerate(self.job_ids)
+        ]
+
+    def to_scores(self) -> list[FiveDimScore]:
+        """物化为 FiveDimScore 列表（无 details），直接从数组构造"""
+        cols = {d: getattr(self, d).tolist() for d in DIMENSIONS}
+        return [
+            FiveDimScore(
+                job_id=job_id,
+                **{
+                    d: DimensionScore(score=cols[d][i], weight=w, weighted_score=cols[d][i] * w)
+                    for d, w in zip(DIMENSIONS, self.weights)
+                },
+            )
+            for i, job_id in enumerate(self.job_ids)
+        ]
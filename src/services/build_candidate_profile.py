@@ -47,23 +47,18 @@ def build_candidate_profile(resume_text: str, parsed: dict,) -> CandidateProfile
         culture_keywords=raw.get("culture_keywords", []),
     )
 
-def five_dim_result_to_job_dict(result, job_meta: dict) -> dict:
-    """将五维评分结果转换为API输出的JobMatch格式"""
+def five_dim_result_to_job_dict(row: dict, job_meta: dict) -> dict:
+    """将五维评分结果（ScoreBatch.to_rows() 的一行）转换为API输出的JobMatch格式"""
+    dims = row["five_dim_score"]
     return {
-        "job_id": result.job_id,
+        "job_id": row["job_id"],
         "job_title": job_meta.get("job_title") or job_meta.get("title", ""),
         "company": job_meta.get("company", ""),
-        "score": result.final_score,
-        "semantic_score": result.semantic.score,
-        "skill_overlap": result.skill_graph.score,
-        "rule_bonus": result.seniority.score,
-        "_five_dim": {
-            "semantic":    result.semantic.__dict__,
-            "skill_graph": result.skill_graph.__dict__,
-            "seniority":   result.seniority.__dict__,
-            "culture":     result.culture.__dict__,
-            "salary":      result.salary.__dict__,
-        },
+        "score": row["final_score"],
+        "semantic_score": dims["semantic"]["score"],
+        "skill_overlap": dims["skill_graph"]["score"],
+        "rule_bonus": dims["seniority"]["score"],
+        "_five_dim": dims,
         # LLM 解释器需要的原始描述（保持透传）
         "description": job_meta.get("description", ""),
         "required_skills": job_meta.get("required_skills", []),
@@ -0,0 +1,452 @@
+"""
+Candidate store + FAISS candidate index for reverse (job → candidates) matching.
+
+Every parsed ResumeProfile is persisted together with the vectors the
+five-dim scorer needs, so a job can be ranked against the whole candidate
+pool without re-parsing or re-encoding any resume:
+
+  - semantic embedding  (MPNet, L2-normalised)   → FAISS IndexFlatIP recall
+  - culture vector      (MiniLM culture anchors)  → culture dimension rerank
+  - skill ids           (normalised skill names)  → skill graph rerank
+
+On-disk layout:
+  data/candidates/candidates.sqlite3        one row per candidate: profile, skill ids and
+                                            both vectors; a version counter bumped per write
+  data/candidates/candidates_faiss.index    IndexIDMap2(IndexFlatIP), id = row; a snapshot
+                                            saved every INDEX_SAVE_EVERY writes
+
+Writes are one SQLite row each (no whole-store rewrite), so ingestion stays
+O(1) per candidate and a crash cannot corrupt earlier rows. The API and the
+Celery workers share the same database: before every read a process applies
+the rows written since its last look (by itself or any other process), so
+worker inserts become visible to the API. The FAISS snapshot is written to a
+temp file and os.replace()d, and only ever replaces an older snapshot; rows
+newer than the snapshot are added on load.
+
+Retention: indexing can be switched off (CANDIDATE_STORE_ENABLED), and
+candidates not re-uploaded within CANDIDATE_STORE_TTL_SECONDS are purged, as
+is any candidate removed through delete(). A purged row is blanked (no
+profile, no vectors) and kept as a tombstone with a new seq, so the delete
+reaches every process through the same sync path as an insert.
+
+反向匹配（岗位 → 候选人）的候选人库与 FAISS 候选人索引。
+持久化已解析的 ResumeProfile 及其语义向量、文化向量和技能 id，
+岗位可直接在全量候选人中"召回 + 五维精排"，无需重新解析或编码简历。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+import faiss
+import numpy as np
+
+from src.core.app_config import get_app_config
+from src.models.agent_schemas import ResumeProfile
+from src.models.schemas import FiveDimScore, JobPosting
+
+logger = logging.getLogger(__name__)
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+CANDIDATE_DIR = ROOT_DIR / "data" / "candidates"
+
+# FAISS recall size = top_k × multiplier (at least MIN_RECALL), then 5-dim rerank
+CANDIDATE_RECALL_MULTIPLIER = 10
+MIN_RECALL = 50
+
+
+def candidate_fingerprint(resume_text: str) -> str:
+    """Stable candidate id: SHA-256 of the embedding-ready resume text."""
+    return hashlib.sha256(resume_text.encode("utf-8")).hexdigest()[:32]
+
+
+def normalize_skill_ids(skills: list[str]) -> list[str]:
+    """Lower-cased, de-duplicated skill names (the skill graph's node ids)."""
+    seen: dict[str, None] = {}
+    for s in skills:
+        key = s.lower().strip()
+        if key:
+            seen.setdefault(key, None)
+    return list(seen)
+
+
+@dataclass
+class CandidateRecord:
+    """One stored candidate: parsed profile plus precomputed scoring vectors."""
+    candidate_id: str
+    profile: ResumeProfile
+    skill_ids: list[str]
+    semantic: np.ndarray
+    culture: np.ndarray
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS candidates (
+    row           INTEGER PRIMARY KEY AUTOINCREMENT,
+    candidate_id  TEXT NOT NULL UNIQUE,
+    profile       TEXT NOT NULL,
+    skill_ids     TEXT NOT NULL,
+    semantic      BLOB NOT NULL,
+    culture       BLOB NOT NULL,
+    seq           INTEGER NOT NULL,
+    updated_at    REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_candidates_seq ON candidates (seq);
+CREATE TABLE IF NOT EXISTS store_meta (
+    key    TEXT PRIMARY KEY,
+    value  INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO store_meta VALUES ('version', 0), ('index_version', 0);
+"""
+
+# Rows blanked by delete() / purge_expired(): empty vectors mark a tombstone
+_TOMBSTONE = "profile = '{}', skill_ids = '[]', semantic = x'', culture = x''"
+
+INDEX_SAVE_EVERY = 100      # writes between FAISS snapshots
+
+
+class CandidateStore:
+    """
+    Thread- and multi-process-safe candidate store: SQLite rows as the source
+    of truth, an in-memory vector matrix + FAISS index as the read path.
+    Upserts are keyed by candidate_id, so re-uploading the same resume
+    replaces the previous row instead of duplicating it. ttl > 0 purges
+    candidates not written for that many seconds.
+    """
+
+    def __init__(self, root: Path = CANDIDATE_DIR, ttl: float = 0) -> None:
+        self._root = root
+        self._ttl = ttl
+        self._db_path = root / "candidates.sqlite3"
+        self._index_path = root / "candidates_faiss.index"
+
+        self._lock = threading.Lock()
+        self._meta: dict[str, dict] = {}          # candidate_id → {"row", "profile", "skill_ids"}
+        self._row_to_id: dict[int, str] = {}
+        self._semantic: Optional[np.ndarray] = None   # (capacity, D), position = row
+        self._culture: Optional[np.ndarray] = None
+        self._index: Optional[faiss.Index] = None
+        self._indexed: set[int] = set()   # rows present in self._index
+        self._version = 0            # store version applied in memory
+        self._index_version = 0      # store version covered by the loaded / saved snapshot
+        self._snapshot_checked = 0   # store version of the newest snapshot on disk, as last seen
+        self._load()
+
+    # ── Persistence ──────────────────────────────────────────────────────────
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._db_path, timeout=10)
+
+    def _load(self) -> None:
+        self._root.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+            columns = {c[1] for c in conn.execute("PRAGMA table_info(candidates)")}
+            if "updated_at" not in columns:        # stores created before retention existed
+                conn.execute("ALTER TABLE candidates ADD COLUMN updated_at REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE candidates SET updated_at = ?", (time.time(),))
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_candidates_updated_at ON candidates (updated_at)")
+            index_version = conn.execute("SELECT value FROM store_meta WHERE key = 'index_version'").fetchone()[0]
+            empty = conn.execute("SELECT COUNT(*) FROM candidates").fetchone()[0] == 0
+        if empty and (self._root / "candidates_meta.json").exists():
+            self._import_legacy()
+        if index_version and self._index_path.exists():
+            try:
+                self._index = faiss.read_index(str(self._index_path))
+                self._indexed = set(faiss.vector_to_array(self._index.id_map).tolist())
+                self._index_version = self._snapshot_checked = index_version
+            except RuntimeError as e:
+                logger.warning(f"[CandidateStore] Unreadable FAISS snapshot, rebuilding: {e}")
+        self._sync()
+        self.purge_expired()
+        if self._meta:
+            logger.info(f"[CandidateStore] Loaded {len(self._meta)} candidates from {self._root}")
+
+    def _import_legacy(self) -> None:
+        """One-off import of the old JSON + .npy layout into SQLite."""
+        with open(self._root / "candidates_meta.json", "r", encoding="utf-8") as f:
+            meta = json.load(f)["candidates"]
+        semantic = np.load(self._root / "candidates_semantic.npy").astype("float32")
+        culture = np.load(self._root / "candidates_culture.npy").astype("float32")
+        with closing(self._connect()) as conn, conn:
+            for candidate_id, m in sorted(meta.items(), key=lambda item: item[1]["row"]):
+                conn.execute(
+                    "INSERT OR IGNORE INTO candidates "
+                    "(candidate_id, profile, skill_ids, semantic, culture, seq, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, 1, ?)",
+                    (candidate_id, json.dumps(m["profile"], ensure_ascii=False),
+                     json.dumps(m["skill_ids"], ensure_ascii=False),
+                     semantic[m["row"]].tobytes(), culture[m["row"]].tobytes(), time.time()),
+                )
+            conn.execute("UPDATE store_meta SET value = MAX(value, 1) WHERE key = 'version'")
+            conn.execute("UPDATE store_meta SET value = 0 WHERE key = 'index_version'")
+        logger.info(f"[CandidateStore] Imported {len(meta)} candidates from the legacy JSON layout")
+
+    def _sync(self) -> None:
+        """Apply rows written since the last sync, by this or any other process. Caller holds the lock."""
+        with closing(self._connect()) as conn, conn:
+            version = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+            if version == self._version:
+                return
+            rows = conn.execute(
+                "SELECT row, candidate_id, profile, skill_ids, semantic, culture, seq FROM candidates "
+                "WHERE seq > ? AND seq <= ? ORDER BY row",
+                (self._version, version),
+            ).fetchall()
+        live = [r for r in rows if r[4]]
+        if live:
+            sem_dim = len(live[0][4]) // 4
+            cul_dim = len(live[0][5]) // 4
+            self._reserve(live[-1][0] + 1, sem_dim, cul_dim)
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(sem_dim))
+
+        reindex, stale = [], []
+        for row, candidate_id, profile, skill_ids, semantic, culture, seq in rows:
+            if row in self._indexed and (not semantic or seq > self._index_version):
+                stale.append(row)                  # deleted, or replaced since the snapshot
+            if not semantic:                       # tombstone
+                self._meta.pop(candidate_id, None)
+                self._row_to_id.pop(row, None)
+                continue
+            if seq > self._index_version:          # not in the snapshot yet (or replaced since)
+                reindex.append(row)
+            self._semantic[row] = np.frombuffer(semantic, dtype="float32")
+            self._culture[row] = np.frombuffer(culture, dtype="float32")
+            self._meta[candidate_id] = {"row": row, "profile": json.loads(profile), "skill_ids": json.loads(skill_ids)}
+            self._row_to_id[row] = candidate_id
+        if stale:
+            self._index.remove_ids(np.array(stale, dtype="int64"))     # O(ntotal), so only when needed
+            self._indexed.difference_update(stale)
+        if reindex:
+            ids = np.array(reindex, dtype="int64")
+            self._index.add_with_ids(self._semantic[ids], ids)
+            self._indexed.update(reindex)
+        self._version = version
+
+    def _reserve(self, rows: int, sem_dim: int, cul_dim: int) -> None:
+        """Grow the vector matrices geometrically, so appends are amortised O(1)."""
+        if self._semantic is None:
+            capacity = max(rows, 64)
+            self._semantic = np.zeros((capacity, sem_dim), dtype="float32")
+            self._culture = np.zeros((capacity, cul_dim), dtype="float32")
+        elif rows > self._semantic.shape[0]:
+            capacity = max(rows, 2 * self._semantic.shape[0])
+            for name in ("_semantic", "_culture"):
+                old = getattr(self, name)
+                grown = np.zeros((capacity, old.shape[1]), dtype="float32")
+                grown[: old.shape[0]] = old
+                setattr(self, name, grown)
+
+    def _save_index(self) -> None:
+        """Snapshot the FAISS index (temp file + os.replace) unless a newer one is on disk."""
+        tmp = self._index_path.with_name(f"{self._index_path.name}.{os.getpid()}.tmp")
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")        # serialises snapshot writers across processes
+            saved = conn.execute("SELECT value FROM store_meta WHERE key = 'index_version'").fetchone()[0]
+            if saved >= self._version:       # another process got there first: back off until
+                conn.rollback()                # INDEX_SAVE_EVERY more writes past its snapshot
+                self._snapshot_checked = saved
+                return
+            faiss.write_index(self._index, str(tmp))
+            os.replace(tmp, self._index_path)
+            conn.execute("UPDATE store_meta SET value = ? WHERE key = 'index_version'", (self._version,))
+            conn.commit()
+        self._index_version = self._snapshot_checked = self._version
+
+    # ── Writes ───────────────────────────────────────────────────────────────
+
+    def upsert(
+        self,
+        profile: ResumeProfile,
+        semantic: np.ndarray,
+        culture: np.ndarray,
+    ) -> str:
+        """Insert or replace a candidate; returns its candidate_id."""
+        candidate_id = candidate_fingerprint(profile.resume_text)
+        sem = np.asarray(semantic, dtype="float32").ravel()
+        cul = np.asarray(culture, dtype="float32").ravel()
+
+        with self._lock:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("UPDATE store_meta SET value = value + 1 WHERE key = 'version'")
+                seq = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0]
+                conn.execute(
+                    "INSERT INTO candidates (candidate_id, profile, skill_ids, semantic, culture, seq, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (candidate_id) DO UPDATE SET profile = excluded.profile, "
+                    "skill_ids = excluded.skill_ids, semantic = excluded.semantic, "
+                    "culture = excluded.culture, seq = excluded.seq, updated_at = excluded.updated_at",
+                    (
+                        candidate_id,
+                        json.dumps(asdict(profile), ensure_ascii=False),
+                        json.dumps(normalize_skill_ids(profile.skills), ensure_ascii=False),
+                        sem.tobytes(),
+                        cul.tobytes(),
+                        seq,
+                        time.time(),
+                    ),
+                )
+            self._sync()
+            if self._version - self._snapshot_checked >= INDEX_SAVE_EVERY:
+                self._save_index()
+
+        logger.info(f"[CandidateStore] Upserted candidate {candidate_id} (total={len(self._meta)})")
+        return candidate_id
+
+    def _blank(self, where: str, params: tuple) -> int:
+        """Tombstone the live rows matching `where` under one new seq; returns how many."""
+        with self._lock:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("BEGIN IMMEDIATE")
+                seq = conn.execute("SELECT value FROM store_meta WHERE key = 'version'").fetchone()[0] + 1
+                blanked = conn.execute(
+                    f"UPDATE candidates SET {_TOMBSTONE}, seq = ? WHERE length(semantic) > 0 AND {where}",
+                    (seq, *params),
+                ).rowcount
+                if blanked:
+                    conn.execute("UPDATE store_meta SET value = ? WHERE key = 'version'", (seq,))
+            self._sync()
+        return blanked
+
+    def delete(self, candidate_id: str) -> bool:
+        """Remove a candidate (profile and vectors); False if it was not stored."""
+        deleted = self._blank("candidate_id = ?", (candidate_id,)) > 0
+        if deleted:
+            logger.info(f"[CandidateStore] Deleted candidate {candidate_id}")
+        return deleted
+
+    def purge_expired(self) -> int:
+        """Remove candidates not written within the TTL (no-op without one); returns how many."""
+        if self._ttl <= 0:
+            return 0
+        cutoff = time.time() - self._ttl
+        with closing(self._connect()) as conn:        # cheap indexed probe before taking the write lock
+            expired = conn.execute(
+                "SELECT 1 FROM candidates WHERE updated_at < ? AND length(semantic) > 0 LIMIT 1", (cutoff,)
+            ).fetchone()
+        if expired is None:
+            return 0
+        purged = self._blank("updated_at < ?", (cutoff,))
+        logger.info(f"[CandidateStore] Purged {purged} candidates older than {self._ttl:.0f}s")
+        return purged
+
+    # ── Reads ────────────────────────────────────────────────────────────────
+    # Every read first picks up rows written by other processes (one indexed SELECT).
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sync()
+            return len(self._meta)
+
+    def _record(self, candidate_id: str) -> CandidateRecord:
+        m = self._meta[candidate_id]
+        row = m["row"]
+        return CandidateRecord(
+            candidate_id=candidate_id,
+            profile=ResumeProfile.from_dict(m["profile"]),
+            skill_ids=m["skill_ids"],
+            semantic=self._semantic[row].copy(),
+            culture=self._culture[row].copy(),
+        )
+
+    def get(self, candidate_id: str) -> Optional[CandidateRecord]:
+        with self._lock:
+            self._sync()
+            if candidate_id not in self._meta:
+                return None
+            return self._record(candidate_id)
+
+    def records(self) -> list[CandidateRecord]:
+        """Snapshot of every stored candidate."""
+        with self._lock:
+            self._sync()
+            return [self._record(cid) for cid in self._meta]
+
+    def search(self, query: np.ndarray, k: int) -> list[CandidateRecord]:
+        """FAISS inner-product recall of the k most similar candidates."""
+        with self._lock:
+            self._sync()
+            if self._index is None or self._index.ntotal == 0:
+                return []
+            q = np.asarray(query, dtype="float32").reshape(1, -1)
+            _, rows = self._index.search(q, min(k, self._index.ntotal))
+            return [self._record(self._row_to_id[int(r)]) for r in rows[0] if r >= 0]
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_candidate_store: CandidateStore | None = None
+
+
+def get_candidate_store() -> CandidateStore:
+    global _candidate_store
+    if _candidate_store is None:
+        _candidate_store = CandidateStore(ttl=get_app_config().CANDIDATE_STORE_TTL_SECONDS)
+    return _candidate_store
+
+
+# ── Scoring helpers (run in executor — PyTorch encode) ────────────────────────
+
+def index_candidate(scorer, profile: ResumeProfile, store: Optional[CandidateStore] = None) -> str:
+    """
+    Persist a parsed profile in the candidate store. A known candidate whose
+    profile is unchanged is left alone (no version bump, no FAISS churn); the
+    vectors come from the scorer's per-resume cache, so a resume that was just
+    scored is not encoded again.
+    """
+    store = get_candidate_store() if store is None else store
+    store.purge_expired()
+    candidate_id = candidate_fingerprint(profile.resume_text)
+    existing = store.get(candidate_id)
+    if existing is not None and existing.profile == profile:
+        logger.debug(f"[CandidateStore] Candidate {candidate_id} unchanged, not re-indexed")
+        return candidate_id
+    candidate = profile.to_candidate_profile()
+    return store.upsert(
+        profile,
+        semantic=scorer.semantic.encode_candidate(candidate),
+        culture=scorer.culture.candidate_vector(candidate),
+    )
+
+
+def match_candidates_for_job(
+    scorer,
+    job: JobPosting,
+    top_k: int,
+    store: Optional[CandidateStore] = None,
+) -> tuple[list[tuple[CandidateRecord, FiveDimScore]], int]:
+    """
+    Reverse matching: FAISS recall over the candidate index, then the same
+    five-dim rerank used for resume → jobs, using stored vectors only.
+    Returns the top_k (record, score) pairs and the candidate pool size.
+    反向匹配：FAISS 召回候选人，再用已存储的向量做五维精排。
+    """
+    store = get_candidate_store() if store is None else store
+    store.purge_expired()
+    job_emb = scorer.semantic.encode_job(job)
+    job_culture = scorer.culture.job_vector(job)
+
+    recall = max(top_k * CANDIDATE_RECALL_MULTIPLIER, MIN_RECALL)
+    recalled = store.search(job_emb, recall)
+
+    ranked = []
+    for rec in recalled:
+        candidate = rec.profile.to_candidate_profile()
+        candidate.skills = rec.skill_ids
+        ranked.append((rec, scorer.score_with_vectors(
+            candidate, job, rec.semantic, rec.culture, job_emb, job_culture, with_details=False,
+        )))
+    ranked.sort(key=lambda pair: pair[1].final_score, reverse=True)
+    return ranked[:top_k], len(store)
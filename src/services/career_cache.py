@@ -0,0 +1,139 @@
+"""
+Career prediction cache keyed by a candidate profile fingerprint.
+
+CareerPathPredictorAgent's output depends only on the current title, years of
+experience, seniority, skills, soft skills and career objective. The
+fingerprint canonicalises exactly those fields, so re-uploads and
+near-identical profiles reuse one prediction instead of a 3–8s Moonshot call:
+
+  - text fields are lowercased and whitespace-collapsed
+  - skills / soft skills are de-duplicated, lowercased and sorted
+  - years of experience are bucketed (_YEARS_BUCKETS)
+
+In-process LRU (CAREER_CACHE_MAX_ENTRIES) with CAREER_CACHE_TTL_SECONDS. Hits
+and misses are counted in `career_cache_lookups_total{result}` and in
+CareerPredictionCache.stats().
+
+职业路径预测缓存：以候选人画像指纹（职位、经验年限分桶、职级、技能、软技能、职业目标，
+规范化后哈希）为键，进程内 LRU + TTL；相同或近似的画像不再重复调用 LLM。
+"""
+
+from __future__ import annotations
+
+import bisect
+import copy
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from src.core.app_config import get_app_config
+from src.core.metrics import CAREER_CACHE_LOOKUPS
+from src.models.agent_schemas import CareerPrediction, ResumeProfile
+
+# Upper bounds (exclusive) of the experience buckets: <1, 1–3, 3–5, 5–8, 8–12, 12+ years
+_YEARS_BUCKETS = (1, 3, 5, 8, 12)
+
+
+def _text(value: Optional[str]) -> str:
+    return " ".join((value or "").lower().split())
+
+
+def _skills(values) -> list[str]:
+    return sorted({_text(v) for v in values or [] if _text(v)})
+
+
+def years_bucket(years: Optional[float]) -> Optional[int]:
+    return None if years is None else bisect.bisect_right(_YEARS_BUCKETS, years)
+
+
+def profile_fingerprint(profile: ResumeProfile) -> str:
+    """Stable key of the profile fields the career prediction depends on."""
+    canonical = json.dumps(
+        {
+            "title": _text(profile.current_title),
+            "years": years_bucket(profile.years_of_experience),
+            "seniority": _text(profile.seniority_self_reported),
+            "skills": _skills(profile.skills),
+            "soft_skills": _skills(profile.soft_skills),
+            "objective": _text(profile.career_objective),
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class CareerPredictionCache:
+    """LRU + TTL cache of CareerPrediction by profile fingerprint. Thread-safe."""
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, CareerPrediction]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._counts = {"hit": 0, "miss": 0}
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self._counts[result] += 1
+        CAREER_CACHE_LOOKUPS.labels(result=result).inc()
+
+    def get(self, key: str) -> Optional[CareerPrediction]:
+        """A private copy of the cached prediction, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.time():
+                del self._entries[key]
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            self._count("miss")
+            return None
+        self._count("hit")
+        return copy.deepcopy(entry[1])
+
+    def put(self, key: str, prediction: CareerPrediction) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + self._ttl, copy.deepcopy(prediction))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._entries)
+        total = sum(counts.values())
+        return {
+            **counts,
+            "lookups": total,
+            "hit_rate": round(counts["hit"] / total, 4) if total else 0.0,
+            "entries": entries,
+        }
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_career_cache: CareerPredictionCache | None = None
+
+
+def get_career_cache() -> CareerPredictionCache:
+    global _career_cache
+    if _career_cache is None:
+        cfg = get_app_config()
+        _career_cache = CareerPredictionCache(
+            max_entries=cfg.CAREER_CACHE_MAX_ENTRIES,
+            ttl=cfg.CAREER_CACHE_TTL_SECONDS,
+        )
+    return _career_cache
@@ -0,0 +1,202 @@
+"""
+Circuit breaker for the LLM provider, shared by every call in the process.
+
+States:
+  closed     calls flow; outcomes are kept in a rolling window of
+             LLM_CIRCUIT_WINDOW_SECONDS. Once it holds LLM_CIRCUIT_MIN_CALLS
+             calls, the breaker opens when the provider-failure rate reaches
+             LLM_CIRCUIT_ERROR_RATE or the share of calls slower than
+             LLM_CIRCUIT_SLOW_CALL_SECONDS reaches LLM_CIRCUIT_SLOW_RATE
+  open       calls fail fast with CircuitOpenError (no limiter wait, no
+             retries), so agents drop straight to their degraded fallbacks
+  half_open  after LLM_CIRCUIT_OPEN_SECONDS, up to LLM_CIRCUIT_HALF_OPEN_PROBES
+             probe calls are let through; all succeeding closes the circuit,
+             any failure re-opens it
+
+Only provider faults count as failures (connection errors, timeouts, 429 and
+5xx); a 4xx caused by the request itself proves the provider is reachable.
+State is exported as the `llm_circuit_state` gauge and shown on /health.
+
+LLM 提供方熔断器：closed / open / half_open 三态，基于滑动窗口的错误率与慢调用率。
+熔断打开时调用立即失败（CircuitOpenError），各 Agent 直接走降级逻辑；
+冷却后放行少量探测请求，全部成功则恢复，任一失败则重新打开。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable
+
+import httpx
+import openai
+
+from src.core.app_config import get_app_config
+from src.core.metrics import LLM_CIRCUIT_REJECTED, LLM_CIRCUIT_STATE, LLM_CIRCUIT_TRANSITIONS
+
+logger = logging.getLogger(__name__)
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+_PROVIDER_FAULTS = (
+    openai.APIConnectionError,       # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+    httpx.TransportError,
+    asyncio.TimeoutError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling the provider while the circuit is open."""
+
+
+def is_provider_failure(exc: BaseException) -> bool:
+    return isinstance(exc, _PROVIDER_FAULTS)
+
+
+class CircuitBreaker:
+    """Thread-safe rolling-window circuit breaker."""
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        window_seconds: float,
+        min_calls: int,
+        error_rate: float,
+        slow_call_seconds: float,
+        slow_rate: float,
+        open_seconds: float,
+        half_open_probes: int,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self._window_seconds = window_seconds
+        self._min_calls = min_calls
+        self._error_rate = error_rate
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_rate = slow_rate
+        self._open_seconds = open_seconds
+        self._half_open_probes = max(1, half_open_probes)
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._calls: deque[tuple[float, bool, bool]] = deque()   # (ts, failed, slow)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probes_started = 0
+        self._probes_ok = 0
+        LLM_CIRCUIT_STATE.labels(name=name).set(0)
+
+    # ── State machine ────────────────────────────────────────────────────────
+
+    def _transition(self, state: str) -> None:
+        if state == self._state:
+            return
+        logger.warning(f"[CircuitBreaker] {self.name}: {self._state} → {state}")
+        self._state = state
+        if state == OPEN:
+            self._opened_at = self._clock()
+        if state == HALF_OPEN:
+            self._probes_started = self._probes_ok = 0
+        if state == CLOSED:
+            self._calls.clear()
+        LLM_CIRCUIT_STATE.labels(name=self.name).set(_STATE_VALUE[state])
+        LLM_CIRCUIT_TRANSITIONS.labels(name=self.name, state=state).inc()
+
+    def _prune(self, now: float) -> None:
+        while self._calls and self._calls[0][0] < now - self._window_seconds:
+            self._calls.popleft()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self._open_seconds:
+                self._transition(HALF_OPEN)
+            return self._state
+
+    def before_call(self) -> None:
+        """Gate one call; raises CircuitOpenError when it must not go out."""
+        with self._lock:
+            if self._state == OPEN and self._clock() - self._opened_at >= self._open_seconds:
+                self._transition(HALF_OPEN)
+            if self._state == OPEN or (
+                self._state == HALF_OPEN and self._probes_started >= self._half_open_probes
+            ):
+                LLM_CIRCUIT_REJECTED.labels(name=self.name).inc()
+                raise CircuitOpenError(f"{self.name} circuit is {self._state} — failing fast")
+            if self._state == HALF_OPEN:
+                self._probes_started += 1
+
+    def record(self, *, failed: bool, latency: float) -> None:
+        """Outcome of a call admitted by before_call()."""
+        slow = latency >= self._slow_call_seconds
+        with self._lock:
+            if self._state == HALF_OPEN:
+                if failed or slow:
+                    self._transition(OPEN)
+                else:
+                    self._probes_ok += 1
+                    if self._probes_ok >= self._half_open_probes:
+                        self._transition(CLOSED)
+                return
+            if self._state == OPEN:
+                return   # straggler admitted before the trip
+
+            now = self._clock()
+            self._calls.append((now, failed, slow))
+            self._prune(now)
+            n = len(self._calls)
+            if n < self._min_calls:
+                return
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slows = sum(1 for _, _, s in self._calls if s)
+            if failures / n >= self._error_rate or slows / n >= self._slow_rate:
+                self._transition(OPEN)
+
+    def cancelled(self) -> None:
+        """A gated call was cancelled before finishing — hand its probe slot back."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes_started > 0:
+                self._probes_started -= 1
+
+    def snapshot(self) -> dict[str, Any]:
+        state = self.state
+        with self._lock:
+            self._prune(self._clock())
+            n = len(self._calls)
+            failures = sum(1 for _, f, _ in self._calls if f)
+            slows = sum(1 for _, _, s in self._calls if s)
+        return {
+            "state": state,
+            "window_calls": n,
+            "error_rate": round(failures / n, 4) if n else 0.0,
+            "slow_rate": round(slows / n, 4) if n else 0.0,
+        }
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_llm_breaker: CircuitBreaker | None = None
+
+
+def get_llm_breaker() -> CircuitBreaker:
+    global _llm_breaker
+    if _llm_breaker is None:
+        cfg = get_app_config()
+        _llm_breaker = CircuitBreaker(
+            "moonshot",
+            window_seconds=cfg.LLM_CIRCUIT_WINDOW_SECONDS,
+            min_calls=cfg.LLM_CIRCUIT_MIN_CALLS,
+            error_rate=cfg.LLM_CIRCUIT_ERROR_RATE,
+            slow_call_seconds=cfg.LLM_CIRCUIT_SLOW_CALL_SECONDS,
+            slow_rate=cfg.LLM_CIRCUIT_SLOW_RATE,
+            open_seconds=cfg.LLM_CIRCUIT_OPEN_SECONDS,
+            half_open_probes=cfg.LLM_CIRCUIT_HALF_OPEN_PROBES,
+        )
+    return _llm_breaker
@@ -0,0 +1,258 @@
+"""
+Resume document text extraction in a bounded process pool.
+
+PDF parsing is CPU-bound and, for pdfplumber, pure-Python and GIL-heavy; a
+large or malicious upload used to stall every other request's executor
+thread. Extraction now runs in a small ProcessPoolExecutor
+(EXTRACT_MAX_WORKERS, spawned workers recycled every _TASKS_PER_WORKER
+documents) with per-document caps:
+
+  - pages:  only the first EXTRACT_MAX_PAGES pages are read
+  - time:   EXTRACT_TIMEOUT_SECONDS (shortened by the request deadline) of
+            execution; the worker interrupts itself with SIGALRM. Time spent
+            queued behind other documents does not count: the parent waits
+            for every document ahead of it plus its own cap, and never kills
+            workers — that would fail every other extraction in the pool
+
+PDFs go through pypdfium2 first (native, fast); files where it yields almost
+no text — layout-heavy or unusual encodings — fall back to pdfplumber. DOCX
+files are read with docx2txt. Durations, page counts and failures are
+exported as Prometheus metrics (recorded in the parent process).
+
+简历文档文本提取：在有界进程池中执行，按文档限制页数与耗时；
+PDF 优先使用 pypdfium2 快速提取，文本过少时回退 pdfplumber；DOCX 使用 docx2txt。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import io
+import logging
+import multiprocessing
+import signal
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple, Optional
+
+from src.core.app_config import get_app_config
+from src.core.deadline import budget, check
+from src.core.metrics import EXTRACT_DURATION, EXTRACT_FAILURES, EXTRACT_PAGES
+
+logger = logging.getLogger(__name__)
+
+_TASKS_PER_WORKER = 50          # recycle workers so parser memory bloat cannot accumulate
+_MIN_CHARS_PER_PAGE = 20        # below this the pypdfium2 text is considered unusable
+_ALARM_GRACE_SECONDS = 2.0      # parent-side margin on top of the worker's own alarm
+
+
+class ExtractionError(ValueError):
+    """The document could not be turned into text (corrupt, too slow, unsupported)."""
+
+
+class ExtractionTimeout(ExtractionError):
+    """Extraction hit its time cap."""
+
+
+class Extraction(NamedTuple):
+    text: str
+    method: str          # pdfium / pdfplumber / docx
+    pages: int           # pages in the document (0 for DOCX)
+    pages_read: int
+    seconds: float
+
+
+# ── Worker side (runs in the pool process) ───────────────────────────────────
+
+class _Timeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise _Timeout()
+
+
+def _pdfium_text(file_bytes: bytes, max_pages: int) -> tuple[str, int, int]:
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(file_bytes)
+    try:
+        total = len(pdf)
+        chunks = []
+        for i in range(min(total, max_pages)):
+            page = pdf[i]
+            textpage = page.get_textpage()
+            chunks.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return "\n".join(chunks).strip(), total, min(total, max_pages)
+    finally:
+        pdf.close()
+
+
+def _pdfplumber_text(file_bytes: bytes, max_pages: int) -> tuple[str, int, int]:
+    import pdfplumber
+
+    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
+        total = len(pdf.pages)
+        pages = pdf.pages[:max_pages]
+        text = "\n".join(page.extract_text() or "" for page in pages).strip()
+    return text, total, len(pages)
+
+
+def _docx_text(file_bytes: bytes) -> str:
+    import docx2txt
+
+    return (docx2txt.process(io.BytesIO(file_bytes)) or "").strip()
+
+
+def _extract(file_bytes: bytes, kind: str, max_pages: int, timeout: float, use_alarm: bool) -> Extraction:
+    """
+    Pool entry point (top-level so it pickles under the spawn start method).
+    `use_alarm` is only set inside pool workers, whose tasks run on the main thread.
+    """
+    if use_alarm:
+        signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, max(timeout, 0.01))
+    started = time.monotonic()
+    try:
+        if kind == "docx":
+            return Extraction(_docx_text(file_bytes), "docx", 0, 0, time.monotonic() - started)
+
+        try:
+            text, total, read = _pdfium_text(file_bytes, max_pages)
+            if len(text) >= _MIN_CHARS_PER_PAGE * max(read, 1):
+                return Extraction(text, "pdfium", total, read, time.monotonic() - started)
+        except _Timeout:
+            raise
+        except Exception:
+            pass    # damaged xref, exotic encoding, ... — pdfplumber is more forgiving
+        text, total, read = _pdfplumber_text(file_bytes, max_pages)
+        return Extraction(text, "pdfplumber", total, read, time.monotonic() - started)
+    except _Timeout:
+        raise ExtractionTimeout(f"extraction exceeded {timeout:.1f}s") from None
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+
+
+# ── Parent side ──────────────────────────────────────────────────────────────
+
+def document_kind(file_bytes: bytes, filename: str = "") -> str:
+    """"pdf" or "docx", by magic bytes first and extension second."""
+    if file_bytes.startswith(b"%PDF"):
+        return "pdf"
+    if file_bytes.startswith(b"PK") or filename.lower().endswith(".docx"):
+        return "docx"
+    if filename.lower().endswith(".pdf"):
+        return "pdf"
+    raise ExtractionError("Unsupported document type (expected PDF or DOCX)")
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_in_flight = 0                  # documents submitted to the pool and not finished yet
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=get_app_config().EXTRACT_MAX_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),   # never fork a process holding torch threads
+                max_tasks_per_child=_TASKS_PER_WORKER,
+            )
+        return _pool
+
+
+def _discard_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a broken pool (its workers are already gone); the next call builds a new one."""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _submit(pool: ProcessPoolExecutor, *args) -> tuple:
+    """Submit one document; returns (future, documents already queued or running ahead of it)."""
+    global _in_flight
+    with _pool_lock:
+        ahead = _in_flight
+        _in_flight += 1
+    future = pool.submit(_extract, *args, use_alarm=True)
+    future.add_done_callback(_finished)
+    return future, ahead
+
+
+def _finished(_future) -> None:
+    global _in_flight
+    with _pool_lock:
+        _in_flight -= 1
+
+
+def _parent_wait(timeout: float, ahead: int, workers: int) -> float:
+    """
+    How long the parent waits for a document: the documents ahead of it, each
+    bounded by EXTRACT_TIMEOUT_SECONDS and spread over `workers`, then its own
+    run. Only the run itself is capped by `timeout` (the worker's alarm).
+    """
+    queued = (ahead // max(workers, 1)) * get_app_config().EXTRACT_TIMEOUT_SECONDS
+    return queued + timeout + _ALARM_GRACE_SECONDS
+
+
+def shutdown_pool() -> None:
+    """Stop the worker processes (app shutdown); a later call starts a new pool."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+async def extract_text(file_bytes: bytes, filename: str = "") -> Extraction:
+    """
+    Extract text from a PDF/DOCX upload within the configured page and time
+    caps. Awaits a pool worker without occupying any thread of this process.
+    Raises ExtractionError on unsupported, corrupt or too-slow documents.
+    """
+    cfg = get_app_config()
+    kind = document_kind(file_bytes, filename)
+    check("document extraction")
+    timeout = budget(cfg.EXTRACT_TIMEOUT_SECONDS)
+    args = (file_bytes, kind, cfg.EXTRACT_MAX_PAGES, timeout)
+
+    try:
+        if not cfg.EXTRACT_USE_PROCESS_POOL:
+            result = await asyncio.to_thread(_extract, *args, use_alarm=False)    # page cap only
+        else:
+            pool = _get_pool()
+            future, ahead = _submit(pool, *args)
+            wait = budget(_parent_wait(timeout, ahead, cfg.EXTRACT_MAX_WORKERS))
+            try:
+                result = await asyncio.wait_for(asyncio.wrap_future(future), wait)
+            except asyncio.TimeoutError:
+                # still queued (request deadline hit): give up our place. Running past
+                # its own alarm means native code; its alarm fires once it returns to
+                # Python — killing it would break the pool for every other document.
+                if not future.cancel():
+                    logger.warning(f"[Extractor] Worker still running {wait:.1f}s after submission, abandoning it")
+                raise ExtractionTimeout(f"extraction did not finish within {wait:.1f}s") from None
+            except BrokenProcessPool:
+                _discard_pool(pool)
+                raise ExtractionError("extraction worker crashed") from None
+    except ExtractionError as e:
+        EXTRACT_FAILURES.labels(kind=kind, reason="timeout" if isinstance(e, ExtractionTimeout) else "error").inc()
+        raise
+    except Exception as e:
+        EXTRACT_FAILURES.labels(kind=kind, reason="error").inc()
+        raise ExtractionError(f"Could not read {kind.upper()}: {e}") from e
+
+    EXTRACT_DURATION.labels(method=result.method).observe(result.seconds)
+    if kind == "pdf":
+        EXTRACT_PAGES.observe(result.pages)
+        if result.pages > result.pages_read:
+            logger.warning(f"[Extractor] {result.pages}-page PDF truncated to {result.pages_read} pages")
+    return result
@@ -0,0 +1,246 @@
+"""
+Per-job JD analysis store for incremental JD analysis.
+
+Each job's LLM analysis (implicit requirements, culture-fit signals) is kept
+under its job_id together with the hash of the JD fields the prompt is built
+from (title, description, required / preferred skills). On a catalog change
+JobAnalyzerAgent therefore sends only new or edited jobs to the LLM, reuses
+every other analysis, and evicts jobs that left the catalog — touching the
+file or editing one job costs at most one call instead of N.
+
+Rows live in memory and, unless JD_STORE_PATH is empty, in SQLite so they
+survive restarts. Degraded analyses (LLM failure → empty lists) are never
+stored, so they are retried on the next refresh.
+
+Cluster sharing (JD_STORE_BACKEND=redis): rows are also written to the Redis
+hash `jd_analysis`, read by the API and every Celery worker. A process only
+asks Redis for rows it lacks locally, and the hot request path never reaches
+the store at all — it reads the agent's in-process cache. The leader lock
+(`jd_analysis:lock`, SET NX with a TTL) lets one process analyse a changed
+catalog while the others wait and read its results. A Redis outage degrades
+to the per-process behaviour.
+
+按岗位持久化的 JD 分析结果：以 (标题, 描述, 技能) 的哈希校验是否失效，
+岗位库变化时只分析新增/修改的岗位，删除的岗位同步淘汰。
+可选 Redis 共享：API 与所有 Celery worker 共用分析结果，通过 leader 锁保证只有一个进程调用 LLM。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import closing
+from pathlib import Path
+from typing import Iterable, Optional
+
+from src.core.app_config import get_app_config
+from src.models.schemas import JobPosting
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jd_analysis (
+    job_id                 TEXT PRIMARY KEY,
+    jd_hash                TEXT NOT NULL,
+    implicit_requirements  TEXT NOT NULL,
+    culture_fit_signals    TEXT NOT NULL,
+    analyzed_at            REAL NOT NULL
+);
+"""
+
+# job_id → (jd_hash, implicit_requirements, culture_fit_signals)
+Row = tuple[str, list[str], list[str]]
+
+_REDIS_KEY = "jd_analysis"
+_LOCK_KEY = "jd_analysis:lock"
+LEADER_LOCK_TTL_SECONDS = 300       # longer than any rebuild; frees the lock if a leader dies
+LOCAL_LEADER = "local"              # token when there is nothing to coordinate with
+
+# Delete the lock only if we still own it (it may have expired and been re-taken)
+_RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def jd_analysis_hash(posting: JobPosting) -> str:
+    """Hash of the JD fields the analysis prompt reads; other edits keep the analysis."""
+    payload = json.dumps(
+        [posting.title, posting.description, posting.required_skills, posting.preferred_skills],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+
+class JDAnalysisStore:
+    """In-memory map of per-job analyses, mirrored to SQLite and optionally Redis. Thread-safe."""
+
+    def __init__(self, path: Optional[Path] = None, redis_client=None) -> None:
+        self._path = path
+        self._redis = redis_client          # sync redis.Redis or None
+        self._lock = threading.Lock()
+        self._rows: dict[str, Row] = {}
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.executescript(_SCHEMA)
+                for job_id, jd_hash, implicit, culture in conn.execute(
+                    "SELECT job_id, jd_hash, implicit_requirements, culture_fit_signals FROM jd_analysis"
+                ):
+                    self._rows[job_id] = (jd_hash, json.loads(implicit), json.loads(culture))
+            logger.info(f"[JDStore] Loaded {len(self._rows)} persisted JD analyses")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get_valid(self, job_hashes: dict[str, str]) -> dict[str, tuple[list[str], list[str]]]:
+        """
+        Stored analyses whose JD hash still matches: job_id → (implicit, culture).
+        Jobs missing locally are looked up in Redis (blocking I/O) and kept locally.
+        """
+        with self._lock:
+            valid = {
+                job_id: (row[1], row[2])
+                for job_id, row in self._rows.items()
+                if job_hashes.get(job_id) == row[0]
+            }
+        missing = [job_id for job_id in job_hashes if job_id not in valid]
+        if missing and self._redis is not None:
+            shared = {
+                job_id: row for job_id, row in self._get_shared(missing).items() if row[0] == job_hashes[job_id]
+            }
+            self._put_local(shared)
+            valid.update({job_id: (row[1], row[2]) for job_id, row in shared.items()})
+        return valid
+
+    def put_many(self, rows: dict[str, Row]) -> None:
+        if not rows:
+            return
+        self._put_local(rows)
+        if self._redis is not None:
+            try:
+                self._redis.hset(_REDIS_KEY, mapping={
+                    job_id: json.dumps({"hash": jd_hash, "implicit": implicit, "culture": culture}, ensure_ascii=False)
+                    for job_id, (jd_hash, implicit, culture) in rows.items()
+                })
+            except Exception as e:   # redis.RedisError, OSError, ...
+                logger.warning(f"[JDStore] Redis write failed, analyses kept locally: {e}")
+
+    def evict_except(self, job_ids: Iterable[str]) -> list[str]:
+        """Drop every job not in `job_ids` (deleted from the catalog); returns the evicted ids."""
+        keep = set(job_ids)
+        with self._lock:
+            gone = [job_id for job_id in self._rows if job_id not in keep]
+            for job_id in gone:
+                del self._rows[job_id]
+            if gone and self._path is not None:
+                with closing(self._connect()) as conn, conn:
+                    conn.executemany("DELETE FROM jd_analysis WHERE job_id = ?", [(j,) for j in gone])
+        if self._redis is not None:
+            try:
+                shared_gone = [k.decode() for k in self._redis.hkeys(_REDIS_KEY) if k.decode() not in keep]
+                if shared_gone:
+                    self._redis.hdel(_REDIS_KEY, *shared_gone)
+            except Exception as e:
+                logger.warning(f"[JDStore] Redis eviction failed: {e}")
+        return gone
+
+    def clear(self) -> None:
+        with self._lock:
+            self._rows.clear()
+            if self._path is not None:
+                with closing(self._connect()) as conn, conn:
+                    conn.execute("DELETE FROM jd_analysis")
+        if self._redis is not None:
+            try:
+                self._redis.delete(_REDIS_KEY)
+            except Exception as e:
+                logger.warning(f"[JDStore] Redis clear failed: {e}")
+
+    # ── Leader election ──────────────────────────────────────────────────────
+
+    def acquire_leader(self) -> Optional[str]:
+        """
+        Try to become the one process that analyses the catalog. Returns a
+        token to pass to release_leader(), or None while another process holds
+        the lock. Without Redis (or when it is down) every process leads.
+        """
+        if self._redis is None:
+            return LOCAL_LEADER
+        token = uuid.uuid4().hex
+        try:
+            if self._redis.set(_LOCK_KEY, token, nx=True, px=LEADER_LOCK_TTL_SECONDS * 1000):
+                return token
+            return None
+        except Exception as e:
+            logger.warning(f"[JDStore] Redis lock unavailable, analysing locally: {e}")
+            return LOCAL_LEADER
+
+    def release_leader(self, token: str) -> None:
+        if self._redis is None or token == LOCAL_LEADER:
+            return
+        try:
+            self._redis.eval(_RELEASE_SCRIPT, 1, _LOCK_KEY, token)
+        except Exception as e:
+            logger.warning(f"[JDStore] Redis lock release failed (expires on its own): {e}")
+
+    # ── Internals ────────────────────────────────────────────────────────────
+
+    def _put_local(self, rows: dict[str, Row]) -> None:
+        if not rows:
+            return
+        with self._lock:
+            self._rows.update(rows)
+            if self._path is not None:
+                now = time.time()
+                with closing(self._connect()) as conn, conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO jd_analysis VALUES (?, ?, ?, ?, ?)",
+                        [
+                            (job_id, jd_hash, json.dumps(implicit, ensure_ascii=False),
+                             json.dumps(culture, ensure_ascii=False), now)
+                            for job_id, (jd_hash, implicit, culture) in rows.items()
+                        ],
+                    )
+
+    def _get_shared(self, job_ids: list[str]) -> dict[str, Row]:
+        try:
+            values = self._redis.hmget(_REDIS_KEY, job_ids)
+        except Exception as e:
+            logger.warning(f"[JDStore] Redis lookup failed, using local analyses only: {e}")
+            return {}
+        rows = {}
+        for job_id, value in zip(job_ids, values):
+            if value is None:
+                continue
+            data = json.loads(value)
+            rows[job_id] = (data["hash"], data["implicit"], data["culture"])
+        return rows
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_jd_store: JDAnalysisStore | None = None
+
+
+def get_jd_store() -> JDAnalysisStore:
+    global _jd_store
+    if _jd_store is None:
+        cfg = get_app_config()
+        client = None
+        if cfg.JD_STORE_BACKEND == "redis":
+            import redis  # connects lazily on first command
+            client = redis.Redis.from_url(cfg.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5)
+        path = cfg.JD_STORE_PATH
+        _jd_store = JDAnalysisStore(Path(path) if path else None, redis_client=client)
+    return _jd_store
@@ -2,7 +2,10 @@
 Convert raw job dicts from job_loader into JobPosting objects for FiveDimScorer.
 """
 
+import hashlib
+import json
 import re
+from dataclasses import asdict
 
 from src.models.schemas import JobPosting, SalaryRange
 
@@ -61,3 +64,12 @@ def jobs_to_postings(raw_jobs: list[dict]) -> list[JobPosting]:
         ))
     return postings
 
+
+
+def job_content_hash(posting: JobPosting) -> str:
+    """
+    Hash of every JobPosting field that feeds scoring.
+    Changes whenever the job is edited; stable across process restarts.
+    """
+    payload = json.dumps(asdict(posting), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
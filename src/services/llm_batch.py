@@ -0,0 +1,122 @@
+"""
+Multi-item LLM batching for the per-job agents.
+
+Instead of one Moonshot call per job (each re-sending the shared context such
+as the resume), up to LLM_BATCH_SIZE jobs are packed into one prompt and the
+model answers with a keyed JSON object:
+
+    {"results": {"<job_id>": {...per-item schema...}, ...}}
+
+  - pack():       greedy chunking by item count AND an estimated token budget
+                  (LLM_BATCH_TOKEN_BUDGET), so long JDs split into more chunks
+  - call_chunk(): one call per chunk; any item whose entry is missing or does
+                  not parse falls back to the existing single-item call, and a
+                  failed batch call falls back item by item
+Chunks of one item go straight to the single-item path, so LLM_BATCH_SIZE=1
+(the default) keeps the original one-call-per-job behaviour.
+
+多条目 LLM 批处理：K 个岗位打包进一个 prompt，按 job_id 键控的 JSON 返回；
+按估算 token 预算自动拆分；单条解析失败时回退到逐条调用。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Sequence, TypeVar
+
+from src.core.metrics import LLM_BATCH_ITEMS
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+CHARS_PER_TOKEN = 4   # rough average for English prompts; good enough for budgeting
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def pack(
+    items: Sequence[T],
+    size_of: Callable[[T], int],
+    *,
+    batch_size: int,
+    token_budget: int,
+    base_tokens: int = 0,
+) -> list[list[T]]:
+    """
+    Split items into chunks of at most `batch_size` whose estimated prompt size
+    (base_tokens + Σ size_of(item)) stays within `token_budget`. An item that
+    alone exceeds the budget gets a chunk of its own.
+    """
+    chunks: list[list[T]] = []
+    current: list[T] = []
+    used = base_tokens
+    for item in items:
+        cost = size_of(item)
+        if current and (len(current) >= batch_size or used + cost > token_budget):
+            chunks.append(current)
+            current, used = [], base_tokens
+        current.append(item)
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def keyed_response_instruction(keys: Sequence[str], item_schema: str) -> str:
+    """Prompt suffix asking for one keyed entry per item."""
+    return (
+        'Respond ONLY with valid JSON of the form {"results": {"<id>": <entry>, ...}} '
+        f"with exactly one entry for each of these ids: {list(keys)}\n"
+        f"Each <entry> must match this schema:\n{item_schema}"
+    )
+
+
+async def call_chunk(
+    chunk: Sequence[T],
+    *,
+    caller: str,
+    key: Callable[[T], str],
+    call_batch: Callable[[Sequence[T]], Awaitable[str]],
+    parse: Callable[[T, dict], R],
+    single: Callable[[T], Awaitable[R]],
+) -> list[R]:
+    """
+    Run one chunk as a single batched call and return results in chunk order.
+    `call_batch` returns the raw JSON content; `parse` builds one item's result
+    from its entry (raising on malformed data); `single` is the per-item fallback.
+    """
+    if len(chunk) == 1:
+        return [await single(chunk[0])]
+
+    try:
+        entries = json.loads(await call_batch(chunk) or "{}").get("results")
+        if not isinstance(entries, dict):
+            raise ValueError("response has no 'results' object")
+    except Exception as e:
+        logger.warning(f"[LLMBatch] {caller}: batch of {len(chunk)} failed ({e}); falling back per item")
+        entries = {}
+
+    results: list = [None] * len(chunk)
+    retry: list[int] = []
+    for i, item in enumerate(chunk):
+        entry = entries.get(key(item))
+        try:
+            if not isinstance(entry, dict):
+                raise ValueError("missing entry")
+            results[i] = parse(item, entry)
+        except Exception:
+            retry.append(i)
+
+    LLM_BATCH_ITEMS.labels(caller=caller, outcome="batched").inc(len(chunk) - len(retry))
+    if retry:
+        LLM_BATCH_ITEMS.labels(caller=caller, outcome="fallback").inc(len(retry))
+        logger.info(f"[LLMBatch] {caller}: {len(retry)}/{len(chunk)} items retried individually")
+        for i, result in zip(retry, await asyncio.gather(*[single(chunk[i]) for i in retry])):
+            results[i] = result
+    return results
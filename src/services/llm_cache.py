@@ -0,0 +1,207 @@
+"""
+Content-addressed LLM response cache shared by every Moonshot caller.
+
+Key   = SHA-256 of canonical JSON (model, messages, temperature, response_format)
+Tiers:
+  L1  in-process LRU (OrderedDict), LLM_CACHE_MAX_ENTRIES entries
+  L2  on-disk SQLite (LLM_CACHE_PATH), survives restarts / shared by workers on one host
+Both tiers honour LLM_CACHE_TTL_SECONDS. Only the message content is stored;
+JSON-mode responses that do not parse are never cached, so a malformed answer
+is retried instead of being replayed. The disk tier is off unless
+LLM_CACHE_PATH is set.
+
+Candidate data never reaches the disk: resume_parser is not cached at all (its
+result is already cached, encrypted, by resume_cache), and callers whose
+prompts carry resume text or candidate details (MEMORY_ONLY_CALLERS) use the
+in-process tier only. Only job-side prompts (JD analysis) are persisted.
+
+Lookups are counted in the `llm_cache_lookups_total{result}` Prometheus counter
+and in LLMCache.stats() (hit rate per tier). Consulted by LLMClient.chat().
+
+内容寻址的 LLM 响应缓存：键为 (model, messages, temperature, response_format) 的哈希，
+进程内 LRU + SQLite 磁盘两级缓存，均带 TTL；重复或重试的请求不再产生 LLM 延迟。
+含简历/候选人信息的调用方只使用进程内缓存（resume_parser 完全不缓存），磁盘层默认关闭。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import Any, Optional
+
+from src.core.app_config import get_app_config
+from src.core.metrics import LLM_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key         TEXT PRIMARY KEY,
+    content     TEXT NOT NULL,
+    expires_at  REAL NOT NULL
+);
+"""
+
+
+# resume_parser results are cached (encrypted) by resume_cache; caching the raw
+# LLM reply would only add a plaintext copy of the resume-derived fields
+UNCACHED_CALLERS = frozenset({"resume_parser"})
+# Prompts carry resume text or candidate details: process memory only, never SQLite
+MEMORY_ONLY_CALLERS = frozenset({
+    "llm_explainer", "insight_generator", "career_predictor", "counterfactual_career",
+})
+
+
+def is_persistable(caller: str) -> bool:
+    """Whether `caller`'s responses may be written to (and read from) the disk tier."""
+    return caller not in UNCACHED_CALLERS and caller not in MEMORY_ONLY_CALLERS
+
+
+def cache_key(
+    model: str,
+    messages: list[dict],
+    temperature: Optional[float] = None,
+    response_format: Optional[dict] = None,
+) -> str:
+    """Stable content address of one chat-completion request."""
+    canonical = json.dumps(
+        {"model": model, "messages": messages, "temperature": temperature, "response_format": response_format},
+        sort_keys=True,
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(content: str, response_format: Optional[dict]) -> bool:
+    if not content:
+        return False
+    if (response_format or {}).get("type") == "json_object":
+        try:
+            json.loads(content)
+        except json.JSONDecodeError:
+            return False
+    return True
+
+
+class LLMCache:
+    """Two-tier (LRU + SQLite) TTL cache of LLM message contents. Thread-safe."""
+
+    def __init__(self, max_entries: int, ttl: float, path: Optional[Path] = None) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._path = path
+        self._l1: OrderedDict[str, tuple[float, str]] = OrderedDict()   # key → (expires_at, content)
+        self._lock = threading.Lock()
+        self._counts = {"l1_hit": 0, "l2_hit": 0, "miss": 0}
+
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with closing(self._connect()) as conn, conn:
+                conn.executescript(_SCHEMA)
+                conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path)
+
+    def _count(self, result: str) -> None:
+        with self._lock:
+            self._counts[result] += 1
+        LLM_CACHE_LOOKUPS.labels(result=result).inc()
+
+    # ── Tiers ────────────────────────────────────────────────────────────────
+
+    def get_l1(self, key: str) -> Optional[str]:
+        """In-process lookup only (cheap — safe to call on the event loop)."""
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            expires_at, content = entry
+            if expires_at < time.time():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+        self._count("l1_hit")
+        return content
+
+    def get_l2(self, key: str, persist: bool = True) -> Optional[str]:
+        """SQLite lookup (blocking I/O); a hit is promoted into L1. persist=False skips the disk."""
+        if self._path is not None and persist:
+            with closing(self._connect()) as conn:
+                row = conn.execute(
+                    "SELECT content, expires_at FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+            if row is not None and row[1] >= time.time():
+                self._put_l1(key, row[0], row[1])
+                self._count("l2_hit")
+                return row[0]
+        self._count("miss")
+        return None
+
+    def get(self, key: str, persist: bool = True) -> Optional[str]:
+        hit = self.get_l1(key)
+        return hit if hit is not None else self.get_l2(key, persist)
+
+    def _put_l1(self, key: str, content: str, expires_at: float) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._l1[key] = (expires_at, content)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._max_entries:
+                self._l1.popitem(last=False)
+
+    def put(self, key: str, content: str, ttl: Optional[float] = None, persist: bool = True) -> None:
+        """Store in L1 and, when persist is True and the disk tier is configured, in SQLite."""
+        expires_at = time.time() + (self._ttl if ttl is None else ttl)
+        self._put_l1(key, content, expires_at)
+        if self._path is not None and persist:
+            with closing(self._connect()) as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache VALUES (?, ?, ?)", (key, content, expires_at)
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._l1.clear()
+        if self._path is not None:
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM llm_cache")
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+            entries = len(self._l1)
+        total = sum(counts.values())
+        hits = counts["l1_hit"] + counts["l2_hit"]
+        return {
+            **counts,
+            "lookups": total,
+            "hit_rate": round(hits / total, 4) if total else 0.0,
+            "l1_entries": entries,
+        }
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_llm_cache: LLMCache | None = None
+
+
+def get_llm_cache() -> LLMCache:
+    global _llm_cache
+    if _llm_cache is None:
+        cfg = get_app_config()
+        _llm_cache = LLMCache(
+            max_entries=cfg.LLM_CACHE_MAX_ENTRIES,
+            ttl=cfg.LLM_CACHE_TTL_SECONDS,
+            path=Path(cfg.LLM_CACHE_PATH) if cfg.LLM_CACHE_PATH else None,
+        )
+    return _llm_cache
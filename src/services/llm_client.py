@@ -0,0 +1,297 @@
+"""
+LLMClient: the single pooled Moonshot client used by every agent and service.
+
+One lazily built httpx connection pool per process (shared keep-alive, HTTP/2
+when the optional `h2` package is installed, tuned limits and timeouts),
+wrapped in AsyncOpenAI. No module opens its own client any more, so
+TLS handshakes and connections are reused across agents.
+
+Every call goes through chat(), which
+  - consults the content-addressed LLM cache (src/services/llm_cache.py)
+  - on a cache miss, waits for admission by the central LLMLimiter
+    (rate token + concurrency slot, in priority/FIFO order)
+  - records per-caller latency, token usage and errors in Prometheus
+  - fails fast with CircuitOpenError while the provider circuit breaker is
+    open (src/services/circuit_breaker.py) and feeds it every outcome
+  - optionally hedges (hedge=True + LLM_HEDGE_ENABLED): when a call has not
+    returned by the caller's observed p95 latency, a duplicate is sent and the
+    first answer wins, the loser is cancelled. Hedges only use spare limiter
+    capacity (never queue) and are capped at LLM_HEDGE_MAX_RATIO of calls.
+  - honours the request deadline (src/core/deadline.py): limiter wait plus
+    provider call are bounded by the remaining budget, and a call with no
+    budget left fails fast with DeadlineExceeded (not retried)
+
+LLMClient：进程内唯一的 Moonshot 客户端。
+惰性构建共享的 httpx 连接池（keep-alive、HTTP/2、连接数与超时可配置），
+所有 Agent 与服务统一经由 chat() 调用，经统一限流器排队，并记录延迟、token 与错误指标。
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+
+import asyncio
+import httpx
+from openai import AsyncOpenAI
+
+from src.core.app_config import get_app_config
+from src.core.config import get_moonshot_api_key, get_moonshot_model
+from src.core.deadline import DeadlineExceeded, check, remaining
+from src.core.metrics import (
+    LLM_HEDGES,
+    LLM_REQUEST_ERRORS,
+    LLM_REQUEST_LATENCY,
+    LLM_REQUESTS_CANCELLED,
+    LLM_TOKENS,
+)
+from src.services.circuit_breaker import CircuitOpenError, get_llm_breaker, is_provider_failure
+from src.services.llm_cache import UNCACHED_CALLERS, cache_key, get_llm_cache, is_cacheable, is_persistable
+from src.services.rate_limiter import Priority, get_llm_limiter
+
+logger = logging.getLogger(__name__)
+
+HEDGE_QUANTILE = 0.95
+_LATENCY_WINDOW = 200        # recent successful calls per caller
+_MIN_SAMPLES = 20            # no hedging until the caller's p95 is meaningful
+
+
+class _LatencyWindow:
+    """Rolling window of recent provider latencies for one caller."""
+
+    def __init__(self) -> None:
+        self._samples: deque[float] = deque(maxlen=_LATENCY_WINDOW)
+
+    def add(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        if len(self._samples) < _MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def _pool_settings() -> dict[str, Any]:
+    cfg = get_app_config()
+    http2 = cfg.LLM_HTTP2 and importlib.util.find_spec("h2") is not None
+    if cfg.LLM_HTTP2 and not http2:
+        logger.warning("[LLMClient] LLM_HTTP2 requested but 'h2' is not installed — using HTTP/1.1")
+    return {
+        "limits": httpx.Limits(
+            max_connections=cfg.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=cfg.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=cfg.LLM_KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(cfg.LLM_READ_TIMEOUT, connect=cfg.LLM_CONNECT_TIMEOUT),
+        "http2": http2,
+    }
+
+
+class LLMClient:
+    """
+    Process-wide LLM client. The underlying AsyncOpenAI client (and its httpx
+    pool) is created on first use; tests may inject their own.
+    """
+
+    def __init__(self, async_client=None, model: Optional[str] = None) -> None:
+        self._async_client = async_client
+        self._model = model
+        self._lock = threading.Lock()
+        self._latency: dict[str, _LatencyWindow] = {}
+        self._calls = 0
+        self._hedges = 0
+
+    # ── Lazy construction ────────────────────────────────────────────────────
+
+    @property
+    def model(self) -> str:
+        if self._model is None:
+            self._model = get_moonshot_model()
+        return self._model
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        with self._lock:
+            if self._async_client is None:
+                self._async_client = AsyncOpenAI(
+                    api_key=get_moonshot_api_key(),
+                    base_url=get_app_config().MOONSHOT_BASE_URL,
+                    http_client=httpx.AsyncClient(**_pool_settings()),
+                )
+                logger.info("[LLMClient] Async connection pool initialised")
+            return self._async_client
+
+    # ── Helpers ──────────────────────────────────────────────────────────────
+
+    def _request(self, model, messages, temperature, response_format, kwargs) -> dict[str, Any]:
+        request = {"model": model or self.model, "messages": messages, **kwargs}
+        if temperature is not None:
+            request["temperature"] = temperature
+        if response_format is not None:
+            request["response_format"] = response_format
+        return request
+
+    def _record(self, caller: str, started: float, response) -> str:
+        elapsed = time.monotonic() - started
+        LLM_REQUEST_LATENCY.labels(caller=caller).observe(elapsed)
+        self._latency.setdefault(caller, _LatencyWindow()).add(elapsed)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.labels(caller=caller, kind="prompt").inc(usage.prompt_tokens or 0)
+            LLM_TOKENS.labels(caller=caller, kind="completion").inc(usage.completion_tokens or 0)
+        return response.choices[0].message.content or ""
+
+    # ── Async provider calls (+ hedging) ─────────────────────────────────────
+
+    async def _create(self, caller: str, request: dict, priority, admitted: bool = False) -> tuple[float, Any]:
+        """
+        One provider call behind the circuit breaker and the limiter. With
+        `admitted`, the limiter slot was already taken via try_admit().
+        """
+        breaker = get_llm_breaker()
+        try:
+            breaker.before_call()
+        except CircuitOpenError:
+            if admitted:
+                get_llm_limiter().release()
+            raise
+        limiter = get_llm_limiter()
+
+        started = None
+        try:
+            async with (limiter.admitted() if admitted else limiter.slot(priority)):
+                started = time.monotonic()
+                try:
+                    response = await self.async_client.chat.completions.create(**request)
+                except Exception as e:
+                    LLM_REQUEST_ERRORS.labels(caller=caller, error=type(e).__name__).inc()
+                    breaker.record(failed=is_provider_failure(e), latency=time.monotonic() - started)
+                    raise
+        except asyncio.CancelledError:
+            breaker.cancelled()
+            if started is not None:     # the provider was already working on it
+                LLM_REQUESTS_CANCELLED.labels(caller=caller).inc()
+            raise
+        breaker.record(failed=False, latency=time.monotonic() - started)
+        return started, response
+
+    def hedge_delay(self, caller: str) -> Optional[float]:
+        """Seconds to wait before hedging (caller's p95, floored), None while unknown."""
+        window = self._latency.get(caller)
+        p95 = window.quantile(HEDGE_QUANTILE) if window else None
+        if p95 is None:
+            return None
+        return max(p95, get_app_config().LLM_HEDGE_MIN_DELAY)
+
+    async def _hedged_create(self, caller: str, request: dict, priority) -> tuple[float, Any]:
+        limiter = get_llm_limiter()
+        primary = asyncio.ensure_future(self._create(caller, request, priority))
+        delay = self.hedge_delay(caller)
+        if delay is None:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        within_budget = self._hedges < get_app_config().LLM_HEDGE_MAX_RATIO * self._calls
+        healthy = get_llm_breaker().state == "closed"
+        if not within_budget or not healthy or not await limiter.try_admit():
+            LLM_HEDGES.labels(caller=caller, outcome="skipped").inc()
+            return await primary
+
+        self._hedges += 1
+        LLM_HEDGES.labels(caller=caller, outcome="sent").inc()
+        ran = False
+
+        async def _hedge() -> tuple[float, Any]:
+            nonlocal ran
+            ran = True
+            return await self._create(caller, request, priority, admitted=True)
+
+        hedge = asyncio.ensure_future(_hedge())
+        # a hedge cancelled before its first step never enters _create — free its slot here
+        hedge.add_done_callback(lambda _: ran or limiter.release())
+        try:
+            done, pending = await asyncio.wait({primary, hedge}, return_when=asyncio.FIRST_COMPLETED)
+            winner = done.pop()
+            if winner.exception() is not None and pending:
+                winner = pending.pop()      # first finisher failed — the other one may still succeed
+                await asyncio.wait({winner})
+            LLM_HEDGES.labels(caller=caller, outcome="won" if winner is hedge else "lost").inc()
+            return winner.result()
+        finally:
+            primary.cancel()
+            hedge.cancel()
+
+    # ── Calls ────────────────────────────────────────────────────────────────
+
+    async def chat(
+        self,
+        *,
+        caller: str,
+        messages: list[dict],
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        response_format: Optional[dict] = None,
+        priority: Optional[Priority] = None,
+        cache_ttl: Optional[float] = None,
+        hedge: bool = False,
+        **kwargs: Any,
+    ) -> str:
+        """
+        One chat completion; returns the message content.
+        `caller` labels the metrics (agent / service name).
+        `priority` overrides the caller's llm_priority() class for the limiter;
+        cache hits bypass the limiter entirely.
+        `hedge` marks latency-critical fan-out calls eligible for hedging.
+        """
+        request = self._request(model, messages, temperature, response_format, kwargs)
+        use_cache = get_app_config().LLM_CACHE_ENABLED and caller not in UNCACHED_CALLERS
+        persist = is_persistable(caller)
+        if use_cache:
+            cache = get_llm_cache()
+            key = cache_key(request["model"], messages, temperature, response_format)
+            hit = cache.get_l1(key)
+            if hit is None:
+                hit = await asyncio.to_thread(cache.get_l2, key, persist)
+            if hit is not None:
+                return hit
+
+        check(f"{caller} LLM call")
+        self._calls += 1
+        if hedge and get_app_config().LLM_HEDGE_ENABLED:
+            call = self._hedged_create(caller, request, priority)
+        else:
+            call = self._create(caller, request, priority)
+        left = remaining()
+        if left is None:
+            started, response = await call
+        else:
+            try:
+                started, response = await asyncio.wait_for(call, timeout=left)
+            except asyncio.TimeoutError:
+                if remaining():
+                    raise                   # the provider's own timeout, not ours
+                LLM_REQUEST_ERRORS.labels(caller=caller, error=DeadlineExceeded.__name__).inc()
+                raise DeadlineExceeded(f"request deadline passed during {caller} LLM call") from None
+        content = self._record(caller, started, response)
+
+        if use_cache and is_cacheable(content, response_format):
+            await asyncio.to_thread(cache.put, key, content, cache_ttl, persist)
+        return content
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_llm_client: LLMClient | None = None
+
+
+def get_llm_client() -> LLMClient:
+    global _llm_client
+    if _llm_client is None:
+        _llm_client = LLMClient()
+    return _llm_client
@@ -1,30 +1,21 @@
 import asyncio
 from typing import List, Dict, Any
 
-from openai import AsyncOpenAI
-
-from src.core.config import get_moonshot_api_key, get_moonshot_model
-
-_client = AsyncOpenAI(
-    api_key=get_moonshot_api_key(),
-    base_url="https://api.moonshot.ai/v1",
-)
-MOONSHOT_MODEL = get_moonshot_model()
+from src.services.llm_client import get_llm_client
 
 
 async def _explain_single_job(resume_text: str, job: Dict[str, Any]) -> Dict[str, Any]:
     """Asynchronously generate match explanation for a single job."""
     prompt = _build_prompt(resume_text, job)
-    response = await _client.chat.completions.create(
-        model=MOONSHOT_MODEL,
+    content = await get_llm_client().chat(
+        caller="llm_explainer",
         messages=[
             {"role": "system", "content": "You are a technical recruitment assistant. Always respond with valid JSON only, no extra text."},
             {"role": "user", "content": prompt},
         ],
         temperature=0.2,
         response_format={"type": "json_object"},
-    )
-    content = response.choices[0].message.content or "{}"
+    ) or "{}"
     why_match, skill_gaps = _parse_llm_response(content)
     job_with_explanation = job.copy()
     job_with_explanation["why_match"] = why_match
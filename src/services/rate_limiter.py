@@ -1,18 +1,44 @@
 """
 Moonshot API rate limiter and retry/circuit-breaker wrapper.
 
-Rate limiter:  async token-bucket, MOONSHOT_RPM_LIMIT tokens per 60 s.
+Rate limiter:  token-bucket, MOONSHOT_RPM_LIMIT tokens per 60 s, per process
+               by default. With RATE_LIMIT_BACKEND=redis (set by the
+               docker-compose deployment) the bucket lives in Redis and
+               is refilled/debited atomically by a Lua script, so the API and
+               every Celery worker share ONE cluster-wide budget. While Redis is
+               unreachable each process falls back to a local in-memory bucket
+               and retries Redis every REDIS_RETRY_AFTER seconds.
+LLM limiter:   central gate in front of every LLM provider call (LLMClient).
+               Waiters are admitted strictly by (priority class, arrival order)
+               once both a concurrency slot (LLM_MAX_CONCURRENCY) and a rate
+               token are available, so interactive requests overtake background
+               JD analysis and nobody is starved within a class.
 Retry policy:  exponential back-off via tenacity, up to MOONSHOT_MAX_RETRIES.
-Circuit breaker: after MOONSHOT_MAX_RETRIES consecutive failures on a single
-                 call, tenacity raises RetryError which callers should catch.
+Retry budget:  after MOONSHOT_MAX_RETRIES consecutive failures on a single
+               call, tenacity raises RetryError which callers should catch.
+               Provider-wide outages are handled by the shared circuit breaker
+               (src/services/circuit_breaker.py): CircuitOpenError is not retried.
+
+限流器：令牌桶（每 60 秒 MOONSHOT_RPM_LIMIT 个令牌）+ 统一的 LLM 调用闸门。
+令牌桶默认存放在 Redis 中（Lua 脚本原子扣减），API 与所有 Celery worker 共享同一额度；
+Redis 不可用时各进程退回本地令牌桶，并定期重试 Redis。
+所有 LLM 调用按（优先级，到达顺序）排队，同时受并发上限与令牌桶约束：
+交互式同步请求优先于后台 JD 分析，同一优先级内严格先进先出。
 """
 
 from __future__ import annotations
 
 import asyncio
+import heapq
+import itertools
 import logging
+import threading
 import time
-from typing import Any, Callable, Coroutine, TypeVar
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Any, AsyncIterator, Callable, Coroutine, Iterator, Optional, TypeVar
 
 from tenacity import (
     retry,
@@ -24,21 +50,48 @@ from tenacity import (
 )
 
 from src.core.app_config import get_app_config
+from src.core.metrics import LLM_INFLIGHT, LLM_LIMITER_QUEUED, LLM_LIMITER_WAIT, RATE_LIMIT_FALLBACKS
 
 logger = logging.getLogger(__name__)
 _cfg = get_app_config()
 
 T = TypeVar("T")
 
-# ── Async token-bucket rate limiter ─────────────────────────────────────────
+# ── Priority classes ─────────────────────────────────────────────────────────
+
+class Priority(IntEnum):
+    """LLM call priority classes — lower value is served first."""
+    INTERACTIVE = 0   # synchronous API requests (a user is waiting)
+    BATCH = 1         # Celery async pipeline jobs
+    BACKGROUND = 2    # JD analysis / cache refresh
+
+
+_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+def current_priority() -> Priority:
+    return _priority.get()
+
+
+@contextmanager
+def llm_priority(priority: Priority) -> Iterator[None]:
+    """Run the enclosed code (and tasks it spawns) in the given priority class."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+# ── Token-bucket rate limiter ────────────────────────────────────────────────
 
 class AsyncTokenBucket:
     """
-    Token-bucket rate limiter for use in async code.
+    Token-bucket rate limiter.
 
-    Allows up to `rate` requests per `period` seconds.
-    Callers await `acquire()` before each LLM call; if the bucket is empty
-    they block until a token is available (max wait = period).
+    Allows up to `rate` requests per `period` seconds. The state is guarded by
+    a threading lock, so one bucket can be shared by every event loop / thread
+    in the process. try_acquire() never blocks; acquire() waits in a loop.
     """
 
     def __init__(self, rate: int, period: float = 60.0) -> None:
@@ -46,43 +99,253 @@ class AsyncTokenBucket:
         self._period = period      # seconds
         self._tokens: float = rate
         self._last_refill = time.monotonic()
-        self._lock = asyncio.Lock()
+        self._lock = threading.Lock()
 
-    async def acquire(self) -> None:
-        async with self._lock:
+    async def try_acquire(self) -> float:
+        """Take one token. Returns 0.0 on success, else seconds until one is available."""
+        with self._lock:
             now = time.monotonic()
-            elapsed = now - self._last_refill
             # Refill tokens proportional to elapsed time
             self._tokens = min(
                 self._rate,
-                self._tokens + elapsed * (self._rate / self._period),
+                self._tokens + (now - self._last_refill) * (self._rate / self._period),
             )
             self._last_refill = now
 
             if self._tokens >= 1:
                 self._tokens -= 1
-                return
+                return 0.0
+            return (1 - self._tokens) * (self._period / self._rate)
 
-            # Not enough tokens — wait until one becomes available
-            wait_time = (1 - self._tokens) * (self._period / self._rate)
+    async def acquire(self) -> None:
+        while (wait_time := await self.try_acquire()) > 0:
             logger.debug(f"[RateLimiter] Bucket empty, waiting {wait_time:.2f}s")
+            await asyncio.sleep(wait_time)
 
-        await asyncio.sleep(wait_time)
-        await self.acquire()  # re-acquire after sleep
 
+# ── Cluster-wide token bucket (Redis) ────────────────────────────────────────
+
+# KEYS[1] = bucket hash; ARGV = rate, period. Uses the Redis server clock so all
+# hosts agree on refill time. Returns the wait in seconds (0 = token granted)
+# as a string — Lua numbers are truncated to integers in replies.
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or rate
+local ts = tonumber(state[2]) or now
+tokens = math.min(rate, tokens + math.max(0, now - ts) * rate / period)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = (1 - tokens) * period / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(period * 2000))
+return tostring(wait)
+"""
+
+REDIS_RETRY_AFTER = 30.0   # seconds on the local fallback before trying Redis again
+
+
+class RedisTokenBucket:
+    """
+    Token bucket shared by every process through Redis, with the same
+    try_acquire()/acquire() interface as AsyncTokenBucket.
+    Redis errors switch this process to `fallback` for REDIS_RETRY_AFTER seconds.
+    """
+
+    def __init__(self, client, key: str, rate: int, period: float, fallback: AsyncTokenBucket) -> None:
+        self._client = client        # sync redis.Redis — thread-safe pool, usable from any loop
+        self._key = key
+        self._rate = rate
+        self._period = period
+        self._fallback = fallback
+        self._script = client.register_script(_TOKEN_BUCKET_LUA)
+        self._down_until = 0.0
+
+    @property
+    def using_fallback(self) -> bool:
+        return time.monotonic() < self._down_until
+
+    def _redis_try_acquire(self) -> float:
+        return float(self._script(keys=[self._key], args=[self._rate, self._period]))
+
+    async def try_acquire(self) -> float:
+        if not self.using_fallback:
+            try:
+                wait_time = await asyncio.to_thread(self._redis_try_acquire)
+                if self._down_until:
+                    logger.info("[RateLimiter] Redis reachable again — back on the shared bucket")
+                    self._down_until = 0.0
+                return wait_time
+            except Exception as e:   # redis.RedisError, OSError, ...
+                self._down_until = time.monotonic() + REDIS_RETRY_AFTER
+                RATE_LIMIT_FALLBACKS.inc()
+                logger.warning(
+                    f"[RateLimiter] Redis bucket unavailable ({e}); "
+                    f"using local bucket for {REDIS_RETRY_AFTER:.0f}s"
+                )
+        return await self._fallback.try_acquire()
+
+    async def acquire(self) -> None:
+        while (wait_time := await self.try_acquire()) > 0:
+            await asyncio.sleep(wait_time)
 
-# Singleton bucket — shared across all agents in the same process
-_moonshot_bucket = AsyncTokenBucket(
-    rate=_cfg.MOONSHOT_RPM_LIMIT,
-    period=60.0,
-)
+
+def _build_bucket() -> AsyncTokenBucket | RedisTokenBucket:
+    local = AsyncTokenBucket(rate=_cfg.MOONSHOT_RPM_LIMIT, period=60.0)
+    if _cfg.RATE_LIMIT_BACKEND != "redis":
+        return local
+    import redis  # connects lazily on first command
+    client = redis.Redis.from_url(
+        _cfg.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5
+    )
+    return RedisTokenBucket(client, "ratelimit:moonshot", _cfg.MOONSHOT_RPM_LIMIT, 60.0, fallback=local)
+
+
+# Singleton bucket — shared across all agents in the same process (and, with
+# the Redis backend, across every process in the deployment)
+_moonshot_bucket = _build_bucket()
 
 
 async def moonshot_acquire() -> None:
-    """Acquire a rate-limit token before calling the Moonshot API."""
+    """
+    Acquire a raw rate-limit token. LLM calls should go through LLMClient,
+    which admits them via the LLMLimiter below (rate + concurrency + priority).
+    """
     await _moonshot_bucket.acquire()
 
 
+# ── Central LLM limiter ──────────────────────────────────────────────────────
+
+class LLMLimiter:
+    """
+    Priority-aware FIFO admission gate for LLM calls, bound to one event loop.
+
+    A single pump task admits the head waiter once a concurrency slot is free
+    and the bucket yields a token; the head is re-read after every wait, so a
+    newly arrived higher-priority waiter overtakes queued lower-priority ones.
+    """
+
+    def __init__(self, bucket: AsyncTokenBucket | RedisTokenBucket, max_concurrency: int) -> None:
+        self._bucket = bucket
+        self._capacity = max(1, max_concurrency)
+        self._inflight = 0
+        self._waiters: list[tuple[int, int, asyncio.Future]] = []   # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._pump_task: Optional[asyncio.Task] = None
+
+    @property
+    def inflight(self) -> int:
+        return self._inflight
+
+    @property
+    def queued(self) -> int:
+        return sum(1 for _, _, fut in self._waiters if not fut.done())
+
+    async def acquire(self, priority: Optional[Priority] = None) -> None:
+        priority = current_priority() if priority is None else Priority(priority)
+        label = priority.name.lower()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (int(priority), next(self._seq), fut))
+        LLM_LIMITER_QUEUED.labels(priority=label).inc()
+        started = time.monotonic()
+        self._kick()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():   # admitted just as we were cancelled
+                self.release()
+            raise
+        finally:
+            LLM_LIMITER_QUEUED.labels(priority=label).dec()
+        LLM_LIMITER_WAIT.labels(priority=label).observe(time.monotonic() - started)
+
+    def release(self) -> None:
+        self._inflight -= 1
+        LLM_INFLIGHT.dec()
+        self._wakeup.set()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[Priority] = None) -> AsyncIterator[None]:
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def try_admit(self) -> bool:
+        """
+        Admit immediately or not at all: succeeds only when nobody is queued, a
+        concurrency slot is free and the bucket has a token (used for hedges,
+        which must only consume spare capacity). Pair with admitted().
+        """
+        if self._head() is not None or self._inflight >= self._capacity:
+            return False
+        if await self._bucket.try_acquire() > 0 or self._inflight >= self._capacity:
+            return False
+        self._inflight += 1
+        LLM_INFLIGHT.inc()
+        return True
+
+    @asynccontextmanager
+    async def admitted(self) -> AsyncIterator[None]:
+        """Context for a call already admitted by try_admit(); releases the slot."""
+        try:
+            yield
+        finally:
+            self.release()
+
+    def _kick(self) -> None:
+        self._wakeup.set()
+        if self._pump_task is None or self._pump_task.done():
+            self._pump_task = asyncio.get_running_loop().create_task(self._pump())
+
+    def _head(self) -> Optional[asyncio.Future]:
+        while self._waiters and self._waiters[0][2].done():   # cancelled while queued
+            heapq.heappop(self._waiters)
+        return self._waiters[0][2] if self._waiters else None
+
+    async def _pump(self) -> None:
+        while True:
+            self._wakeup.clear()
+            if self._head() is None:
+                return
+            if self._inflight >= self._capacity:
+                await self._wakeup.wait()
+                continue
+            wait_time = await self._bucket.try_acquire()
+            if wait_time > 0:
+                await asyncio.sleep(wait_time)
+                continue
+            head = self._head()
+            if head is None:
+                return   # every waiter left while the token was taken — it is simply spent
+            heapq.heappop(self._waiters)
+            self._inflight += 1
+            LLM_INFLIGHT.inc()
+            head.set_result(None)
+
+
+# One limiter per event loop (uvicorn has one; Celery runs asyncio.run per task).
+# All of them share the process-wide token bucket.
+_limiters: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, LLMLimiter]" = weakref.WeakKeyDictionary()
+
+
+def get_llm_limiter() -> LLMLimiter:
+    loop = asyncio.get_running_loop()
+    limiter = _limiters.get(loop)
+    if limiter is None:
+        limiter = LLMLimiter(_moonshot_bucket, _cfg.LLM_MAX_CONCURRENCY)
+        _limiters[loop] = limiter
+    return limiter
+
+
 # ── Retry / circuit-breaker decorator factory ────────────────────────────────
 
 def moonshot_retry(func: Callable[..., Coroutine[Any, Any, T]]) -> Callable[..., Coroutine[Any, Any, T]]:
@@ -95,8 +358,7 @@ def moonshot_retry(func: Callable[..., Coroutine[Any, Any, T]]) -> Callable[...,
     Usage:
         @moonshot_retry
         async def call_llm(...):
-            await moonshot_acquire()
-            return await client.chat.completions.create(...)
+            return await get_llm_client().chat(caller=..., messages=...)
     """
     import openai  # imported lazily so the module works without openai installed
 
@@ -124,4 +386,9 @@ __all__ = [
     "moonshot_retry",
     "RetryError",
     "AsyncTokenBucket",
+    "RedisTokenBucket",
+    "LLMLimiter",
+    "Priority",
+    "get_llm_limiter",
+    "llm_priority",
 ]
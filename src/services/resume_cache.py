@@ -0,0 +1,184 @@
+"""
+Resume parse cache keyed by the uploaded file's content.
+
+A byte-identical re-upload skips PDF extraction and the structured-extraction
+LLM call: parse_resume_file() looks the file up here first and stores every
+successful parse (text + skills + structured JSON).
+
+Key   = SHA-256 of the uploaded bytes (the filename plays no part)
+Tiers:
+  L1  in-process LRU, RESUME_CACHE_MAX_ENTRIES entries
+  L2  optional Redis (RESUME_CACHE_BACKEND=redis), shared by API and workers
+Both tiers honour RESUME_CACHE_TTL_SECONDS.
+
+PII at rest: Redis only ever sees
+  - a storage key derived from the content hash (not the hash itself), and
+  - the parse encrypted with Fernet under a second key derived from the
+    content hash.
+Both derivations need the original file, so a Redis dump neither reveals a
+resume nor lets anyone test whether a known hash is cached. L1 lives in
+process memory only. A Redis outage degrades to L1, it never fails a parse.
+
+简历解析缓存：以上传文件字节的 SHA-256 为键，缓存提取文本与结构化 JSON。
+进程内 LRU + 可选 Redis 两级，均带 TTL；Redis 中的键与内容均由文件哈希派生并加密，
+没有原文件无法还原或探测，简历隐私数据不会以明文落盘。
+"""
+
+from __future__ import annotations
+
+import base64
+import copy
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken
+
+from src.core.app_config import get_app_config
+from src.core.metrics import RESUME_CACHE_LOOKUPS
+
+logger = logging.getLogger(__name__)
+
+_KEY_PREFIX = "resume_parse:"
+
+
+def content_hash(file_bytes: bytes) -> str:
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _derive(digest: str, purpose: bytes) -> bytes:
+    return hashlib.sha256(purpose + b"\0" + digest.encode()).digest()
+
+
+def _encode(parsed: dict) -> bytes:
+    return json.dumps({**parsed, "skills": sorted(parsed.get("skills", []))}, ensure_ascii=False).encode()
+
+
+def _decode(payload: bytes) -> dict:
+    parsed = json.loads(payload)
+    parsed["skills"] = set(parsed.get("skills", []))
+    return parsed
+
+
+class ResumeParseCache:
+    """Two-tier (LRU + optional encrypted Redis) TTL cache of parse results. Thread-safe."""
+
+    def __init__(self, max_entries: int, ttl: float, redis_client=None) -> None:
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._redis = redis_client          # sync redis.Redis or None
+        self._l1: OrderedDict[str, tuple[float, dict]] = OrderedDict()   # digest → (expires_at, parsed)
+        self._lock = threading.Lock()
+
+    # ── Tiers ────────────────────────────────────────────────────────────────
+
+    def _get_l1(self, digest: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._l1.get(digest)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                del self._l1[digest]
+                return None
+            self._l1.move_to_end(digest)
+            return entry[1]
+
+    def _put_l1(self, digest: str, parsed: dict) -> None:
+        if self._max_entries <= 0:
+            return
+        with self._lock:
+            self._l1[digest] = (time.time() + self._ttl, parsed)
+            self._l1.move_to_end(digest)
+            while len(self._l1) > self._max_entries:
+                self._l1.popitem(last=False)
+
+    def _storage_key(self, digest: str) -> str:
+        return _KEY_PREFIX + _derive(digest, b"id").hex()
+
+    def _fernet(self, digest: str) -> Fernet:
+        return Fernet(base64.urlsafe_b64encode(_derive(digest, b"key")))
+
+    def _get_l2(self, digest: str) -> Optional[dict]:
+        if self._redis is None:
+            return None
+        try:
+            token = self._redis.get(self._storage_key(digest))
+            if token is None:
+                return None
+            return _decode(self._fernet(digest).decrypt(token))
+        except InvalidToken:
+            logger.warning("[ResumeParseCache] Undecryptable Redis entry ignored")
+        except Exception as e:   # redis.RedisError, OSError, ...
+            logger.warning(f"[ResumeParseCache] Redis lookup failed, using L1 only: {e}")
+        return None
+
+    def _put_l2(self, digest: str, parsed: dict) -> None:
+        if self._redis is None:
+            return
+        try:
+            token = self._fernet(digest).encrypt(_encode(parsed))
+            self._redis.set(self._storage_key(digest), token, ex=max(1, int(self._ttl)))
+        except Exception as e:
+            logger.warning(f"[ResumeParseCache] Redis write failed: {e}")
+
+    # ── API ──────────────────────────────────────────────────────────────────
+    # Each lookup returns a private copy of the cached parse, or None.
+
+    def get_l1(self, file_bytes: bytes) -> Optional[dict]:
+        """In-process lookup only (cheap — safe to call on the event loop)."""
+        parsed = self._get_l1(content_hash(file_bytes))
+        if parsed is None:
+            return None
+        RESUME_CACHE_LOOKUPS.labels(result="l1_hit").inc()
+        return copy.deepcopy(parsed)
+
+    def get_l2(self, file_bytes: bytes) -> Optional[dict]:
+        """Redis lookup (blocking I/O); a hit is promoted into L1."""
+        digest = content_hash(file_bytes)
+        parsed = self._get_l2(digest)
+        if parsed is None:
+            RESUME_CACHE_LOOKUPS.labels(result="miss").inc()
+            return None
+        self._put_l1(digest, parsed)
+        RESUME_CACHE_LOOKUPS.labels(result="l2_hit").inc()
+        return copy.deepcopy(parsed)
+
+    def get(self, file_bytes: bytes) -> Optional[dict]:
+        hit = self.get_l1(file_bytes)
+        return hit if hit is not None else self.get_l2(file_bytes)
+
+    def put(self, file_bytes: bytes, parsed: dict) -> None:
+        digest = content_hash(file_bytes)
+        parsed = copy.deepcopy(parsed)
+        self._put_l1(digest, parsed)
+        self._put_l2(digest, parsed)
+
+    def clear(self) -> None:
+        """Drops L1 only — Redis entries expire on their own TTL."""
+        with self._lock:
+            self._l1.clear()
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_resume_cache: ResumeParseCache | None = None
+
+
+def get_resume_cache() -> ResumeParseCache:
+    global _resume_cache
+    if _resume_cache is None:
+        cfg = get_app_config()
+        client = None
+        if cfg.RESUME_CACHE_BACKEND == "redis":
+            import redis  # connects lazily on first command
+            client = redis.Redis.from_url(cfg.REDIS_URL, socket_connect_timeout=0.5, socket_timeout=0.5)
+        _resume_cache = ResumeParseCache(
+            max_entries=cfg.RESUME_CACHE_MAX_ENTRIES,
+            ttl=cfg.RESUME_CACHE_TTL_SECONDS,
+            redis_client=client,
+        )
+    return _resume_cache
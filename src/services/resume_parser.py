@@ -7,18 +7,12 @@ Returns a dict with "text" (embedding-ready resume summary), "skills" (set of sk
 
 """
 from typing import Set, Dict, Any
-import io
+import asyncio
 import json
-import pdfplumber
-from openai import OpenAI
-
-from src.core.config import get_moonshot_api_key, get_moonshot_model
-
-_client = OpenAI(
-    api_key=get_moonshot_api_key(),
-    base_url="https://api.moonshot.ai/v1",
-)
-MOONSHOT_MODEL = get_moonshot_model()
+from src.core.app_config import get_app_config
+from src.services.document_extractor import extract_text
+from src.services.llm_client import get_llm_client
+from src.services.resume_cache import get_resume_cache
 
 # TODO: Extract skill keywords from resume text. Currently a simple keyword lookup;
 # consider replacing with a proper NLP/LLM-based extractor.
@@ -37,25 +31,30 @@ def extract_skills_from_resume(resume_text: str) -> Set[str]:
             found.add(skill)
     return found
 
-def extract_text_from_pdf(file_bytes: bytes) -> str:
-    """Extract plain text from PDF bytes using pdfplumber."""
-    textchunk = []
-    with pdfplumber.open(io.BytesIO(file_bytes)) as pdf:
-        for page in pdf.pages:
-            textchunk.append(page.extract_text())
-    return "\n".join(textchunk).strip()
-
-def parse_resume_file(file_bytes: bytes, filename: str) -> dict:
+async def parse_resume_file(file_bytes: bytes, filename: str) -> dict:
     """
-    Parse a resume file: extract raw text with pdfplumber, then call
-    Moonshot Kimi for structured JSON extraction.
+    Parse a resume file: extract raw text in the extraction process pool
+    (src/services/document_extractor.py), then call Moonshot Kimi for
+    structured JSON extraction on the shared async client. Neither step holds
+    a thread of this process while it waits.
+    Byte-identical uploads are served from the resume parse cache.
     Returns: {"text": <embedding-ready summary>, "skills": <set>, "raw": <full LLM JSON>}
     """
-    raw_text = extract_text_from_pdf(file_bytes)
+    use_cache = get_app_config().RESUME_CACHE_ENABLED
+    if use_cache:
+        cache = get_resume_cache()
+        cached = cache.get_l1(file_bytes)
+        if cached is None:
+            cached = await asyncio.to_thread(cache.get_l2, file_bytes)
+        if cached is not None:
+            return cached
+
+    # 1. CPU step: text extraction in a worker process
+    raw_text = (await extract_text(file_bytes, filename)).text
     if not raw_text:
-        raise ValueError("No text extracted from PDF. The file may be scanned or encrypted.")
-    # 2. Call Moonshot for structured JSON extraction
-    gemini_json = _call_moonshot_for_structured_resume(raw_text)
+        raise ValueError("No text extracted from the file. It may be scanned or encrypted.")
+    # 2. I/O step: Moonshot structured JSON extraction
+    gemini_json = await _call_moonshot_for_structured_resume(raw_text)
     # 3. Unpack structured fields from Moonshot response
     name = gemini_json.get("name", "")
     email = gemini_json.get("email", "")
@@ -77,7 +76,7 @@ def parse_resume_file(file_bytes: bytes, filename: str) -> dict:
         f"Raw text: {raw_text}",
     ]
     resume_text = "\n".join(part for part in parts if part).strip()
-    return {
+    parsed = {
         "text": resume_text,
         "skills": skills,
         "raw": {
@@ -88,8 +87,12 @@ def parse_resume_file(file_bytes: bytes, filename: str) -> dict:
             "expected_salary": expected_salary,
         },
     }
+    # A failed extraction (blank fallback) is retried next time, not replayed
+    if use_cache and gemini_json != _empty_structured_resume():
+        await asyncio.to_thread(cache.put, file_bytes, parsed)
+    return parsed
 
-def _call_moonshot_for_structured_resume(raw_text: str) -> Dict[str, Any]:
+async def _call_moonshot_for_structured_resume(raw_text: str) -> Dict[str, Any]:
     """Call Moonshot Kimi to extract structured JSON from raw resume text."""
     prompt = f"""You are a professional resume parsing assistant.
 Extract key structured information from the resume text below.
@@ -120,8 +123,8 @@ Respond with ONLY a valid JSON object, no extra explanation. Required fields:
     "expected_salary": {{"min": number, "max": number, "currency": "USD", "period": "annual"}}
 }}"""
 
-    response = _client.chat.completions.create(
-        model=MOONSHOT_MODEL,
+    content = await get_llm_client().chat(
+        caller="resume_parser",
         messages=[
             {"role": "system", "content": "You are a professional resume parsing assistant. Output only valid JSON, nothing else."},
             {"role": "user", "content": prompt},
@@ -130,25 +133,29 @@ Respond with ONLY a valid JSON object, no extra explanation. Required fields:
         response_format={"type": "json_object"},
     )
     try:
-        content = response.choices[0].message.content or "{}"
-        data = json.loads(content)
+        data = json.loads(content or "{}")
         if not isinstance(data, dict):
             raise ValueError("Moonshot response is not a JSON object.")
         return data
     except json.JSONDecodeError:
-        return {
-            "name": "",
-            "email": "",
-            "phone": "",
-            "current_title": "",
-            "experience_years": None,
-            "total_experience_years": None,
-            "skills": [],
-            "soft_skills": [],
-            "education": [],
-            "summary": "",
-            "seniority": None,
-            "culture_keywords": [],
-            "expected_salary": None,
-        }
+        return _empty_structured_resume()
+
+
+def _empty_structured_resume() -> Dict[str, Any]:
+    """Blank extraction used when the LLM answer is not valid JSON."""
+    return {
+        "name": "",
+        "email": "",
+        "phone": "",
+        "current_title": "",
+        "experience_years": None,
+        "total_experience_years": None,
+        "skills": [],
+        "soft_skills": [],
+        "education": [],
+        "summary": "",
+        "seniority": None,
+        "culture_keywords": [],
+        "expected_salary": None,
+    }
     
\ No newline at end of file
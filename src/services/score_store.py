@@ -0,0 +1,277 @@
+"""
+Persisted five-dim scores for incremental re-scoring.
+
+Rows are keyed by (candidate fingerprint, job_id) and carry the job content
+hash and the scorer version (SCORING_VERSION + dimension weights) they were
+computed with. A score is only reused while both still match, so an edited
+job or a re-weighted scorer is transparently re-scored.
+
+Catalog-change hook (on_catalog_change):
+  - diffs the new catalog's job hashes against the last-seen catalog; the
+    snapshot is swapped in one transaction, so only the first process to see
+    a change (API or worker) re-scores it
+  - re-scores ONLY new/changed jobs for every stored candidate, using the
+    vectors persisted in CandidateStore (no resume is re-parsed or re-encoded)
+  - evicts rows for deleted jobs
+  - on the very first snapshot it only records the catalog: scores are then
+    validated by hash and filled in lazily by score_incremental()
+Per-candidate top-k lists are read through an index on (fingerprint,
+final_score): score_incremental() serves a returning candidate's top-k
+straight from it when every catalog job has a valid stored score.
+Catalog churn therefore costs O(changed jobs) per candidate instead of
+O(candidates × catalog).
+
+持久化的五维评分，用于增量重算。
+岗位新增/修改时仅重算变化的岗位，已存储候选人的 top-k 原地更新。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+import threading
+from contextlib import closing
+from pathlib import Path
+from typing import Optional
+
+from src.models.schemas import DIMENSIONS, CandidateProfile, DimensionScore, FiveDimScore, JobPosting
+from src.services.candidate_store import CANDIDATE_DIR, CandidateStore, get_candidate_store
+from src.services.job_adapter import job_content_hash
+
+logger = logging.getLogger(__name__)
+
+SCORE_DB_PATH = CANDIDATE_DIR / "scores.sqlite3"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scores (
+    fingerprint  TEXT NOT NULL,
+    job_id       TEXT NOT NULL,
+    job_hash     TEXT NOT NULL,
+    scorer_version TEXT NOT NULL DEFAULT '',
+    final_score  REAL NOT NULL,
+    payload      TEXT NOT NULL,
+    PRIMARY KEY (fingerprint, job_id)
+);
+CREATE INDEX IF NOT EXISTS idx_scores_rank ON scores (fingerprint, final_score DESC);
+CREATE INDEX IF NOT EXISTS idx_scores_job ON scores (job_id);
+CREATE TABLE IF NOT EXISTS catalog (
+    job_id    TEXT PRIMARY KEY,
+    job_hash  TEXT NOT NULL
+);
+"""
+
+
+def _score_to_json(score: FiveDimScore) -> str:
+    return json.dumps(score.dimension_dicts(with_details=True), ensure_ascii=False)
+
+
+def _score_from_json(job_id: str, final_score: float, payload: str) -> FiveDimScore:
+    # final_score is recomputed from the dimensions; the column only serves the rank index
+    data = json.loads(payload)
+    return FiveDimScore(job_id=job_id, **{dim: DimensionScore(**data[dim]) for dim in DIMENSIONS})
+
+
+class ScoreStore:
+    """SQLite-backed score cache, safe to use from executor threads."""
+
+    def __init__(self, path: Path = SCORE_DB_PATH) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.executescript(_SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(scores)")}
+            if "scorer_version" not in columns:     # stores created before scores were versioned
+                conn.execute("ALTER TABLE scores ADD COLUMN scorer_version TEXT NOT NULL DEFAULT ''")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path)
+
+    # ── Scores ───────────────────────────────────────────────────────────────
+
+    def put_many(
+        self, fingerprint: str, job_hashes: dict[str, str], scores: list[FiveDimScore], scorer_version: str,
+    ) -> None:
+        rows = [
+            (fingerprint, s.job_id, job_hashes[s.job_id], scorer_version, s.final_score, _score_to_json(s))
+            for s in scores
+        ]
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO scores (fingerprint, job_id, job_hash, scorer_version, final_score, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+
+    def get_valid(self, fingerprint: str, job_hashes: dict[str, str], scorer_version: str) -> dict[str, FiveDimScore]:
+        """Stored scores for this candidate whose job hash and scorer version still match."""
+        with self._lock, closing(self._connect()) as conn:
+            rows = conn.execute(
+                "SELECT job_id, job_hash, final_score, payload FROM scores "
+                "WHERE fingerprint = ? AND scorer_version = ?",
+                (fingerprint, scorer_version),
+            ).fetchall()
+        return {
+            job_id: _score_from_json(job_id, final, payload)
+            for job_id, job_hash, final, payload in rows
+            if job_hashes.get(job_id) == job_hash
+        }
+
+    def top_k(
+        self, fingerprint: str, k: int, job_hashes: dict[str, str], scorer_version: str,
+    ) -> Optional[list[FiveDimScore]]:
+        """
+        Top-k read through the rank index, decoding only the k returned rows.
+        None unless every job in `job_hashes` has a valid stored score — a
+        partial ranking could miss the real best matches.
+        """
+        with self._lock, closing(self._connect()) as conn:
+            valid = {
+                job_id
+                for job_id, job_hash in conn.execute(
+                    "SELECT job_id, job_hash FROM scores WHERE fingerprint = ? AND scorer_version = ?",
+                    (fingerprint, scorer_version),
+                )
+                if job_hashes.get(job_id) == job_hash
+            }
+            if len(valid) < len(job_hashes):
+                return None
+            top = []
+            for job_id, final, payload in conn.execute(
+                "SELECT job_id, final_score, payload FROM scores "
+                "WHERE fingerprint = ? AND scorer_version = ? ORDER BY final_score DESC",
+                (fingerprint, scorer_version),
+            ):
+                if job_id in valid:
+                    top.append(_score_from_json(job_id, final, payload))
+                    if len(top) == k:
+                        break
+        return top
+
+    def fingerprints(self) -> list[str]:
+        with self._lock, closing(self._connect()) as conn:
+            return [r[0] for r in conn.execute("SELECT DISTINCT fingerprint FROM scores")]
+
+    def delete_jobs(self, job_ids: list[str]) -> None:
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.executemany("DELETE FROM scores WHERE job_id = ?", [(j,) for j in job_ids])
+
+    # ── Catalog snapshot ─────────────────────────────────────────────────────
+
+    def swap_catalog(self, job_hashes: dict[str, str]) -> dict[str, str]:
+        """
+        Atomically replace the catalog snapshot and return the previous one.
+        Concurrent processes serialise on the write lock, so a given change is
+        diffed (and re-scored) by exactly one of them.
+        """
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("BEGIN IMMEDIATE")
+            old = dict(conn.execute("SELECT job_id, job_hash FROM catalog"))
+            conn.execute("DELETE FROM catalog")
+            conn.executemany("INSERT INTO catalog VALUES (?, ?)", list(job_hashes.items()))
+        return old
+
+
+# ── Process-level singleton ───────────────────────────────────────────────────
+
+_score_store: ScoreStore | None = None
+
+
+def get_score_store() -> ScoreStore:
+    global _score_store
+    if _score_store is None:
+        _score_store = ScoreStore()
+    return _score_store
+
+
+# ── Incremental scoring (run in executor — PyTorch encode) ────────────────────
+
+def score_incremental(
+    scorer,
+    candidate: CandidateProfile,
+    fingerprint: str,
+    postings: list[JobPosting],
+    top_k: Optional[int] = None,
+    store: Optional[ScoreStore] = None,
+) -> list[FiveDimScore]:
+    """
+    Score a candidate against the catalog, reusing every persisted score whose
+    job hash (and scorer version) is unchanged and scoring only the remaining
+    jobs. A fully scored candidate's top-k is read straight from the rank index.
+    复用未变化岗位的已存评分，只对新增/修改的岗位评分；评分齐全时直接按索引读取 top-k。
+    """
+    store = store or get_score_store()
+    job_hashes = {p.job_id: job_content_hash(p) for p in postings}
+    if top_k:
+        top = store.top_k(fingerprint, top_k, job_hashes, scorer.version)
+        if top is not None:
+            logger.info(f"[ScoreStore] {fingerprint[:8]}: top-{top_k} served from stored scores")
+            return top
+    cached = store.get_valid(fingerprint, job_hashes, scorer.version)
+    pending = [p for p in postings if p.job_id not in cached]
+
+    fresh = scorer.score_batch(candidate, pending) if pending else []
+    if fresh:
+        store.put_many(fingerprint, job_hashes, fresh, scorer.version)
+    logger.info(
+        f"[ScoreStore] {fingerprint[:8]}: reused {len(cached)} scores, scored {len(fresh)} jobs"
+    )
+
+    results = [cached[p.job_id] for p in postings if p.job_id in cached] + fresh
+    results.sort(key=lambda r: r.final_score, reverse=True)
+    return results[:top_k] if top_k else results
+
+
+def on_catalog_change(
+    scorer,
+    postings: list[JobPosting],
+    store: Optional[ScoreStore] = None,
+    candidates: Optional[CandidateStore] = None,
+) -> dict[str, list[str]]:
+    """
+    Catalog-change hook: re-score only new/changed jobs for every stored
+    candidate and evict deleted jobs. Returns {"changed": [...], "deleted": [...]}.
+    岗位库变化钩子：仅对变化的岗位重算所有已存候选人的评分。
+    """
+    store = store or get_score_store()
+    candidates = get_candidate_store() if candidates is None else candidates
+
+    new_hashes = {p.job_id: job_content_hash(p) for p in postings}
+    old_hashes = store.swap_catalog(new_hashes)
+    if not old_hashes:
+        # First snapshot: nothing to diff against. Stored scores are checked by
+        # hash on read and filled in lazily, instead of re-scoring everyone.
+        logger.info(f"[ScoreStore] Catalog snapshot initialised with {len(new_hashes)} jobs")
+        return {"changed": [], "deleted": []}
+    changed = [p for p in postings if old_hashes.get(p.job_id) != new_hashes[p.job_id]]
+    deleted = [job_id for job_id in old_hashes if job_id not in new_hashes]
+
+    if deleted:
+        store.delete_jobs(deleted)
+
+    if changed:
+        known = set(store.fingerprints())
+        records = [r for r in candidates.records() if r.candidate_id in known]
+        job_vectors = [
+            (p, scorer.semantic.encode_job(p), scorer.culture.job_vector(p)) for p in changed
+        ]
+        for rec in records:
+            candidate = rec.profile.to_candidate_profile()
+            candidate.skills = rec.skill_ids
+            fresh = []
+            for job, job_emb, job_culture in job_vectors:
+                try:
+                    fresh.append(scorer.score_with_vectors(
+                        candidate, job, rec.semantic, rec.culture, job_emb, job_culture,
+                        with_details=False,
+                    ))
+                except Exception as e:
+                    logger.error(f"[ScoreStore] Re-scoring failed for job {job.job_id}: {e}")
+            store.put_many(rec.candidate_id, new_hashes, fresh, scorer.version)
+        logger.info(
+            f"[ScoreStore] Catalog change: re-scored {len(changed)} jobs "
+            f"for {len(records)} candidates, evicted {len(deleted)} jobs"
+        )
+
+    return {"changed": [p.job_id for p in changed], "deleted": deleted}
@@ -9,10 +9,11 @@ from __future__ import annotations
 import asyncio
 import logging
 import traceback
-from typing import Any
+from typing import Any, Optional
 
 from celery import Task
 from celery.exceptions import SoftTimeLimitExceeded
+from celery.signals import worker_process_init
 
 from src.workers.celery_app import celery_app
 
@@ -45,6 +46,22 @@ class OrchestratorTask(Task):
         return self._orchestrator
 
 
+# ── Worker process init ───────────────────────────────────────────────────────
+
+@worker_process_init.connect
+def _start_jd_refresher(**_: Any) -> None:
+    """
+    Refresh the JD cache in the background of every worker process (when
+    JD_CACHE_REFRESH_INTERVAL > 0). Tasks run on short-lived event loops, so
+    the refresher runs on the process's refresh loop (a daemon thread), which
+    also hosts the refreshes tasks trigger.
+    每个 worker 进程在后台刷新线程的事件循环上定期刷新 JD 缓存。
+    """
+    from src.agents.job_analyzer_agent import start_refresher_thread
+    if start_refresher_thread() is not None:
+        logger.info("[CeleryWorker] JD cache refresher started")
+
+
 # ── Main matching task ────────────────────────────────────────────────────────
 
 @celery_app.task(
@@ -70,9 +87,10 @@ def run_match_pipeline(
     logger.info(f"[{request_id}] Worker picked up task {self.request.id}")
 
     raw_bytes = bytes(file_bytes)
+    deadline = _soft_limit_deadline(self)
 
     try:
-        result = asyncio.run(_run_async(self.orchestrator, raw_bytes, filename, top_k, request_id))
+        result = asyncio.run(_run_async(self.orchestrator, raw_bytes, filename, top_k, request_id, deadline))
         logger.info(f"[{request_id}] Task {self.request.id} complete")
         return result
 
@@ -85,23 +103,42 @@ def run_match_pipeline(
         return _error_result(request_id, str(exc))
 
 
+def _soft_limit_deadline(task: Task) -> Optional[float]:
+    """
+    Agent DAG deadline from this task's soft time limit (per-call override or
+    task_soft_time_limit), minus DEADLINE_MARGIN_SECONDS, so agents wind down
+    before SoftTimeLimitExceeded discards all their work.
+    """
+    from src.core.app_config import get_app_config
+    from src.core.deadline import deadline_in
+
+    soft = (task.request.timelimit or (None, None))[1] or celery_app.conf.task_soft_time_limit
+    if not soft:
+        return None
+    return deadline_in(soft - get_app_config().DEADLINE_MARGIN_SECONDS)
+
+
 async def _run_async(
     orchestrator,
     file_bytes: bytes,
     filename: str,
     top_k: int,
     request_id: str,
+    deadline: Optional[float] = None,
 ) -> dict[str, Any]:
     """Execute the orchestrator DAG and serialize the result to a plain dict."""
     from src.agents.base import AgentContext
+    from src.services.rate_limiter import Priority, llm_priority
 
     ctx = AgentContext(
         request_id=request_id,
         file_bytes=file_bytes,
         filename=filename,
         top_k=top_k,
+        deadline=deadline,
     )
-    ctx = await orchestrator.run(ctx)
+    with llm_priority(Priority.BATCH):   # async jobs yield to interactive requests
+        ctx = await orchestrator.run(ctx)
     return _serialize_ctx(ctx, request_id)
 
 
@@ -81,6 +81,96 @@ class TestAsyncTokenBucket:
         assert elapsed >= 0.9, f"Should have throttled, elapsed={elapsed:.2f}s"
 
 
+# ── Redis token bucket ────────────────────────────────────────────────────────
+
+class TestRedisTokenBucket:
+    """Cluster-wide bucket: shared budget across processes, local fallback."""
+
+    def _bucket(self, client, rate=3):
+        from src.services.rate_limiter import AsyncTokenBucket, RedisTokenBucket
+        return RedisTokenBucket(client, "test:bucket", rate=rate, period=60.0,
+                                fallback=AsyncTokenBucket(rate=rate, period=60.0))
+
+    async def test_buckets_share_one_budget(self):
+        import fakeredis
+        server = fakeredis.FakeServer()
+        api = self._bucket(fakeredis.FakeRedis(server=server))
+        worker = self._bucket(fakeredis.FakeRedis(server=server))
+
+        waits = [await b.try_acquire() for b in (api, worker, api)]
+        assert waits == [0.0, 0.0, 0.0]
+        assert await worker.try_acquire() == pytest.approx(20.0, abs=0.5)   # 4th token in 60 s / 3
+
+    async def test_falls_back_to_local_bucket_when_redis_is_down(self):
+        import fakeredis
+        server = fakeredis.FakeServer()
+        server.connected = False
+        bucket = self._bucket(fakeredis.FakeRedis(server=server), rate=1)
+
+        assert await bucket.try_acquire() == 0.0      # local fallback grants
+        assert bucket.using_fallback
+        assert await bucket.try_acquire() > 0          # local budget is enforced too
+
+
+# ── Central LLM limiter ───────────────────────────────────────────────────────
+
+class TestLLMLimiter:
+    """Central limiter: priority classes, FIFO within a class, concurrency cap."""
+
+    class _OpenBucket:
+        async def try_acquire(self):
+            return 0.0
+
+    async def test_priority_then_fifo_admission(self):
+        from src.services.rate_limiter import LLMLimiter, Priority
+        limiter = LLMLimiter(self._OpenBucket(), max_concurrency=1)
+        order = []
+
+        async def call(name, priority):
+            async with limiter.slot(priority):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        await limiter.acquire(Priority.INTERACTIVE)          # hold the only slot
+        tasks = [
+            asyncio.create_task(call("bg1", Priority.BACKGROUND)),
+            asyncio.create_task(call("bg2", Priority.BACKGROUND)),
+            asyncio.create_task(call("ui1", Priority.INTERACTIVE)),
+            asyncio.create_task(call("ui2", Priority.INTERACTIVE)),
+        ]
+        await asyncio.sleep(0.01)
+        assert limiter.queued == 4
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == ["ui1", "ui2", "bg1", "bg2"]
+
+    async def test_concurrency_cap_and_cancelled_waiter(self):
+        from src.services.rate_limiter import LLMLimiter
+        limiter = LLMLimiter(self._OpenBucket(), max_concurrency=2)
+        peak = 0
+
+        async def call():
+            nonlocal peak
+            async with limiter.slot():
+                peak = max(peak, limiter.inflight)
+                await asyncio.sleep(0.02)
+
+        doomed = asyncio.create_task(call())
+        tasks = [asyncio.create_task(call()) for _ in range(5)]
+        await asyncio.sleep(0)
+        doomed.cancel()
+        await asyncio.gather(*tasks)
+        assert peak == 2
+        assert limiter.inflight == 0 and limiter.queued == 0
+
+    async def test_priority_context_applies_to_nested_calls(self):
+        from src.services.rate_limiter import Priority, current_priority, llm_priority
+        assert current_priority() is Priority.INTERACTIVE
+        with llm_priority(Priority.BATCH):
+            assert await asyncio.create_task(asyncio.sleep(0, current_priority())) is Priority.BATCH
+        assert current_priority() is Priority.INTERACTIVE
+
+
 # ── JD Cache concurrency ──────────────────────────────────────────────────────
 
 class TestJDCacheConcurrency:
@@ -141,3 +231,1512 @@ class TestJDCacheConcurrency:
         await agent.run(ctx)
 
         assert len(ctx.analyzed_jobs) == 1
+
+
+# ── Incremental JD analysis ───────────────────────────────────────────────────
+
+class TestIncrementalJDAnalysis:
+    @staticmethod
+    def _setup(monkeypatch, tmp_path, jobs):
+        import src.agents.job_analyzer_agent as jaa
+        from src.models.agent_schemas import AnalyzedJob
+        from src.services.jd_store import JDAnalysisStore
+
+        store = JDAnalysisStore(tmp_path / "jd.sqlite3")
+        analyzed = []
+
+        async def fake_analyze(chunk):
+            analyzed.extend(p.job_id for p, _ in chunk)
+            return [
+                AnalyzedJob(posting=p, company=c, implicit_requirements=[] if p.job_id == "bad" else [f"req-{p.job_id}"])
+                for p, c in chunk
+            ]
+
+        monkeypatch.setattr(jaa, "load_jobs", lambda: jobs)
+        monkeypatch.setattr(jaa, "get_jd_store", lambda: store)
+        monkeypatch.setattr(jaa, "_analyze_jobs", fake_analyze)
+        monkeypatch.setattr(jaa, "_notify_catalog_change", lambda postings: None)
+        return jaa, store, analyzed
+
+    @staticmethod
+    def _job(job_id, description="Build things"):
+        return {"job_id": job_id, "job_title": "Engineer", "company": "Acme",
+                "description": description, "required_skills": ["Python"]}
+
+    async def test_only_changed_jobs_are_reanalyzed(self, monkeypatch, tmp_path):
+        jobs = [self._job("1"), self._job("2"), self._job("3")]
+        jaa, store, analyzed = self._setup(monkeypatch, tmp_path, jobs)
+
+        await jaa._rebuild_cache(1.0)
+        assert sorted(analyzed) == ["1", "2", "3"]
+
+        analyzed.clear()
+        jobs[:] = [self._job("1"), self._job("2", "Build other things"), self._job("4")]
+        await jaa._rebuild_cache(2.0)
+
+        assert sorted(analyzed) == ["2", "4"]
+        assert sorted(jaa._cache["results"]) == ["1", "2", "4"]
+        assert jaa._cache["results"]["1"].implicit_requirements == ["req-1"]
+        assert len(store) == 3                      # job 3 evicted
+
+    async def test_store_survives_restart_and_skips_failures(self, monkeypatch, tmp_path):
+        from src.services.jd_store import JDAnalysisStore
+
+        jobs = [self._job("1"), self._job("bad")]
+        jaa, store, analyzed = self._setup(monkeypatch, tmp_path, jobs)
+        await jaa._rebuild_cache(1.0)
+
+        reopened = JDAnalysisStore(tmp_path / "jd.sqlite3")
+        assert len(reopened) == 1                   # the empty (failed) analysis is not persisted
+        monkeypatch.setattr(jaa, "get_jd_store", lambda: reopened)
+        analyzed.clear()
+        await jaa._rebuild_cache(2.0)
+        assert analyzed == ["bad"]
+
+
+# ── Cluster-shared JD analyses ────────────────────────────────────────────────
+
+class TestSharedJDStore:
+    async def test_second_process_reads_leader_results(self, monkeypatch, tmp_path):
+        import fakeredis
+        import src.agents.job_analyzer_agent as jaa
+        from src.models.agent_schemas import AnalyzedJob
+        from src.services.jd_store import JDAnalysisStore
+
+        server = fakeredis.FakeServer()
+        api = JDAnalysisStore(None, redis_client=fakeredis.FakeRedis(server=server))
+        worker = JDAnalysisStore(tmp_path / "worker.sqlite3", redis_client=fakeredis.FakeRedis(server=server))
+        jobs = [{"job_id": str(i), "job_title": "Engineer", "description": f"job {i}"} for i in range(3)]
+        analyzed = []
+
+        async def fake_analyze(chunk):
+            analyzed.extend(p.job_id for p, _ in chunk)
+            return [AnalyzedJob(posting=p, company=c, implicit_requirements=["ownership"]) for p, c in chunk]
+
+        monkeypatch.setattr(jaa, "load_jobs", lambda: jobs)
+        monkeypatch.setattr(jaa, "_analyze_jobs", fake_analyze)
+        monkeypatch.setattr(jaa, "_notify_catalog_change", lambda postings: None)
+
+        monkeypatch.setattr(jaa, "get_jd_store", lambda: api)
+        await jaa._rebuild_cache(1.0)
+        monkeypatch.setattr(jaa, "get_jd_store", lambda: worker)
+        await jaa._rebuild_cache(1.0)
+
+        assert sorted(analyzed) == ["0", "1", "2"]           # analysed once for the cluster
+        assert jaa._cache["results"]["2"].implicit_requirements == ["ownership"]
+        assert len(JDAnalysisStore(tmp_path / "worker.sqlite3")) == 3   # copied into the worker's L1 / disk
+
+    async def test_follower_waits_for_leader(self, monkeypatch):
+        import fakeredis
+        import src.agents.job_analyzer_agent as jaa
+        from src.services.jd_store import JDAnalysisStore, jd_analysis_hash
+        from src.services.job_adapter import jobs_to_postings
+
+        server = fakeredis.FakeServer()
+        leader = JDAnalysisStore(None, redis_client=fakeredis.FakeRedis(server=server))
+        follower = JDAnalysisStore(None, redis_client=fakeredis.FakeRedis(server=server))
+        jobs = [{"job_id": "1", "job_title": "Engineer", "description": "job 1"}]
+        posting = jobs_to_postings(jobs)[0]
+
+        async def must_not_analyze(chunk):
+            raise AssertionError("follower called the LLM")
+
+        monkeypatch.setattr(jaa, "load_jobs", lambda: jobs)
+        monkeypatch.setattr(jaa, "get_jd_store", lambda: follower)
+        monkeypatch.setattr(jaa, "_analyze_jobs", must_not_analyze)
+        monkeypatch.setattr(jaa, "_notify_catalog_change", lambda postings: None)
+        monkeypatch.setattr(jaa, "_LEADER_POLL_SECONDS", 0.01)
+
+        token = leader.acquire_leader()
+        assert token is not None and follower.acquire_leader() is None
+        rebuild = asyncio.create_task(jaa._rebuild_cache(5.0))
+        await asyncio.sleep(0.05)
+        assert not rebuild.done()
+
+        leader.put_many({"1": (jd_analysis_hash(posting), ["remote-first"], [])})
+        leader.release_leader(token)
+        await asyncio.wait_for(rebuild, timeout=1)
+        assert jaa._cache["mtime"] == 5.0
+        assert jaa._cache["results"]["1"].implicit_requirements == ["remote-first"]
+
+    async def test_new_leader_rechecks_store_before_analysing(self, monkeypatch):
+        import fakeredis
+        import src.agents.job_analyzer_agent as jaa
+        from src.services.jd_store import JDAnalysisStore, jd_analysis_hash
+        from src.services.job_adapter import jobs_to_postings
+
+        server = fakeredis.FakeServer()
+        previous = JDAnalysisStore(None, redis_client=fakeredis.FakeRedis(server=server))
+        late = JDAnalysisStore(None, redis_client=fakeredis.FakeRedis(server=server))
+        jobs = [{"job_id": "1", "job_title": "Engineer", "description": "job 1"}]
+        posting = jobs_to_postings(jobs)[0]
+        acquire = late.acquire_leader
+
+        def acquire_after_previous_leader():
+            # the previous leader stores its analyses and releases between our read and our lock
+            previous.put_many({"1": (jd_analysis_hash(posting), ["remote-first"], [])})
+            return acquire()
+
+        async def must_not_analyze(chunk):
+            raise AssertionError("analysed a job the previous leader already stored")
+
+        monkeypatch.setattr(late, "acquire_leader", acquire_after_previous_leader)
+        monkeypatch.setattr(jaa, "load_jobs", lambda: jobs)
+        monkeypatch.setattr(jaa, "get_jd_store", lambda: late)
+        monkeypatch.setattr(jaa, "_analyze_jobs", must_not_analyze)
+        monkeypatch.setattr(jaa, "_notify_catalog_change", lambda postings: None)
+
+        await jaa._rebuild_cache(6.0)
+        assert jaa._cache["mtime"] == 6.0
+        assert jaa._cache["results"]["1"].implicit_requirements == ["remote-first"]
+
+
+# ── JD cache stale-while-revalidate ───────────────────────────────────────────
+
+class TestJDCacheStaleWhileRevalidate:
+    async def test_stale_cache_served_while_single_refresh_runs(self, monkeypatch):
+        import src.agents.job_analyzer_agent as jaa
+        from src.agents.base import AgentContext
+        from src.models.agent_schemas import AnalyzedJob
+        from src.models.schemas import JobPosting
+
+        old = JobPosting(job_id="1", title="Engineer", description="", required_skills=[], preferred_skills=[])
+        jaa._cache["mtime"] = 1.0
+        jaa._cache["results"] = {"1": AnalyzedJob(posting=old, company="Acme", implicit_requirements=["ownership"])}
+        jaa._stale["mtime"] = None
+        monkeypatch.setattr(jaa, "_get_mtime", lambda: 2.0)
+        monkeypatch.setattr(jaa, "load_jobs", lambda: [
+            {"job_id": "1", "job_title": "Senior Engineer", "company": "Acme"},
+            {"job_id": "2", "job_title": "Designer", "company": "Acme"},
+        ])
+
+        release = asyncio.Event()
+        rebuilds = []
+
+        async def slow_rebuild(mtime):
+            rebuilds.append(mtime)
+            await release.wait()
+            jaa._cache["mtime"], jaa._cache["results"] = mtime, {"fresh": object()}
+
+        monkeypatch.setattr(jaa, "_rebuild_cache", slow_rebuild)
+        monkeypatch.setattr(jaa, "_server_loop", asyncio.get_running_loop())
+
+        ctxs = [AgentContext(request_id=f"swr_{i}", file_bytes=b"", filename="", top_k=3) for i in range(3)]
+        await asyncio.wait_for(asyncio.gather(*[jaa.JobAnalyzerAgent().run(c) for c in ctxs]), timeout=1)
+
+        served = {a.posting.job_id: a for a in ctxs[0].analyzed_jobs}
+        assert served["1"].posting.title == "Senior Engineer"     # current posting, last good analysis
+        assert served["1"].implicit_requirements == ["ownership"]
+        assert served["2"].implicit_requirements == []             # new job served unenriched
+
+        await asyncio.sleep(0)
+        assert rebuilds == [2.0]
+        release.set()
+        await asyncio.wrap_future(jaa._refresh_future)
+        assert list(jaa._cache["results"]) == ["fresh"]
+
+
+# ── Background JD refresher ───────────────────────────────────────────────────
+
+class TestJDRefresher:
+    async def test_refresh_loop_picks_up_catalog_change(self, monkeypatch):
+        import src.agents.job_analyzer_agent as jaa
+        from src.services.rate_limiter import Priority, current_priority
+
+        mtime = {"value": 1.0}
+        rebuilds = []
+
+        async def fake_rebuild(current_mtime):
+            rebuilds.append((current_mtime, current_priority()))
+            jaa._cache["mtime"], jaa._cache["results"] = current_mtime, {"j": object()}
+
+        monkeypatch.setattr(jaa, "_rebuild_cache", fake_rebuild)
+        monkeypatch.setattr(jaa, "_get_mtime", lambda: mtime["value"])
+        monkeypatch.setattr(jaa, "_server_loop", asyncio.get_running_loop())
+        jaa._cache["mtime"], jaa._cache["results"] = 1.0, {"j": object()}
+
+        loop_task = asyncio.create_task(jaa.refresh_loop(0.01))
+        try:
+            await asyncio.sleep(0.03)
+            assert rebuilds == []                   # unchanged catalog: no refresh
+            mtime["value"] = 2.0
+            await asyncio.sleep(0.05)
+        finally:
+            loop_task.cancel()
+
+        assert rebuilds == [(2.0, Priority.BACKGROUND)]
+        status = jaa.refresh_status()
+        assert status["last_refresh_at"] is not None and status["last_error"] is None
+        assert status["last_duration_s"] >= 0 and not status["refreshing"]
+
+    def test_refresh_outlives_short_lived_loops(self, monkeypatch):
+        """Celery runs each task under its own asyncio.run(); the refresh must survive it."""
+        import src.agents.job_analyzer_agent as jaa
+        from src.agents.base import AgentContext
+
+        rebuilds = []
+
+        async def slow_rebuild(mtime):
+            rebuilds.append(mtime)
+            await asyncio.sleep(0.05)
+            jaa._cache["mtime"], jaa._cache["results"] = mtime, {"fresh": object()}
+
+        monkeypatch.setattr(jaa, "_rebuild_cache", slow_rebuild)
+        monkeypatch.setattr(jaa, "_get_mtime", lambda: 2.0)
+        monkeypatch.setattr(jaa, "_server_loop", None)
+        monkeypatch.setattr(jaa, "load_jobs", lambda: [{"job_id": "1", "job_title": "Engineer"}])
+        jaa._cache["mtime"], jaa._cache["results"] = 1.0, {"old": object()}
+        jaa._stale["mtime"] = None
+
+        def task(i):
+            ctx = AgentContext(request_id=f"celery_{i}", file_bytes=b"", filename="", top_k=3)
+            asyncio.run(jaa.JobAnalyzerAgent().run(ctx))
+            return ctx
+
+        assert [a.posting.job_id for a in task(1).analyzed_jobs] == ["1"]    # stale, refresh started
+        jaa._refresh_future.result(timeout=1)                                 # ... and finished after its loop closed
+        assert len(task(2).analyzed_jobs) == 1 and list(jaa._cache["results"]) == ["fresh"]
+        assert rebuilds == [2.0]
+
+    def test_single_flight_across_threads(self, monkeypatch):
+        """The worker refresher thread and task loops share ONE refresh."""
+        import threading
+        import types
+        import src.agents.job_analyzer_agent as jaa
+
+        rebuilds = []
+
+        async def slow_rebuild(mtime):
+            rebuilds.append(threading.current_thread().name)
+            await asyncio.sleep(0.05)
+            jaa._cache["mtime"], jaa._cache["results"] = mtime, {"fresh": object()}
+
+        async def join_refresh():
+            await jaa._ensure_refresh(3.0)
+
+        monkeypatch.setattr(jaa, "_rebuild_cache", slow_rebuild)
+        monkeypatch.setattr(jaa, "_get_mtime", lambda: 3.0)
+        monkeypatch.setattr(jaa, "_server_loop", None)
+        monkeypatch.setattr(jaa, "get_app_config", lambda: types.SimpleNamespace(JD_CACHE_REFRESH_INTERVAL=0.01))
+        jaa._cache["mtime"], jaa._cache["results"] = 1.0, {"old": object()}
+
+        refresher = jaa.start_refresher_thread()
+        try:
+            tasks = [threading.Thread(target=asyncio.run, args=(join_refresh(),)) for _ in range(4)]
+            for t in tasks:
+                t.start()
+            for t in tasks:
+                t.join(timeout=2)
+        finally:
+            refresher.cancel()
+
+        assert rebuilds == ["jd-cache-refresh"]
+        assert list(jaa._cache["results"]) == ["fresh"]
+
+    async def test_disabled_by_default(self, monkeypatch):
+        import types
+        import src.agents.job_analyzer_agent as jaa
+
+        monkeypatch.setattr(jaa, "get_app_config", lambda: types.SimpleNamespace(JD_CACHE_REFRESH_INTERVAL=0))
+        assert jaa.start_refresher() is None
+        assert jaa.start_refresher_thread() is None
+
+
+# ── Career prediction cache ───────────────────────────────────────────────────
+
+class TestCareerPredictionCache:
+    @staticmethod
+    def _profile(**overrides):
+        from src.models.agent_schemas import ResumeProfile
+
+        fields = dict(
+            resume_text="...", name="Ada", current_title="Backend Engineer", years_of_experience=4.0,
+            seniority_self_reported="Mid", skills=["Python", "Go"], soft_skills=["mentoring"],
+            career_objective="Grow into a tech lead",
+        )
+        fields.update(overrides)
+        return ResumeProfile(**fields)
+
+    def test_fingerprint_canonicalises_profile(self):
+        from src.services.career_cache import profile_fingerprint
+
+        base = profile_fingerprint(self._profile())
+        assert profile_fingerprint(self._profile(
+            name="Someone Else", years_of_experience=4.9, skills=["go", " python ", "Python"],
+            current_title="backend  engineer",
+        )) == base
+        assert profile_fingerprint(self._profile(years_of_experience=6)) != base
+        assert profile_fingerprint(self._profile(skills=["Python", "Rust"])) != base
+
+    def test_ttl_and_eviction(self, monkeypatch):
+        from src.models.agent_schemas import CareerPrediction
+        from src.services import career_cache as cc
+
+        cache = cc.CareerPredictionCache(max_entries=2, ttl=60)
+        for key in ("a", "b", "c"):
+            cache.put(key, CareerPrediction(current_level="mid", target_role_in_5yr=key))
+        assert cache.get("a") is None                            # evicted (LRU)
+        assert cache.get("c").target_role_in_5yr == "c"
+
+        now = cc.time.time()
+        monkeypatch.setattr(cc.time, "time", lambda: now + 61)
+        assert cache.get("c") is None                            # expired
+        assert cache.stats()["hit_rate"] == round(1 / 3, 4)
+
+    async def test_agent_reuses_prediction_for_near_identical_profile(self, monkeypatch):
+        import json
+        import types
+        import src.agents.career_path_predictor_agent as cpa
+        from src.agents.base import AgentContext
+        from src.services.career_cache import CareerPredictionCache
+
+        calls = []
+
+        class FakeClient:
+            async def chat(self, **kwargs):
+                calls.append(kwargs)
+                return json.dumps({"current_level": "mid", "target_role_in_5yr": "Staff Engineer",
+                                   "milestones": [{"year": 1, "title": "Senior Engineer"}]})
+
+        cache = CareerPredictionCache(max_entries=8, ttl=60)
+        monkeypatch.setattr(cpa, "get_llm_client", lambda: FakeClient())
+        monkeypatch.setattr(cpa, "get_career_cache", lambda: cache)
+        monkeypatch.setattr(cpa, "get_app_config", lambda: types.SimpleNamespace(CAREER_CACHE_ENABLED=True))
+
+        agent = cpa.CareerPathPredictorAgent()
+        first = AgentContext(request_id="c1", file_bytes=b"", filename="", top_k=3)
+        first.candidate_profile = self._profile()
+        second = AgentContext(request_id="c2", file_bytes=b"", filename="", top_k=3)
+        second.candidate_profile = self._profile(skills=["go", "python"], years_of_experience=4.5)
+
+        await agent.run(first)
+        await agent.run(second)
+
+        assert len(calls) == 1
+        assert second.career_prediction.target_role_in_5yr == "Staff Engineer"
+        assert second.career_prediction is not first.career_prediction
+
+
+# ── Candidate store (reverse matching) ────────────────────────────────────────
+
+class TestCandidateStore:
+    @staticmethod
+    def _profile(text: str, skills=None):
+        from src.models.agent_schemas import ResumeProfile
+        from src.models.schemas import SalaryRange
+        return ResumeProfile(
+            resume_text=text,
+            skills=skills or ["Python", " python", "Docker"],
+            expected_salary=SalaryRange(min_salary=100000, max_salary=150000),
+            name=text,
+        )
+
+    @staticmethod
+    def _unit(vec):
+        import numpy as np
+        v = np.asarray(vec, dtype="float32")
+        return v / np.linalg.norm(v)
+
+    def test_upsert_search_and_reload(self, tmp_path):
+        from src.services.candidate_store import CandidateStore
+        store = CandidateStore(root=tmp_path)
+        store.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        store.upsert(self._profile("bob"), self._unit([0, 1, 0]), [0.1, 0.9])
+
+        hits = store.search(self._unit([0.1, 1, 0]), k=1)
+        assert [h.profile.name for h in hits] == ["bob"]
+        assert hits[0].skill_ids == ["python", "docker"]
+
+        reloaded = CandidateStore(root=tmp_path)
+        assert len(reloaded) == 2
+        rec = reloaded.search(self._unit([1, 0, 0]), k=1)[0]
+        assert rec.profile.name == "alice"
+        assert rec.profile.expected_salary.max_salary == 150000
+
+    def test_reupload_replaces_instead_of_duplicating(self, tmp_path):
+        from src.services.candidate_store import CandidateStore
+        store = CandidateStore(root=tmp_path)
+        cid1 = store.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        cid2 = store.upsert(self._profile("alice"), self._unit([0, 0, 1]), [0.5, 0.5])
+
+        assert cid1 == cid2
+        assert len(store) == 1
+        hits = store.search(self._unit([0, 0, 1]), k=5)
+        assert len(hits) == 1
+        assert float(hits[0].semantic[2]) == pytest.approx(1.0)
+
+    def test_other_process_writes_become_visible(self, tmp_path):
+        from src.services.candidate_store import CandidateStore
+        api = CandidateStore(root=tmp_path)
+        worker = CandidateStore(root=tmp_path)       # same files, separate in-memory state
+        worker.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        worker.upsert(self._profile("alice"), self._unit([0, 1, 0]), [0.5, 0.5])
+
+        hits = api.search(self._unit([0, 1, 0]), k=5)
+        assert [h.profile.name for h in hits] == ["alice"]
+        assert float(hits[0].semantic[1]) == pytest.approx(1.0)
+
+    def test_index_snapshot_plus_newer_rows_on_load(self, tmp_path, monkeypatch):
+        from src.services import candidate_store as cs
+        monkeypatch.setattr(cs, "INDEX_SAVE_EVERY", 2)
+        store = cs.CandidateStore(root=tmp_path)
+        for i, name in enumerate(["alice", "bob", "carol"]):
+            vec = [0, 0, 0]
+            vec[i] = 1
+            store.upsert(self._profile(name), self._unit(vec), [0.5, 0.5])
+        assert (tmp_path / "candidates_faiss.index").exists()
+
+        reloaded = cs.CandidateStore(root=tmp_path)      # snapshot holds 2 rows, carol is replayed
+        assert reloaded._index.ntotal == 3
+        assert reloaded.search(self._unit([0, 0, 1]), k=1)[0].profile.name == "carol"
+
+    def test_rows_replaced_after_snapshot_are_not_duplicated(self, tmp_path, monkeypatch):
+        from src.services import candidate_store as cs
+        monkeypatch.setattr(cs, "INDEX_SAVE_EVERY", 2)
+        store = cs.CandidateStore(root=tmp_path)
+        store.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        store.upsert(self._profile("bob"), self._unit([0, 1, 0]), [0.5, 0.5])      # snapshot saved
+        store.upsert(self._profile("alice"), self._unit([0, 0, 1]), [0.5, 0.5])    # replaced after it
+        assert store._index.ntotal == 2
+
+        reloaded = cs.CandidateStore(root=tmp_path)
+        assert reloaded._index.ntotal == 2
+        assert float(reloaded.search(self._unit([0, 0, 1]), k=1)[0].semantic[2]) == pytest.approx(1.0)
+
+    def test_snapshot_saved_elsewhere_backs_off(self, tmp_path, monkeypatch):
+        from src.services import candidate_store as cs
+        monkeypatch.setattr(cs, "INDEX_SAVE_EVERY", 2)
+        api = cs.CandidateStore(root=tmp_path)
+        worker = cs.CandidateStore(root=tmp_path)
+        worker.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        worker.upsert(self._profile("bob"), self._unit([0, 1, 0]), [0.5, 0.5])     # worker snapshots v2
+        assert len(api) == 2
+        api._save_index()                         # due by api's own count, but v2 is already on disk
+
+        saves = []
+        monkeypatch.setattr(api, "_save_index", lambda: saves.append(api._version))
+        api.upsert(self._profile("carol"), self._unit([0, 0, 1]), [0.5, 0.5])    # v3: 1 past the snapshot
+        assert saves == []
+
+    def test_index_candidate_skips_unchanged_profiles(self, tmp_path):
+        import types
+        import numpy as np
+        from src.services.candidate_store import CandidateStore, index_candidate
+        encoded = []
+        scorer = types.SimpleNamespace(
+            semantic=types.SimpleNamespace(encode_candidate=lambda c: encoded.append(c) or self._unit([1, 0, 0])),
+            culture=types.SimpleNamespace(candidate_vector=lambda c: np.array([0.5, 0.5])),
+        )
+        store = CandidateStore(root=tmp_path)
+        cid = index_candidate(scorer, self._profile("alice"), store)
+        version = store._version
+
+        assert index_candidate(scorer, self._profile("alice"), store) == cid
+        assert store._version == version and len(encoded) == 1
+        index_candidate(scorer, self._profile("alice", skills=["Rust"]), store)     # re-parsed differently
+        assert store.get(cid).skill_ids == ["rust"]
+
+    def test_delete_reaches_other_processes_and_snapshots(self, tmp_path, monkeypatch):
+        import sqlite3
+        from src.services import candidate_store as cs
+        monkeypatch.setattr(cs, "INDEX_SAVE_EVERY", 2)
+        api = cs.CandidateStore(root=tmp_path)
+        worker = cs.CandidateStore(root=tmp_path)
+        alice = worker.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        worker.upsert(self._profile("bob"), self._unit([0, 1, 0]), [0.5, 0.5])       # snapshot holds alice
+        assert len(api) == 2
+
+        assert api.delete(alice) and not api.delete(alice)
+        assert [h.profile.name for h in worker.search(self._unit([1, 0, 0]), k=5)] == ["bob"]
+        assert cs.CandidateStore(root=tmp_path)._index.ntotal == 1
+        with sqlite3.connect(tmp_path / "candidates.sqlite3") as conn:
+            assert conn.execute("SELECT profile FROM candidates WHERE candidate_id = ?", (alice,)).fetchone() == ("{}",)
+
+        worker.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])    # re-upload revives it
+        assert api.get(alice).profile.name == "alice"
+
+    def test_ttl_purges_stale_candidates(self, tmp_path, monkeypatch):
+        from src.services import candidate_store as cs
+        store = cs.CandidateStore(root=tmp_path, ttl=60)
+        now = time.time()
+        monkeypatch.setattr(cs.time, "time", lambda: now - 120)
+        store.upsert(self._profile("alice"), self._unit([1, 0, 0]), [0.5, 0.5])
+        monkeypatch.setattr(cs.time, "time", lambda: now)
+        store.upsert(self._profile("bob"), self._unit([0, 1, 0]), [0.5, 0.5])
+
+        assert store.purge_expired() == 1 and store.purge_expired() == 0
+        assert [r.profile.name for r in store.records()] == ["bob"]
+        assert [h.profile.name for h in store.search(self._unit([1, 0, 0]), k=5)] == ["bob"]
+
+
+# ── Incremental re-scoring ────────────────────────────────────────────────────
+
+class _FakeVectorScorer:
+    """Deterministic stand-in for FiveDimScorer (no PyTorch models)."""
+
+    def __init__(self, version="v1"):
+        import numpy as np
+        self.version = version
+        self.scored_jobs: list[str] = []
+        self.semantic = type("S", (), {"encode_job": staticmethod(lambda job: np.ones(2, dtype="float32"))})()
+        self.culture = type("C", (), {"job_vector": staticmethod(lambda job: np.ones(2, dtype="float32"))})()
+
+    def _score(self, job):
+        from src.models.schemas import DimensionScore, FiveDimScore
+        self.scored_jobs.append(job.job_id)
+        value = 0.1 * len(job.description)
+        dim = DimensionScore(score=value, weight=0.2, weighted_score=value * 0.2)
+        return FiveDimScore(job_id=job.job_id, semantic=dim, skill_graph=dim,
+                            seniority=dim, culture=dim, salary=dim)
+
+    def score_batch(self, candidate, jobs, top_k=None, with_details=False):
+        results = sorted((self._score(j) for j in jobs), key=lambda r: r.final_score, reverse=True)
+        return results[:top_k] if top_k else results
+
+    def score_with_vectors(self, candidate, job, *vectors, with_details=True):
+        return self._score(job)
+
+
+class TestIncrementalRescoring:
+    @staticmethod
+    def _jobs(**descriptions):
+        from src.models.schemas import JobPosting
+        return [JobPosting(job_id=k, title=k, description=v) for k, v in descriptions.items()]
+
+    def test_known_candidate_only_scores_changed_jobs(self, tmp_path):
+        from src.models.schemas import CandidateProfile
+        from src.services.score_store import ScoreStore, score_incremental
+        store = ScoreStore(path=tmp_path / "scores.sqlite3")
+        scorer = _FakeVectorScorer()
+        candidate = CandidateProfile(resume_text="cv")
+
+        score_incremental(scorer, candidate, "fp", self._jobs(a="x", b="yy"), store=store)
+        scorer.scored_jobs.clear()
+        top = score_incremental(scorer, candidate, "fp", self._jobs(a="x", b="yyyy"), top_k=1, store=store)
+
+        assert scorer.scored_jobs == ["b"]
+        assert top[0].job_id == "b"
+
+        scorer.scored_jobs.clear()
+        top = score_incremental(scorer, candidate, "fp", self._jobs(a="x", b="yyyy"), top_k=1, store=store)
+        assert scorer.scored_jobs == []                          # top-k read from the rank index
+        assert top[0].job_id == "b"
+
+    def test_scorer_version_change_invalidates_scores(self, tmp_path):
+        from src.models.schemas import CandidateProfile
+        from src.services.score_store import ScoreStore, score_incremental
+        store = ScoreStore(path=tmp_path / "scores.sqlite3")
+        candidate = CandidateProfile(resume_text="cv")
+
+        score_incremental(_FakeVectorScorer("v1"), candidate, "fp", self._jobs(a="x"), store=store)
+        reweighted = _FakeVectorScorer("v2")
+        score_incremental(reweighted, candidate, "fp", self._jobs(a="x"), top_k=1, store=store)
+        assert reweighted.scored_jobs == ["a"]
+
+    def test_catalog_change_rescores_stored_candidates(self, tmp_path):
+        import numpy as np
+        from src.models.agent_schemas import ResumeProfile
+        from src.services.candidate_store import CandidateStore
+        from src.services.job_adapter import job_content_hash
+        from src.services.score_store import ScoreStore, on_catalog_change, score_incremental
+        store = ScoreStore(path=tmp_path / "scores.sqlite3")
+        candidates = CandidateStore(root=tmp_path)
+        scorer = _FakeVectorScorer()
+
+        profile = ResumeProfile(resume_text="cv")
+        fp = candidates.upsert(profile, np.array([1.0, 0.0]), np.array([0.5, 0.5]))
+        jobs = self._jobs(a="xxx", b="yy", c="z")
+        score_incremental(scorer, profile.to_candidate_profile(), fp, jobs, store=store)
+        scorer.scored_jobs.clear()
+        first = on_catalog_change(scorer, jobs, store=store, candidates=candidates)
+        assert first == {"changed": [], "deleted": []} and scorer.scored_jobs == []   # snapshot only
+
+        scorer.scored_jobs.clear()
+        diff = on_catalog_change(scorer, self._jobs(a="xxx", b="yyyyy"), store=store, candidates=candidates)
+
+        assert diff == {"changed": ["b"], "deleted": ["c"]}
+        assert scorer.scored_jobs == ["b"]
+        new_hashes = {j.job_id: job_content_hash(j) for j in self._jobs(a="xxx", b="yyyyy")}
+        assert [s.job_id for s in store.top_k(fp, 5, new_hashes, scorer.version)] == ["b", "a"]
+        # a second process seeing the same change finds nothing left to do
+        assert on_catalog_change(scorer, self._jobs(a="xxx", b="yyyyy"), store=store, candidates=candidates) == {
+            "changed": [], "deleted": []}
+
+
+# ── Lazy score details ────────────────────────────────────────────────────────
+
+class TestLazyScoreDetails:
+    def test_numeric_only_mode_matches_detailed_score(self):
+        from src.dimensions.skill_graph_matcher import SkillGraphMatcher
+        from src.models.schemas import CandidateProfile, JobPosting
+        matcher = SkillGraphMatcher()
+        candidate = CandidateProfile(resume_text="", skills=["pytorch", "docker"])
+        job = JobPosting(job_id="j", title="ML", description="",
+                         required_skills=["tensorflow", "docker"], preferred_skills=["kubernetes"])
+
+        lean = matcher.score(candidate, job, with_details=False)
+        full = matcher.score(candidate, job)
+
+        assert lean.details is None
+        assert lean.score == pytest.approx(full.score)
+        assert [d["required"] for d in full.details["required_details"]] == ["tensorflow", "docker"]
+        assert full.details["graph_nodes"] == matcher.graph.number_of_nodes()
+
+
+# ── Compact result types ──────────────────────────────────────────────────────
+
+class TestScoreBatch:
+    def test_result_types_are_slotted_and_frozen(self):
+        import dataclasses
+        from src.models.schemas import DimensionScore, FiveDimScore
+        dim = DimensionScore(score=0.5, weight=0.2, weighted_score=0.1)
+        score = FiveDimScore(job_id="j", semantic=dim, skill_graph=dim,
+                             seniority=dim, culture=dim, salary=dim)
+        assert not hasattr(dim, "__dict__") and not hasattr(score, "__dict__")
+        assert score.final_score == pytest.approx(0.5)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            score.final_score = 1.0
+
+    def test_top_k_and_serialization(self):
+        import numpy as np
+        from src.models.schemas import ScoreBatch
+        weights = (0.3, 0.25, 0.2, 0.15, 0.1)
+        cols = {d: np.array([0.2, 0.9, 0.5]) for d in
+                ("semantic", "skill_graph", "seniority", "culture", "salary")}
+        batch = ScoreBatch(job_ids=["a", "b", "c"], **cols,
+                           final=np.asarray(weights) @ np.vstack(list(cols.values())),
+                           weights=weights)
+
+        top = batch.top_k(2)
+        rows = top.to_rows()
+        assert [r["job_id"] for r in rows] == ["b", "c"]
+        assert rows[0]["five_dim_score"]["semantic"] == {
+            "score": 0.9, "weight": 0.3, "weighted_score": pytest.approx(0.27)}
+        scores = top.to_scores()
+        assert scores[0].final_score == pytest.approx(rows[0]["final_score"])
+
+    def test_batch_dimension_scores_match_per_job_scores(self):
+        from src.dimensions.seniority_matcher import SeniorityMatcher
+        from src.dimensions.skill_graph_matcher import SkillGraphMatcher
+        from src.models.schemas import CandidateProfile, JobPosting
+        candidate = CandidateProfile(resume_text="Senior engineer", skills=["pytorch", "docker"])
+        jobs = [
+            JobPosting(job_id="a", title="Junior ML Engineer", description="",
+                       required_skills=["tensorflow", "docker"], preferred_skills=["kubernetes"]),
+            JobPosting(job_id="b", title="Staff Engineer", description="", required_skills=["docker"]),
+            JobPosting(job_id="c", title="Director of AI", description="", required_skills=[]),
+        ]
+        for matcher in (SkillGraphMatcher(), SeniorityMatcher()):
+            expected = [matcher.score(candidate, j, with_details=False).score for j in jobs]
+            assert matcher.score_many(candidate, jobs).tolist() == pytest.approx(expected)
+
+
+# ── Vectorized salary overlap ─────────────────────────────────────────────────
+
+class TestVectorizedSalary:
+    def _jobs(self):
+        from src.models.schemas import JobPosting, SalaryRange
+        ranges = [(90_000, 110_000), (100_000, 300_000), (150_000, 200_000),
+                  (20_000, 40_000), (5_000, 8_000), (None, None)]
+        jobs = [
+            JobPosting(job_id=f"j{i}", title="Engineer", description="", required_skills=[],
+                       salary_range=SalaryRange(min_salary=lo, max_salary=hi) if lo else None)
+            for i, (lo, hi) in enumerate(ranges)
+        ]
+        jobs[4].salary_range.period = "monthly"
+        jobs.append(JobPosting(job_id="text", title="Engineer", required_skills=[],
+                               description="Compensation: $95k - $125k"))
+        return jobs
+
+    # candidate 100k–130k vs each job: overlap ratio → table, no overlap → 0.15 - relative gap * 0.1
+    _EXPECTED = [0.35, 1.0, 0.15 - 20 / 175 * 0.1, 0.05, 0.15 - 4 / 78 * 0.1, 0.5, 0.90]
+
+    def _candidate(self):
+        from src.models.schemas import CandidateProfile, SalaryRange
+        return CandidateProfile(resume_text="", skills=[],
+                                expected_salary=SalaryRange(min_salary=100_000, max_salary=130_000))
+
+    def test_score_many_matches_expected_scores(self):
+        from src.dimensions.salary_matcher import SalaryMatcher
+        matcher = SalaryMatcher()
+        jobs = self._jobs()
+        matcher.prepare_catalog(jobs[:4])   # mix of catalog rows and ad-hoc postings
+
+        assert matcher.score_many(self._candidate(), jobs).tolist() == pytest.approx(self._EXPECTED)
+        assert [matcher.score(self._candidate(), j).score for j in jobs] == pytest.approx(self._EXPECTED)
+
+    def test_catalog_rows_match_by_job_id_and_salary_inputs(self):
+        from src.dimensions.salary_matcher import SalaryMatcher
+        matcher = SalaryMatcher()
+        matcher.prepare_catalog(self._jobs())
+        matcher._job_range_usd = lambda job: pytest.fail(f"{job.job_id} normalized again")
+
+        reloaded = self._jobs()            # new objects, as after every load_jobs()
+        assert matcher.score_many(self._candidate(), reloaded).tolist() == pytest.approx(self._EXPECTED)
+
+        edited = self._jobs()
+        edited[0].salary_range.max_salary = 130_000
+        del matcher._job_range_usd
+        assert matcher.score_many(self._candidate(), edited)[0] == pytest.approx(1.0)
+
+    def test_missing_candidate_salary_is_neutral(self):
+        from src.dimensions.salary_matcher import SalaryMatcher
+        from src.models.schemas import CandidateProfile
+        candidate = CandidateProfile(resume_text="no numbers here", skills=[])
+        assert SalaryMatcher().score_many(candidate, self._jobs()).tolist() == [0.5] * 7
+
+
+# ── DAG scheduler ─────────────────────────────────────────────────────────────
+
+class TestDagScheduler:
+    def _agent(self, name, inputs, outputs, delay=0.0, fail=False, log=None):
+        import asyncio
+        from src.agents.base import AgentBase
+
+        class _Agent(AgentBase):
+            async def run(self, ctx):
+                log.append(("start", self.name))
+                await asyncio.sleep(delay)
+                if fail:
+                    raise RuntimeError("boom")
+                for out in self.outputs:
+                    setattr(ctx, out, [self.name])
+                log.append(("end", self.name))
+                return ctx
+
+        agent = _Agent()
+        agent.name, agent.inputs, agent.outputs = name, inputs, outputs
+        return agent
+
+    async def test_agents_start_when_their_inputs_are_written(self):
+        from src.agents.base import AgentContext
+        from src.agents.scheduler import DagScheduler
+        log = []
+        scheduler = DagScheduler([
+            self._agent("parse", (), ("candidate_profile",), delay=0.01, log=log),
+            self._agent("analyze", (), ("analyzed_jobs",), delay=0.2, log=log),
+            self._agent("predict", ("candidate_profile",), ("career_prediction",), log=log),
+            self._agent("score", ("candidate_profile", "analyzed_jobs"), ("scored_results",), log=log),
+        ])
+        await scheduler.run(AgentContext(request_id="dag"))
+
+        # predict only needs the profile — it must not wait for the slow JD analysis
+        assert log.index(("end", "predict")) < log.index(("end", "analyze"))
+        assert log.index(("start", "score")) > log.index(("end", "analyze"))
+
+    async def test_failed_producer_skips_dependants(self):
+        from src.agents.base import AgentContext
+        from src.agents.scheduler import DagScheduler
+        log = []
+        ctx = AgentContext(request_id="dag")
+        await DagScheduler([
+            self._agent("parse", (), ("candidate_profile",), fail=True, log=log),
+            self._agent("score", ("candidate_profile",), ("scored_results",), log=log),
+            self._agent("insight", ("scored_results",), ("insight_report",), log=log),
+        ]).run(ctx)
+
+        assert "parse" in ctx.errors
+        assert ("start", "score") not in log and ("start", "insight") not in log
+
+    async def test_per_item_readiness(self):
+        import asyncio
+        from src.agents.base import AgentContext
+        ctx = AgentContext(request_id="items")
+        waiter = asyncio.create_task(ctx.wait_for_item("job_career_paths", "j1"))
+        await asyncio.sleep(0)
+        ctx.mark_ready("job_career_paths", "j2")
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        ctx.mark_ready("job_career_paths", "j1")
+        await asyncio.wait_for(waiter, 1)
+        # whole-field readiness releases any later item waiter immediately
+        ctx.mark_ready("job_career_paths")
+        await asyncio.wait_for(ctx.wait_for_item("job_career_paths", "j3"), 1)
+
+
+# ── Score-gated counterfactual paths ──────────────────────────────────────────
+
+class TestScoreGatedCounterfactual:
+    @staticmethod
+    def _ctx(n_jobs: int):
+        from src.agents.base import AgentContext
+        from src.models.agent_schemas import AnalyzedJob, ResumeProfile
+        from src.models.schemas import JobPosting
+        ctx = AgentContext(request_id="cf")
+        ctx.candidate_profile = ResumeProfile(resume_text="resume", name="alice")
+        ctx.analyzed_jobs = [
+            AnalyzedJob(posting=JobPosting(job_id=f"j{i}", title=f"T{i}", description=""))
+            for i in range(n_jobs)
+        ]
+        return ctx
+
+    @staticmethod
+    def _scored(*job_ids):
+        from src.models.schemas import DimensionScore, FiveDimScore
+        dim = DimensionScore(score=0.5, weight=0.2, weighted_score=0.1)
+        return [FiveDimScore(job_id=j, semantic=dim, skill_graph=dim, seniority=dim,
+                             culture=dim, salary=dim) for j in job_ids]
+
+    def _patch(self, monkeypatch, speculative_k=0, recalled=()):
+        import asyncio
+        import types
+        import src.agents.counterfactual_career_agent as cca
+        from src.models.agent_schemas import JobCareerPath
+        calls, cancelled = [], []
+
+        async def fake_predict(**kw):
+            calls.append(kw["job_id"])
+            try:
+                await asyncio.sleep(0.05)
+            except asyncio.CancelledError:
+                cancelled.append(kw["job_id"])
+                raise
+            return JobCareerPath(job_id=kw["job_id"], job_title=kw["job_title"],
+                                 company="", trajectory_summary="path")
+
+        monkeypatch.setattr(cca, "_predict_for_job", fake_predict)
+        monkeypatch.setattr(cca, "_speculative_job_ids", lambda text, k: list(recalled)[:k])
+        monkeypatch.setattr(cca, "get_app_config",
+                            lambda: types.SimpleNamespace(COUNTERFACTUAL_SPECULATIVE_K=speculative_k,
+                                                          LLM_BATCH_SIZE=1, LLM_BATCH_TOKEN_BUDGET=6000))
+        return cca.CounterfactualCareerAgent(), calls, cancelled
+
+    async def test_only_top_k_jobs_get_llm_calls(self, monkeypatch):
+        agent, calls, _ = self._patch(monkeypatch)
+        ctx = self._ctx(20)
+        ctx.scored_results = self._scored("j7", "j2", "j9")
+        ctx.mark_ready("scored_results")
+
+        await agent(ctx)
+        assert sorted(calls) == ["j2", "j7", "j9"]
+        assert [p.job_id for p in ctx.job_career_paths] == ["j7", "j2", "j9"]
+
+    async def test_speculative_calls_outside_top_k_are_cancelled(self, monkeypatch):
+        import asyncio
+        agent, calls, cancelled = self._patch(monkeypatch, speculative_k=2, recalled=["j3", "j1"])
+        ctx = self._ctx(5)
+
+        run = asyncio.create_task(agent(ctx))
+        await asyncio.sleep(0.01)            # speculation starts while "scoring" runs
+        assert sorted(calls) == ["j1", "j3"]
+        ctx.scored_results = self._scored("j1", "j4")
+        ctx.mark_ready("scored_results")
+        await run
+
+        assert cancelled == ["j3"]
+        assert sorted(calls) == ["j1", "j3", "j4"]   # j1 reused, not called twice
+        assert [p.job_id for p in ctx.job_career_paths] == ["j1", "j4"]
+
+
+# ── Multi-item LLM batching ───────────────────────────────────────────────────
+
+class TestLLMBatch:
+    """Multi-item batching: budgeted packing, keyed parsing, per-item fallback."""
+
+    def test_pack_respects_size_and_token_budget(self):
+        from src.services.llm_batch import pack
+        sizes = {"a": 10, "b": 10, "c": 10, "d": 50, "e": 10}
+        chunks = pack(list(sizes), sizes.get, batch_size=3, token_budget=40, base_tokens=5)
+        assert chunks == [["a", "b", "c"], ["d"], ["e"]]
+        assert pack(list(sizes), sizes.get, batch_size=1, token_budget=10**6) == [[k] for k in sizes]
+
+    async def test_missing_or_malformed_entries_fall_back_to_single_calls(self):
+        import json
+        from src.services.llm_batch import call_chunk
+        batch_calls, singles = [], []
+
+        async def call_batch(chunk):
+            batch_calls.append(list(chunk))
+            return json.dumps({"results": {"a": {"v": 1}, "b": "not an object", "c": {"v": 3}}})
+
+        async def single(item):
+            singles.append(item)
+            return f"{item}-single"
+
+        out = await call_chunk(["a", "b", "c", "d"], caller="test", key=str, call_batch=call_batch,
+                               parse=lambda item, data: f"{item}-{data['v']}", single=single)
+        assert out == ["a-1", "b-single", "c-3", "d-single"]
+        assert batch_calls == [["a", "b", "c", "d"]] and singles == ["b", "d"]
+
+    async def test_failed_batch_call_falls_back_per_item(self):
+        from src.services.llm_batch import call_chunk
+
+        async def call_batch(chunk):
+            return "{truncated"
+
+        async def single(item):
+            return item.upper()
+
+        out = await call_chunk(["x", "y"], caller="test", key=str, call_batch=call_batch,
+                               parse=lambda item, data: item, single=single)
+        assert out == ["X", "Y"]
+
+
+# ── Context event stream (SSE source) ─────────────────────────────────────────
+
+class TestContextEventStream:
+    async def test_subscriber_sees_writes_in_order(self):
+        from src.agents.base import AgentContext
+        from src.agents.scheduler import DagScheduler
+        make = TestDagScheduler()._agent
+        log = []
+        ctx = AgentContext(request_id="sse")
+        updates = ctx.subscribe()
+        await DagScheduler([
+            make("parse", (), ("candidate_profile",), log=log),
+            make("analyze", (), ("analyzed_jobs",), delay=0.01, log=log),
+            make("score", ("candidate_profile", "analyzed_jobs"), ("scored_results",), log=log),
+        ]).run(ctx)
+
+        seen = []
+        while not updates.empty():
+            name, item = updates.get_nowait()
+            if name in ("candidate_profile", "analyzed_jobs", "scored_results"):
+                seen.append(name)
+        assert seen == ["candidate_profile", "analyzed_jobs", "scored_results"]
+
+
+# ── LLM response cache ────────────────────────────────────────────────────────
+
+class TestLLMCache:
+    def test_key_is_content_addressed(self):
+        from src.services.llm_cache import cache_key
+        msgs = [{"role": "user", "content": "hi"}]
+        assert cache_key("m", msgs, 0.2, {"type": "json_object"}) == \
+            cache_key("m", [dict(content="hi", role="user")], 0.2, {"type": "json_object"})
+        assert cache_key("m", msgs, 0.2) != cache_key("m", msgs, 0.3)
+        assert cache_key("m", msgs, 0.2) != cache_key("other", msgs, 0.2)
+
+    def test_lru_ttl_and_disk_tier(self, tmp_path, monkeypatch):
+        from src.services import llm_cache
+        path = tmp_path / "llm.sqlite3"
+        cache = llm_cache.LLMCache(max_entries=2, ttl=60, path=path)
+        for k in ("a", "b", "c"):
+            cache.put(k, k.upper())
+        assert cache.get_l1("a") is None            # evicted from L1 ...
+        assert cache.get("a") == "A"                 # ... but served (and promoted) from SQLite
+        assert cache.get_l1("a") == "A"
+
+        assert llm_cache.LLMCache(max_entries=2, ttl=60, path=path).get("b") == "B"
+
+        now = llm_cache.time.time()
+        monkeypatch.setattr(llm_cache.time, "time", lambda: now + 120)
+        assert cache.get("c") is None                # expired in both tiers
+        stats = cache.stats()
+        assert (stats["l1_hit"], stats["l2_hit"], stats["miss"]) == (1, 1, 1)
+
+    async def test_client_skips_llm_and_limiter_on_hit(self, monkeypatch):
+        import types
+        from src.services import llm_cache
+        from src.services import llm_client
+        from src.services.llm_client import LLMClient
+        from src.services.rate_limiter import LLMLimiter
+        monkeypatch.setattr(llm_cache, "_llm_cache", llm_cache.LLMCache(max_entries=8, ttl=60))
+        replies = iter(['not json', '{"ok": 1}'])
+        calls = {"llm": 0, "acquire": 0}
+
+        async def create(**request):
+            calls["llm"] += 1
+            message = types.SimpleNamespace(content=next(replies))
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        class CountingBucket:
+            async def try_acquire(self):
+                calls["acquire"] += 1
+                return 0.0
+
+        limiter = LLMLimiter(CountingBucket(), max_concurrency=2)
+        monkeypatch.setattr(llm_client, "get_llm_limiter", lambda: limiter)
+
+        client = LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+        request = dict(caller="test", messages=[{"role": "user", "content": "x"}], temperature=0.1,
+                       response_format={"type": "json_object"})
+
+        assert await client.chat(**request) == "not json"   # malformed → not cached
+        assert await client.chat(**request) == '{"ok": 1}'
+        assert await client.chat(**request) == '{"ok": 1}'
+        assert calls == {"llm": 2, "acquire": 2}
+
+    async def test_candidate_data_never_reaches_disk(self, tmp_path, monkeypatch):
+        import sqlite3
+        import types
+        from src.services import llm_cache
+        from src.services.llm_client import LLMClient
+        path = tmp_path / "llm.sqlite3"
+        monkeypatch.setattr(llm_cache, "_llm_cache", llm_cache.LLMCache(max_entries=8, ttl=60, path=path))
+        calls = []
+
+        async def create(**request):
+            calls.append(request["messages"][0]["content"])
+            message = types.SimpleNamespace(content="ok")
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        client = LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+        for caller in ("resume_parser", "resume_parser", "insight_generator", "insight_generator", "job_analyzer"):
+            await client.chat(caller=caller, messages=[{"role": "user", "content": caller}])
+
+        assert calls == ["resume_parser", "resume_parser", "insight_generator", "job_analyzer"]
+        with sqlite3.connect(path) as conn:
+            assert conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0] == 1
+
+
+# ── Pooled LLM client ─────────────────────────────────────────────────────────
+
+class TestLLMClient:
+    """Shared pooled client: one lazily built pool, per-caller metrics."""
+
+    def test_pool_is_built_once_with_configured_limits(self, monkeypatch):
+        monkeypatch.setenv("MOONSHOT_API_KEY", "x")
+        from src.services.llm_client import LLMClient
+        client = LLMClient()
+        assert client.async_client is client.async_client
+        pool = client.async_client._client
+        assert pool._transport._pool._max_connections == 20
+
+    async def test_records_tokens_and_errors(self, monkeypatch):
+        import types
+        from prometheus_client import REGISTRY
+        from src.services import llm_cache
+        from src.services.llm_client import LLMClient
+        monkeypatch.setattr(llm_cache, "_llm_cache", llm_cache.LLMCache(max_entries=8, ttl=60))
+        usage = types.SimpleNamespace(prompt_tokens=7, completion_tokens=3)
+        outcomes = iter([None, TimeoutError("slow")])
+
+        async def create(**request):
+            err = next(outcomes)
+            if err:
+                raise err
+            message = types.SimpleNamespace(content="hi")
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)], usage=usage)
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        client = LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+        before = sample("llm_tokens_total", caller="t_metrics", kind="prompt")
+        assert await client.chat(caller="t_metrics", messages=[{"role": "user", "content": "x"}]) == "hi"
+        with pytest.raises(TimeoutError):
+            await client.chat(caller="t_metrics", messages=[{"role": "user", "content": "y"}])
+
+        assert sample("llm_tokens_total", caller="t_metrics", kind="prompt") - before == 7
+        assert sample("llm_request_errors_total", caller="t_metrics", error="TimeoutError") == 1
+        assert sample("llm_request_duration_seconds_count", caller="t_metrics") >= 1
+
+
+# ── Hedged LLM requests ───────────────────────────────────────────────────────
+
+class TestHedgedRequests:
+    """Hedging: duplicate after the caller's p95, first answer wins, budgeted."""
+
+    def _client(self, monkeypatch, ratio):
+        import types
+        from src.services import llm_client
+        from src.services.rate_limiter import LLMLimiter
+
+        class OpenBucket:
+            async def try_acquire(self):
+                return 0.0
+
+        cfg = types.SimpleNamespace(LLM_CACHE_ENABLED=False, LLM_HEDGE_ENABLED=True,
+                                    LLM_HEDGE_MIN_DELAY=0.05, LLM_HEDGE_MAX_RATIO=ratio)
+        limiter = LLMLimiter(OpenBucket(), max_concurrency=4)
+        monkeypatch.setattr(llm_client, "get_app_config", lambda: cfg)
+        monkeypatch.setattr(llm_client, "get_llm_limiter", lambda: limiter)
+
+        delays, cancelled = iter([1.0, 0.01]), []
+
+        async def create(**request):
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            message = types.SimpleNamespace(content=f"after {delay}")
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+        client = llm_client.LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+        window = llm_client._LatencyWindow()
+        for _ in range(20):
+            window.add(0.01)                    # observed p95 ≈ 10 ms → hedge after the 50 ms floor
+        client._latency["hedged"] = window
+        client._calls = 10
+        return client, limiter, cancelled
+
+    async def test_slow_call_is_hedged_and_loser_cancelled(self, monkeypatch):
+        client, limiter, cancelled = self._client(monkeypatch, ratio=1.0)
+        start = time.monotonic()
+        assert await client.chat(caller="hedged", messages=[], hedge=True) == "after 0.01"
+        assert time.monotonic() - start < 0.5
+        await asyncio.sleep(0)
+        assert cancelled == [1.0]
+        assert limiter.inflight == 0
+
+    async def test_no_hedge_beyond_budget(self, monkeypatch):
+        client, _, cancelled = self._client(monkeypatch, ratio=0.0)
+        assert await client.chat(caller="hedged", messages=[], hedge=True) == "after 1.0"
+        assert cancelled == []
+
+
+# ── LLM circuit breaker ───────────────────────────────────────────────────────
+
+class TestCircuitBreaker:
+    """closed → open on error rate, fail fast, half-open probes close or re-open."""
+
+    @staticmethod
+    def _breaker(now):
+        from src.services.circuit_breaker import CircuitBreaker
+        return CircuitBreaker("test", window_seconds=60, min_calls=4, error_rate=0.5,
+                              slow_call_seconds=10, slow_rate=0.8, open_seconds=30,
+                              half_open_probes=2, clock=lambda: now[0])
+
+    def test_trips_on_error_rate_and_fails_fast(self):
+        from src.services.circuit_breaker import CircuitOpenError
+        now = [0.0]
+        breaker = self._breaker(now)
+        for failed in (False, True, False, True):
+            breaker.before_call()
+            breaker.record(failed=failed, latency=1.0)
+        assert breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    def test_half_open_probes_close_or_reopen(self):
+        from src.services.circuit_breaker import CircuitOpenError
+        now = [0.0]
+        breaker = self._breaker(now)
+        for _ in range(4):
+            breaker.record(failed=False, latency=20.0)        # all slow → open
+        assert breaker.state == "open"
+
+        now[0] = 31.0
+        breaker.before_call()
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):                  # only 2 probes in flight
+            breaker.before_call()
+        breaker.record(failed=True, latency=1.0)
+        assert breaker.state == "open"
+
+        now[0] = 62.0
+        for _ in range(2):
+            breaker.before_call()
+            breaker.record(failed=False, latency=1.0)
+        assert breaker.snapshot()["state"] == "closed"
+
+    async def test_open_circuit_skips_provider_and_limiter(self, monkeypatch):
+        import types
+        from src.services import llm_client
+        from src.services.circuit_breaker import CircuitOpenError
+        now = [0.0]
+        breaker = self._breaker(now)
+        breaker._transition("open")
+        monkeypatch.setattr(llm_client, "get_llm_breaker", lambda: breaker)
+        monkeypatch.setattr(llm_client, "get_llm_limiter", lambda: pytest.fail("limiter must not be used"))
+
+        async def create(**request):
+            pytest.fail("provider must not be called")
+
+        client = llm_client.LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+        with pytest.raises(CircuitOpenError):
+            await client.chat(caller="t_circuit", messages=[{"role": "user", "content": "uncached"}])
+
+
+# ── Request deadline ──────────────────────────────────────────────────────────
+
+class TestRequestDeadline:
+    """ctx.deadline caps agent timeouts and bounds LLM calls / executor jobs."""
+
+    async def test_agent_timeout_is_capped_by_remaining_budget(self):
+        import time
+        from src.agents.base import AgentContext
+        from src.agents.scheduler import DagScheduler
+        from src.core.deadline import deadline_in
+        log = []
+        slow = TestDagScheduler()._agent("parse", (), ("candidate_profile",), delay=5.0, log=log)
+        late = TestDagScheduler()._agent("late", (), ("analyzed_jobs",), log=log)
+        ctx = AgentContext(request_id="deadline", deadline=deadline_in(0.05))
+        late_ctx = AgentContext(request_id="late", deadline=deadline_in(-1))
+
+        t0 = time.monotonic()
+        await DagScheduler([slow]).run(ctx)
+        assert time.monotonic() - t0 < 1.0                   # not the agent's own 60s
+        assert ctx.errors["parse"].startswith("Timed out")
+
+        await DagScheduler([late]).run(late_ctx)
+        assert late_ctx.errors["late"] == "Skipped: request deadline passed"
+        assert ("start", "late") not in log
+
+    async def test_llm_call_is_bounded_and_fails_fast_past_deadline(self, monkeypatch):
+        import types
+        from src.core.deadline import DeadlineExceeded, deadline_in, request_deadline
+        from src.services import llm_client
+        from src.services.rate_limiter import LLMLimiter
+        from src.services.circuit_breaker import CircuitBreaker
+
+        class OpenBucket:
+            async def try_acquire(self):
+                return 0.0
+
+        cfg = types.SimpleNamespace(LLM_CACHE_ENABLED=False, LLM_HEDGE_ENABLED=False)
+        limiter = LLMLimiter(OpenBucket(), max_concurrency=4)
+        breaker = CircuitBreaker("t_deadline", window_seconds=60, min_calls=1, error_rate=0.5,
+                                 slow_call_seconds=10, slow_rate=0.8, open_seconds=30, half_open_probes=1)
+        monkeypatch.setattr(llm_client, "get_app_config", lambda: cfg)
+        monkeypatch.setattr(llm_client, "get_llm_limiter", lambda: limiter)
+        monkeypatch.setattr(llm_client, "get_llm_breaker", lambda: breaker)
+        calls = []
+
+        async def create(**request):
+            calls.append(request)
+            await asyncio.sleep(5)
+
+        client = llm_client.LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+        messages = [{"role": "user", "content": "deadline"}]
+        with request_deadline(deadline_in(0.05)):
+            with pytest.raises(DeadlineExceeded):
+                await client.chat(caller="t_deadline", messages=messages)
+        assert len(calls) == 1 and limiter.inflight == 0
+        assert breaker.state == "closed"                     # our deadline is not a provider fault
+
+        with request_deadline(deadline_in(-1)):
+            with pytest.raises(DeadlineExceeded):
+                await client.chat(caller="t_deadline", messages=messages)
+        assert len(calls) == 1
+
+    async def test_executor_jobs_inherit_the_deadline(self):
+        from src.core.deadline import current_deadline, deadline_in, request_deadline, run_in_executor
+        deadline = deadline_in(30)
+        with request_deadline(deadline):
+            assert await run_in_executor(current_deadline) == deadline
+
+
+# ── Pipeline cancellation ─────────────────────────────────────────────────────
+
+class TestPipelineCancellation:
+    """Cancelling the DAG (client disconnect) unwinds agents and in-flight LLM calls."""
+
+    async def test_cancelled_dag_records_agents_and_llm_calls(self, monkeypatch):
+        import types
+        from prometheus_client import REGISTRY
+        from src.agents.base import AgentBase, AgentContext
+        from src.agents.scheduler import DagScheduler
+        from src.services import llm_client
+        from src.services.rate_limiter import LLMLimiter
+
+        class OpenBucket:
+            async def try_acquire(self):
+                return 0.0
+
+        cfg = types.SimpleNamespace(LLM_CACHE_ENABLED=False, LLM_HEDGE_ENABLED=False)
+        limiter = LLMLimiter(OpenBucket(), max_concurrency=4)
+        monkeypatch.setattr(llm_client, "get_app_config", lambda: cfg)
+        monkeypatch.setattr(llm_client, "get_llm_limiter", lambda: limiter)
+
+        async def create(**request):
+            await asyncio.sleep(5)
+
+        client = llm_client.LLMClient(
+            async_client=types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create))),
+            model="m",
+        )
+
+        class Talker(AgentBase):
+            name, outputs = "t_talker", ("candidate_profile",)
+
+            async def run(self, ctx):
+                await client.chat(caller="t_cancel", messages=[{"role": "user", "content": "bye"}])
+                return ctx
+
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        ctx = AgentContext(request_id="cancel")
+        run = asyncio.ensure_future(DagScheduler([Talker()]).run(ctx))
+        await asyncio.sleep(0.02)
+        assert limiter.inflight == 1
+        run.cancel()
+        await asyncio.wait({run})
+
+        assert ctx.errors["t_talker"] == "Cancelled"
+        assert ctx.is_ready("candidate_profile")            # downstream waiters released
+        assert limiter.inflight == 0
+        assert sample("agent_cancelled_total", agent="t_talker") == 1
+        assert sample("llm_requests_cancelled_total", caller="t_cancel") == 1
+
+
+# ── Resume parse cache ────────────────────────────────────────────────────────
+
+class TestResumeParseCache:
+    """Content-hash keyed parse cache: LRU + encrypted Redis tier."""
+
+    PARSED = {"text": "Name: Ada Lovelace", "skills": {"python", "rust"},
+              "raw": {"name": "Ada Lovelace", "email": "ada@example.com"}}
+
+    def test_repeat_upload_hits_l1_with_a_private_copy(self):
+        from src.services.resume_cache import ResumeParseCache
+        cache = ResumeParseCache(max_entries=4, ttl=60)
+        assert cache.get(b"%PDF resume") is None
+        cache.put(b"%PDF resume", self.PARSED)
+
+        hit = cache.get(b"%PDF resume")
+        assert hit == self.PARSED and isinstance(hit["skills"], set)
+        hit["skills"].add("mutated")
+        assert cache.get(b"%PDF resume")["skills"] == {"python", "rust"}
+        assert cache.get(b"%PDF resume!") is None            # content, not name, is the key
+
+    def test_redis_tier_is_shared_and_holds_no_plaintext(self):
+        import fakeredis
+        from src.services.resume_cache import ResumeParseCache, content_hash
+        server = fakeredis.FakeServer()
+        api = ResumeParseCache(max_entries=4, ttl=60, redis_client=fakeredis.FakeRedis(server=server))
+        worker = ResumeParseCache(max_entries=4, ttl=60, redis_client=fakeredis.FakeRedis(server=server))
+        api.put(b"%PDF resume", self.PARSED)
+
+        assert worker.get(b"%PDF resume") == self.PARSED
+        raw = fakeredis.FakeRedis(server=server)
+        (key,) = raw.keys("*")
+        value = raw.get(key)
+        assert content_hash(b"%PDF resume").encode() not in key
+        assert b"Ada" not in value and b"ada@example.com" not in value
+        assert 0 < raw.ttl(key) <= 60
+
+    def test_redis_outage_degrades_to_l1(self):
+        import fakeredis
+        from src.services.resume_cache import ResumeParseCache
+        server = fakeredis.FakeServer()
+        server.connected = False
+        cache = ResumeParseCache(max_entries=4, ttl=60, redis_client=fakeredis.FakeRedis(server=server))
+        cache.put(b"%PDF resume", self.PARSED)
+        assert cache.get(b"%PDF resume") == self.PARSED
+
+
+# ── Resume document extraction ────────────────────────────────────────────────
+
+class TestDocumentExtractor:
+    """Process-pool extraction: pdfium fast path, pdfplumber fallback, caps."""
+
+    @staticmethod
+    def _pdf(pages: list[str]) -> bytes:
+        objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+                   "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+        kids = []
+        for text in pages:
+            stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET"
+            objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+            objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                           f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+            kids.append(f"{len(objects)} 0 R")
+        objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+        out, offsets = b"%PDF-1.4\n", []
+        for i, body in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += f"{i} 0 obj\n{body}\nendobj\n".encode()
+        xref = len(out)
+        out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode()
+        out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+        return out
+
+    @staticmethod
+    def _config(monkeypatch, pool=False, max_pages=20):
+        import types
+        from src.services import document_extractor
+        cfg = types.SimpleNamespace(EXTRACT_USE_PROCESS_POOL=pool, EXTRACT_MAX_WORKERS=1,
+                                    EXTRACT_MAX_PAGES=max_pages, EXTRACT_TIMEOUT_SECONDS=30.0)
+        monkeypatch.setattr(document_extractor, "get_app_config", lambda: cfg)
+
+    TEXT = "Senior Python engineer with ten years of distributed systems experience"
+
+    async def test_fast_path_respects_page_cap(self, monkeypatch):
+        from src.services.document_extractor import extract_text
+        self._config(monkeypatch, max_pages=2)
+        result = await extract_text(self._pdf([f"{self.TEXT} p{i}" for i in (1, 2, 3)]), "cv.pdf")
+        assert result.method == "pdfium"
+        assert (result.pages, result.pages_read) == (3, 2)
+        assert "p2" in result.text and "p3" not in result.text
+
+    async def test_sparse_fast_text_falls_back_to_pdfplumber(self, monkeypatch):
+        from src.services import document_extractor
+        self._config(monkeypatch)
+        monkeypatch.setattr(document_extractor, "_pdfium_text", lambda data, max_pages: ("", 1, 1))
+        result = await document_extractor.extract_text(self._pdf([self.TEXT]), "cv.pdf")
+        assert result.method == "pdfplumber" and "Python engineer" in result.text
+
+    def test_worker_alarm_enforces_time_cap(self, monkeypatch):
+        import time
+        from src.services import document_extractor
+        monkeypatch.setattr(document_extractor, "_pdfium_text", lambda data, max_pages: time.sleep(5))
+        t0 = time.monotonic()
+        with pytest.raises(document_extractor.ExtractionTimeout):
+            document_extractor._extract(self._pdf([self.TEXT]), "pdf", 20, 0.1, use_alarm=True)
+        assert time.monotonic() - t0 < 2
+
+    async def test_extracts_in_process_pool(self, monkeypatch):
+        from src.services.document_extractor import ExtractionError, extract_text, shutdown_pool
+        self._config(monkeypatch, pool=True)
+        try:
+            assert "Python engineer" in (await extract_text(self._pdf([self.TEXT]), "cv.pdf")).text
+            with pytest.raises(ExtractionError):
+                await extract_text(b"%PDF-1.4 garbage", "cv.pdf")
+            from src.services import document_extractor
+            assert document_extractor._in_flight == 0
+        finally:
+            shutdown_pool()
+
+    def test_queue_time_does_not_count_against_the_document(self, monkeypatch):
+        from src.services.document_extractor import _ALARM_GRACE_SECONDS, _parent_wait
+        self._config(monkeypatch, pool=True)       # EXTRACT_TIMEOUT_SECONDS=30
+        assert _parent_wait(5.0, ahead=0, workers=2) == 5.0 + _ALARM_GRACE_SECONDS
+        # 3 documents ahead on 2 workers: one full slot of queueing before our own run
+        assert _parent_wait(5.0, ahead=3, workers=2) == 30.0 + 5.0 + _ALARM_GRACE_SECONDS
+
+
+# ── Async resume parsing ──────────────────────────────────────────────────────
+
+class TestAsyncResumeParsing:
+    """Extraction in the pool + LLM on the async client; repeat uploads from cache."""
+
+    async def test_parse_uses_async_client_and_caches_by_content(self, monkeypatch):
+        import json
+        import threading
+        import types
+        from src.services import resume_parser
+        from src.services.resume_cache import ResumeParseCache
+        TestDocumentExtractor._config(monkeypatch)
+        cfg = types.SimpleNamespace(RESUME_CACHE_ENABLED=True)
+        cache = ResumeParseCache(max_entries=4, ttl=60)
+        monkeypatch.setattr(resume_parser, "get_app_config", lambda: cfg)
+        monkeypatch.setattr(resume_parser, "get_resume_cache", lambda: cache)
+        calls = []
+
+        class FakeClient:
+            async def chat(self, **kwargs):
+                calls.append(threading.current_thread() is threading.main_thread())
+                return json.dumps({"name": "Ada", "skills": ["python"], "total_experience_years": 7})
+
+        monkeypatch.setattr(resume_parser, "get_llm_client", lambda: FakeClient())
+        pdf = TestDocumentExtractor._pdf([TestDocumentExtractor.TEXT])
+
+        first = await resume_parser.parse_resume_file(pdf, "cv.pdf")
+        again = await resume_parser.parse_resume_file(pdf, "renamed.pdf")
+        assert first == again and first["skills"] == {"python"}
+        assert "Python engineer" in first["text"]
+        assert calls == [True]            # one LLM call, made on the event loop thread